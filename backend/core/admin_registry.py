@@ -0,0 +1,106 @@
+"""
+Process-local and shared-cache registry of admin user ids.
+
+Admins are superusers or users whose profile role is ADMIN. Nearly every
+status change notifies them through notify_admins() and the delayed-booking
+task, which read the set with get_admin_user_ids(), so it is kept in two
+tiers: a copy in this process that is trusted for LOCAL_TTL seconds, backed
+by an entry in Django's cache that all processes share. Signal handlers in
+core.signals drop both tiers whenever a role or superuser flag changes, and
+again once the transaction commits; other processes pick the change up once
+their local copy expires.
+
+As in core.authentication, invalidation leaves a short-lived marker in the
+shared cache and the entry is only filled with cache.add(), so a request
+that read the ids just before a change cannot write them back over it.
+"""
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+CACHE_KEY = 'core:admin_user_ids'
+CACHE_TIMEOUT = 60 * 60
+LOCAL_TTL = 5
+# Long enough to outlive any request that read the ids before an invalidation
+STALE_TIMEOUT = 10
+STALE = 'stale'
+
+_lock = threading.Lock()
+_local_ids = None
+_local_expires = 0.0
+
+
+def load_admin_user_ids():
+    """
+    Query the database for the ids of all admin users
+    """
+    return frozenset(User.objects.filter(
+        Q(is_superuser=True) |
+        Q(userprofile__role='ADMIN')
+    ).values_list('id', flat=True).distinct())
+
+
+def _peek():
+    """
+    Currently cached ids from either tier, or None without touching the database
+    """
+    if _local_ids is not None and time.monotonic() < _local_expires:
+        return _local_ids
+    ids = cache.get(CACHE_KEY)
+    return frozenset(ids) if ids is not None and ids != STALE else None
+
+
+def get_admin_user_ids():
+    """
+    Ids of all admin users, served from cache when possible
+    """
+    global _local_ids, _local_expires
+    ids = _peek()
+    if ids is None:
+        ids = load_admin_user_ids()
+        # add() leaves a newer set or an invalidation marker in place
+        cache.add(CACHE_KEY, list(ids), CACHE_TIMEOUT)
+    with _lock:
+        if _local_ids is not ids:
+            _local_ids = ids
+            _local_expires = time.monotonic() + LOCAL_TTL
+    return ids
+
+
+def invalidate_admin_registry():
+    """
+    Drop both cache tiers so reads reload from the database for a while.
+
+    Call this after changing roles with QuerySet.update(), which does not
+    send the save signals core.signals listens to.
+    """
+    global _local_ids, _local_expires
+    with _lock:
+        _local_ids = None
+        _local_expires = 0.0
+    cache.set(CACHE_KEY, STALE, STALE_TIMEOUT)
+
+
+def invalidate_after_commit():
+    """
+    Invalidate now and again when the current transaction commits, so ids
+    read by other requests before the commit do not outlive it
+    """
+    invalidate_admin_registry()
+    transaction.on_commit(invalidate_admin_registry)
+
+
+def sync_admin_membership(user_id, is_admin):
+    """
+    Invalidate the registry unless a warm cache already agrees with a saved
+    user's admin status.
+
+    Only the cache is consulted, so this never runs a query itself.
+    """
+    ids = _peek()
+    if ids is None or (user_id in ids) != is_admin:
+        invalidate_after_commit()
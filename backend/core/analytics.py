@@ -0,0 +1,227 @@
+"""
+Daily rollup of bookings and revenue for admin analytics.
+
+DailyRollup holds one row per day and service category. Handlers in
+core.signals apply the change from every booking or payment save as a
+small F() delta, and code that changes statuses with QuerySet.update()
+reports the move through bookings_moved(). analytics_summary() reads only
+the rollup, so a year of analytics costs a few hundred rows however many
+bookings there are.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .earnings import money
+from .models import Booking, DailyRollup, Payment
+
+# Booking statuses and the rollup column each one is counted in
+STATUS_FIELDS = {
+    'PENDING': 'bookings_pending',
+    'ASSIGNED': 'bookings_assigned',
+    'CONFIRMED': 'bookings_confirmed',
+    'IN_PROGRESS': 'bookings_in_progress',
+    'REACHED': 'bookings_reached',
+    'COMPLETED': 'bookings_completed',
+    'CANCELLED': 'bookings_cancelled',
+    'DELAYED': 'bookings_delayed',
+}
+REVENUE_FIELDS = ('gross_revenue', 'admin_commission', 'provider_amount')
+
+
+def apply_deltas(deltas):
+    """
+    Add to rollup rows, given {(day, category): {field: amount}}
+    """
+    deltas = {
+        key: {field: amount for field, amount in changes.items() if amount}
+        for key, changes in deltas.items()
+    }
+    deltas = {key: changes for key, changes in deltas.items() if changes}
+    if not deltas:
+        return
+    with transaction.atomic():
+        # Make sure every touched row exists before updating it in place
+        DailyRollup.objects.bulk_create(
+            [DailyRollup(day=day, category=category) for day, category in deltas],
+            ignore_conflicts=True
+        )
+        for (day, category), changes in deltas.items():
+            DailyRollup.objects.filter(day=day, category=category).update(
+                **{field: F(field) + amount for field, amount in changes.items()})
+
+
+def status_delta(old_status, new_status, count=1):
+    changes = Counter()
+    if old_status in STATUS_FIELDS:
+        changes[STATUS_FIELDS[old_status]] -= count
+    if new_status in STATUS_FIELDS:
+        changes[STATUS_FIELDS[new_status]] += count
+    return changes
+
+
+def booking_key(booking):
+    return timezone.localdate(booking.created_at), booking.service.category
+
+
+def booking_saved(booking, created):
+    """
+    Move a saved booking between status counts if its status changed
+    """
+    if created:
+        old_status = None
+    elif not hasattr(booking, '_loaded_status') or booking._loaded_status is None:
+        # Status at load time is unknown, e.g. a deferred field; the
+        # rebuild command will pick the change up
+        return
+    else:
+        old_status = booking._loaded_status
+    booking._loaded_status = booking.status
+    if old_status != booking.status:
+        apply_deltas({booking_key(booking): status_delta(old_status, booking.status)})
+
+
+def booking_deleted(booking):
+    apply_deltas({booking_key(booking): status_delta(
+        getattr(booking, '_loaded_status', booking.status), None)})
+
+
+def bookings_moved(rows, new_status):
+    """
+    Record a status change made with QuerySet.update(), which sends no
+    signals. rows are (created_at, category, old_status) per booking.
+    """
+    deltas = defaultdict(Counter)
+    for created_at, category, old_status in rows:
+        deltas[timezone.localdate(created_at), category].update(status_delta(old_status, new_status))
+    apply_deltas(deltas)
+
+
+def payment_delta(payment, sign):
+    return {
+        'payments': sign,
+        'gross_revenue': sign * payment.total_amount,
+        'admin_commission': sign * payment.admin_commission,
+        'provider_amount': sign * payment.provider_amount,
+    }
+
+
+def payment_key(payment):
+    return timezone.localdate(payment.created_at), payment.booking.service.category
+
+
+def payment_saved(payment, created):
+    """
+    Add or remove a payment's amounts when it becomes or stops being successful
+    """
+    if created:
+        old_status = None
+    elif not hasattr(payment, '_loaded_status') or payment._loaded_status is None:
+        return
+    else:
+        old_status = payment._loaded_status
+    payment._loaded_status = payment.payment_status
+    if (old_status == 'SUCCESS') == (payment.payment_status == 'SUCCESS'):
+        return
+    sign = 1 if payment.payment_status == 'SUCCESS' else -1
+    apply_deltas({payment_key(payment): payment_delta(payment, sign)})
+
+
+def payment_deleted(payment):
+    if getattr(payment, '_loaded_status', payment.payment_status) == 'SUCCESS':
+        apply_deltas({payment_key(payment): payment_delta(payment, -1)})
+
+
+def rollup_rows():
+    """
+    Unsaved rollup rows computed from scratch with two grouped queries
+    """
+    rows = {}
+
+    def row(day, category):
+        if (day, category) not in rows:
+            rows[day, category] = DailyRollup(day=day, category=category)
+        return rows[day, category]
+
+    for entry in Booking.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'service__category', 'status'
+    ).annotate(count=Count('id')).order_by():
+        field = STATUS_FIELDS.get(entry['status'])
+        if field:
+            setattr(row(entry['day'], entry['service__category']), field, entry['count'])
+
+    for entry in Payment.objects.filter(payment_status='SUCCESS').annotate(
+        day=TruncDate('created_at')
+    ).values('day', 'booking__service__category').annotate(
+        count=Count('id'),
+        gross_revenue_sum=Sum('total_amount'),
+        admin_commission_sum=Sum('admin_commission'),
+        provider_amount_sum=Sum('provider_amount')
+    ).order_by():
+        rollup = row(entry['day'], entry['booking__service__category'])
+        rollup.payments = entry['count']
+        for field in REVENUE_FIELDS:
+            setattr(rollup, field, entry[f'{field}_sum'])
+
+    return list(rows.values())
+
+
+def rebuild_rollup():
+    """
+    Replace every rollup row with freshly computed totals
+    """
+    rows = rollup_rows()
+    with transaction.atomic():
+        DailyRollup.objects.all().delete()
+        DailyRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def analytics_summary(date_from=None, date_to=None):
+    """
+    Booking and revenue totals between two days inclusive, overall, per
+    category and per day, read from the rollup alone
+    """
+    rows = DailyRollup.objects.all()
+    if date_from is not None:
+        rows = rows.filter(day__gte=date_from)
+    if date_to is not None:
+        rows = rows.filter(day__lte=date_to)
+
+    # Every booking is counted under exactly one status column
+    status_fields = list(STATUS_FIELDS.values())
+    bookings = F(status_fields[0])
+    for field in status_fields[1:]:
+        bookings = bookings + F(field)
+    # Aliases may not reuse the rollup's own field names
+    sums = {
+        'bookings_sum': Sum(bookings),
+        'payments_sum': Sum('payments'),
+        **{f'{field}_sum': Sum(field) for field in REVENUE_FIELDS},
+    }
+
+    def serialize(entry):
+        return {
+            'bookings': entry['bookings_sum'] or 0,
+            'payments': entry['payments_sum'] or 0,
+            **{field: money(entry[f'{field}_sum'] or 0) for field in REVENUE_FIELDS},
+        }
+
+    totals = rows.aggregate(**sums, **{f'{field}_sum': Sum(field) for field in status_fields})
+    return {
+        'from': date_from,
+        'to': date_to,
+        'totals': serialize(totals),
+        'by_status': {status: totals[f'{field}_sum'] or 0 for status, field in STATUS_FIELDS.items()},
+        'by_category': [
+            {'category': entry['category'], **serialize(entry)}
+            for entry in rows.values('category').annotate(**sums).order_by('category')
+        ],
+        'daily': [
+            {'day': entry['day'], **serialize(entry)}
+            for entry in rows.values('day').annotate(**sums).order_by('day')
+        ],
+    }
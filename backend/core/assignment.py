@@ -0,0 +1,194 @@
+"""
+Batch assignment of PENDING bookings to workers.
+
+plan_assignments() reads everything it needs in a fixed number of queries
+(bookings, qualifications, ratings, load and busy slots) and matches in
+memory: bookings are taken in schedule order and each goes to the nearest
+qualified worker with no conflicting slot, then the best rating and the
+lightest load. Located workers further than WORKER_MATCH_RADIUS_KM from a
+located booking are not considered.
+apply_plan() then writes the whole plan in one transaction with bulk
+statements. The admin endpoint and the Celery task both go through
+auto_assign().
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+from .analytics import bookings_moved
+from .availability import booking_window
+from .geo import distance_km
+from .models import Booking, RatingReview, UserProfile, WorkerBusySlot
+from .notifications import build_notifications, save_notifications
+
+
+def pending_bookings(starts_from, starts_before):
+    """
+    Unassigned PENDING bookings scheduled to start within the window
+    """
+    return Booking.objects.filter(
+        status='PENDING',
+        worker__isnull=True,
+        scheduled_start__gte=starts_from,
+        scheduled_start__lt=starts_before
+    ).select_related('service').order_by('scheduled_start', 'id')
+
+
+def overlaps(intervals, starts_at, ends_at):
+    return any(start < ends_at and starts_at < end for start, end in intervals)
+
+
+def booking_distance(booking, worker):
+    """
+    Kilometres between a booking and a worker, None if either is unlocated
+    """
+    return distance_km(booking.latitude, booking.longitude, worker.latitude, worker.longitude)
+
+
+def plan_assignments(bookings):
+    """
+    Match bookings to workers without writing anything.
+
+    Returns (assignments, unassigned) where assignments is a list of
+    (booking, worker) pairs and unassigned the bookings nobody could take.
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return [], []
+
+    # Approved workers qualified for each service in the batch
+    Qualification = UserProfile.services.through
+    qualified = defaultdict(list)
+    for service_id, worker_id in Qualification.objects.filter(
+        service_id__in={booking.service_id for booking in bookings},
+        userprofile__role='WORKER',
+        userprofile__is_approved=True
+    ).values_list('service_id', 'userprofile_id'):
+        qualified[service_id].append(worker_id)
+    worker_ids = {worker_id for ids in qualified.values() for worker_id in ids}
+    workers = UserProfile.objects.select_related('user').in_bulk(worker_ids)
+
+    ratings = dict(RatingReview.objects.filter(worker_id__in=worker_ids).values(
+        'worker').annotate(value=Avg('rating')).values_list('worker', 'value'))
+    load = dict(WorkerBusySlot.objects.filter(worker_id__in=worker_ids).values(
+        'worker').annotate(value=Count('booking')).values_list('worker', 'value'))
+
+    # Existing commitments that could clash with anything in the batch
+    windows = [booking_window(booking) for booking in bookings]
+    busy = defaultdict(list)
+    for worker_id, starts_at, ends_at in WorkerBusySlot.objects.filter(
+        worker_id__in=worker_ids,
+        starts_at__lt=max(end for _, end in windows),
+        ends_at__gt=min(start for start, _ in windows)
+    ).values_list('worker_id', 'starts_at', 'ends_at'):
+        busy[worker_id].append((starts_at, ends_at))
+
+    assignments = []
+    unassigned = []
+    for booking, (starts_at, ends_at) in zip(bookings, windows):
+        distances = {}
+        for worker_id in qualified.get(booking.service_id, ()):
+            if overlaps(busy[worker_id], starts_at, ends_at):
+                continue
+            distance = booking_distance(booking, workers[worker_id])
+            if distance is None or distance <= settings.WORKER_MATCH_RADIUS_KM:
+                distances[worker_id] = distance
+        if not distances:
+            unassigned.append(booking)
+            continue
+        best = min(distances, key=lambda worker_id: (
+            distances[worker_id] is None, distances[worker_id] or 0,
+            -(ratings.get(worker_id) or 0), load.get(worker_id, 0), worker_id))
+        busy[best].append((starts_at, ends_at))
+        load[best] = load.get(best, 0) + 1
+        assignments.append((booking, workers[best]))
+    return assignments, unassigned
+
+
+def apply_plan(assignments):
+    """
+    Write a plan in one transaction and notify the assigned workers.
+
+    Bookings that stopped being PENDING since the plan was made are skipped.
+    Returns the list of (booking, worker) pairs actually written.
+    """
+    if not assignments:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        still_pending = set(Booking.objects.select_for_update().filter(
+            id__in=[booking.id for booking, _ in assignments],
+            status='PENDING', worker__isnull=True
+        ).values_list('id', flat=True))
+        applied = [(booking, worker) for booking, worker in assignments if booking.id in still_pending]
+
+        for booking, worker in applied:
+            booking.worker = worker
+            booking.status = 'ASSIGNED'
+            booking.updated_at = now
+            booking._loaded_status = 'ASSIGNED'
+        # bulk_update skips save(), so the busy slots and rollup are written here too
+        Booking.objects.bulk_update(
+            [booking for booking, _ in applied], ['worker', 'status', 'updated_at'], batch_size=500)
+        bookings_moved([
+            (booking.created_at, booking.service.category, 'PENDING') for booking, _ in applied
+        ], 'ASSIGNED')
+        slots = []
+        for booking, worker in applied:
+            starts_at, ends_at = booking_window(booking)
+            slots.append(WorkerBusySlot(
+                booking_id=booking.id, worker_id=worker.id, starts_at=starts_at, ends_at=ends_at))
+        WorkerBusySlot.objects.bulk_create(slots, batch_size=500)
+
+        notifications = []
+        for booking, worker in applied:
+            notifications.extend(build_notifications(
+                [worker.user_id],
+                title='New Booking Assigned',
+                message=f'You have been assigned a new booking #{booking.id} for {booking.service.name} on {booking.date} at {booking.time_slot}.',
+                notification_type='ASSIGNMENT'
+            ))
+        save_notifications(notifications)
+    return applied
+
+
+def serialize_plan_entry(booking, worker):
+    distance = booking_distance(booking, worker)
+    return {
+        'booking_id': booking.id,
+        'service_name': booking.service.name,
+        'scheduled_start': booking.scheduled_start,
+        'worker_id': worker.id,
+        'worker_username': worker.user.username,
+        'distance_km': round(distance, 2) if distance is not None else None
+    }
+
+
+def auto_assign(starts_from, starts_before, dry_run=False):
+    """
+    Assign every PENDING booking starting within the window.
+
+    With dry_run the plan is only computed and returned. The result holds
+    the proposed or applied assignments, the ids of bookings left pending
+    and how long the matching took.
+    """
+    started = time.perf_counter()
+    assignments, unassigned = plan_assignments(pending_bookings(starts_from, starts_before))
+    matching_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    if not dry_run:
+        applied = apply_plan(assignments)
+        applied_ids = {booking.id for booking, _ in applied}
+        unassigned += [booking for booking, _ in assignments if booking.id not in applied_ids]
+        assignments = applied
+
+    return {
+        'dry_run': dry_run,
+        'assignments': [serialize_plan_entry(booking, worker) for booking, worker in assignments],
+        'unassigned': [booking.id for booking in unassigned],
+        'matching_ms': matching_ms
+    }
@@ -0,0 +1,181 @@
+"""
+Token authentication that resolves the user and profile from a cache.
+
+DRF's TokenAuthentication queries the token and user on every request and
+most views then load the profile again to check the role. Here a token key
+maps to a user id, and a user id to the user and profile rows. The rows
+are kept in two tiers like the admin registry: a copy in this process
+trusted for LOCAL_TTL seconds, backed by Django's cache shared by all
+processes. The token mapping is only kept in the shared cache, under a
+SHA-256 digest of the key so the cache never holds usable credentials,
+so a deleted token stops working in every process at once. A miss costs
+one query joining token, user and profile.
+
+Signal handlers in core.signals invalidate a token when it is deleted, as
+logout does, and a user whenever the user or profile is saved, which covers
+approval and role changes. Invalidation leaves a short-lived marker in the
+shared cache instead of deleting the entry, and entries are only filled
+with cache.add(), so a request that read the rows just before the change
+cannot put them back. Other processes see a user change once their local
+copy expires.
+"""
+import hashlib
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+TOKEN_KEY = 'core:auth:token:{}'
+USER_KEY = 'core:auth:user:{}'
+CACHE_TIMEOUT = 5 * 60
+LOCAL_TTL = 5
+LOCAL_MAX_ENTRIES = 10000
+# Long enough to outlive any request that read the rows before an invalidation
+STALE_TIMEOUT = 10
+STALE = 'stale'
+
+# The password hash stays out of the shared cache and last_login out of the
+# invalidation path; both are deferred and load on access
+USER_FIELDS = [
+    field.attname for field in User._meta.concrete_fields
+    if field.attname not in ('password', 'last_login')
+]
+PROFILE_FIELDS = [field.attname for field in UserProfile._meta.concrete_fields]
+
+_lock = threading.Lock()
+_local = {}
+
+
+def token_cache_key(key):
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def _get(key, shared_only=False):
+    """
+    Cached value from either tier, or None on a miss or after invalidation.
+    With shared_only the local tier is neither read nor filled.
+    """
+    if not shared_only:
+        entry = _local.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            return entry[0]
+    value = cache.get(key)
+    if value is None or value == STALE:
+        return None
+    if not shared_only:
+        _set_local(key, value)
+    return value
+
+
+def _set_local(key, value):
+    with _lock:
+        if len(_local) >= LOCAL_MAX_ENTRIES:
+            _local.clear()
+        _local[key] = (value, time.monotonic() + LOCAL_TTL)
+
+
+def _fill(key, value, shared_only=False):
+    # add() leaves a newer value or an invalidation marker in place
+    if cache.add(key, value, CACHE_TIMEOUT) and not shared_only:
+        _set_local(key, value)
+
+
+def _invalidate(key):
+    with _lock:
+        _local.pop(key, None)
+    cache.set(key, STALE, STALE_TIMEOUT)
+
+
+def invalidate_token(key):
+    """
+    Forget a token so the next request using it is checked against the database
+    """
+    _invalidate(token_cache_key(key))
+
+
+def invalidate_user(user_id):
+    """
+    Forget a user's cached user and profile rows.
+
+    Call this after changing users or profiles with QuerySet.update(), which
+    does not send the save signals core.signals listens to.
+    """
+    _invalidate(USER_KEY.format(user_id))
+
+
+def clear_local_cache():
+    """
+    Drop this process's copies; the shared tier is left alone
+    """
+    with _lock:
+        _local.clear()
+
+
+def load_token(key):
+    """
+    The user id and the (user row, profile row) pair a token belongs to
+    """
+    try:
+        token = Token.objects.select_related('user', 'user__userprofile').get(key=key)
+    except Token.DoesNotExist:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    user = token.user
+    try:
+        profile = user.userprofile
+    except UserProfile.DoesNotExist:
+        profile = None
+    rows = (
+        tuple(getattr(user, name) for name in USER_FIELDS),
+        tuple(getattr(profile, name) for name in PROFILE_FIELDS) if profile else None,
+    )
+    return user.id, rows
+
+
+def build_user(key, rows):
+    """
+    A User with its profile and token attached, built without a query
+    """
+    user_row, profile_row = rows
+    db = router.db_for_read(User)
+    user = User.from_db(db, USER_FIELDS, user_row)
+    profile = None
+    if profile_row is not None:
+        profile = UserProfile.from_db(db, PROFILE_FIELDS, profile_row)
+        UserProfile.user.field.set_cached_value(profile, user)
+    # A None here makes user.userprofile raise DoesNotExist without a query
+    User.userprofile.related.set_cached_value(user, profile)
+
+    token = Token(key=key, user_id=user.id)
+    token._state.adding = False
+    token._state.db = db
+    Token.user.field.set_cached_value(token, user)
+    User.auth_token.related.set_cached_value(user, token)
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication served from the two-tier cache, with
+    request.user.userprofile already loaded
+    """
+
+    def authenticate_credentials(self, key):
+        user_id = _get(token_cache_key(key), shared_only=True)
+        rows = _get(USER_KEY.format(user_id)) if user_id is not None else None
+        if rows is None:
+            user_id, rows = load_token(key)
+            _fill(token_cache_key(key), user_id, shared_only=True)
+            _fill(USER_KEY.format(user_id), rows)
+
+        user, token = build_user(key, rows)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
@@ -0,0 +1,145 @@
+"""
+Worker availability for booking assignment.
+
+WorkerBusySlot holds one row per active booking with an assigned worker.
+sync_busy_slot() keeps it in step on every booking save (see core.signals),
+which covers assignment, rejection, cancellation and completion.
+
+nearest_available_workers() narrows the candidates to the grid cells around
+a located booking (see core.geo), widening the search ring by ring until
+nothing outside it could be nearer than the workers already found.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Exists, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .geo import distance_km, ring_cells, ring_clearance_km, rings_within_km
+from .models import RatingReview, UserProfile, WorkerBusySlot
+
+# Booking statuses during which the assigned worker is committed to the slot
+ACTIVE_STATUSES = ('ASSIGNED', 'CONFIRMED', 'REACHED', 'IN_PROGRESS', 'DELAYED')
+
+# Length assumed for single-time slots such as "12:00"
+DEFAULT_SLOT_LENGTH = timedelta(hours=2)
+
+
+def booking_window(booking):
+    """
+    (start, end) of a booking, or (None, None) if its slot cannot be parsed
+    """
+    if booking.scheduled_start is None:
+        return None, None
+    return booking.scheduled_start, booking.scheduled_end or booking.scheduled_start + DEFAULT_SLOT_LENGTH
+
+
+def sync_busy_slot(booking):
+    """
+    Add, move or remove the busy slot of a booking to match its current state
+    """
+    starts_at, ends_at = booking_window(booking)
+    if booking.worker_id and booking.status in ACTIVE_STATUSES and starts_at:
+        WorkerBusySlot.objects.update_or_create(
+            booking_id=booking.id,
+            defaults={'worker_id': booking.worker_id, 'starts_at': starts_at, 'ends_at': ends_at}
+        )
+    else:
+        WorkerBusySlot.objects.filter(booking_id=booking.id).delete()
+
+
+def overlapping_slots(starts_at, ends_at, exclude_booking_id=None):
+    """
+    Busy slots that intersect [starts_at, ends_at)
+    """
+    slots = WorkerBusySlot.objects.filter(starts_at__lt=ends_at, ends_at__gt=starts_at)
+    if exclude_booking_id is not None:
+        slots = slots.exclude(booking_id=exclude_booking_id)
+    return slots
+
+
+def is_worker_free(worker, booking):
+    """
+    Whether the worker has no other active booking overlapping this one
+    """
+    starts_at, ends_at = booking_window(booking)
+    if starts_at is None:
+        return True
+    return not overlapping_slots(starts_at, ends_at, booking.id).filter(worker=worker).exists()
+
+
+def available_workers(booking):
+    """
+    Approved workers qualified for the booking's service and free at its time,
+    ranked by average rating and then by how few active bookings they hold.
+
+    Qualification, availability, rating and load are resolved in one query.
+    """
+    workers = UserProfile.objects.filter(
+        role='WORKER', is_approved=True, services=booking.service_id
+    ).select_related('user')
+
+    starts_at, ends_at = booking_window(booking)
+    if starts_at is not None:
+        workers = workers.exclude(Exists(
+            overlapping_slots(starts_at, ends_at, booking.id).filter(worker=OuterRef('pk'))
+        ))
+
+    rating = RatingReview.objects.filter(worker=OuterRef('pk')).values('worker').annotate(
+        value=Avg('rating')).values('value')
+    load = WorkerBusySlot.objects.filter(worker=OuterRef('pk')).values('worker').annotate(
+        value=Count('booking')).values('value')
+
+    return workers.annotate(
+        average_rating=Coalesce(Subquery(rating, output_field=FloatField()), Value(0.0)),
+        active_bookings=Coalesce(Subquery(load, output_field=IntegerField()), Value(0)),
+    ).order_by('-average_rating', 'active_bookings', 'id')
+
+
+def candidate_order(worker):
+    return (worker.distance_km is None, worker.distance_km or 0,
+            -worker.average_rating, worker.active_bookings, worker.id)
+
+
+def nearest_available_workers(booking, limit=None, max_km=None):
+    """
+    available_workers() nearest first, each with a distance_km attribute.
+
+    For a located booking only the grid cells around it are read, one query
+    per widening of the search, and workers further than max_km (default
+    WORKER_MATCH_RADIUS_KM) are left out. Workers without a location come
+    last with distance_km None, as do all workers for an unlocated booking.
+    """
+    if max_km is None:
+        max_km = settings.WORKER_MATCH_RADIUS_KM
+    candidates = available_workers(booking)
+
+    found = []
+    if booking.latitude is not None and booking.longitude is not None:
+        latitude, longitude = booking.latitude, booking.longitude
+        searched = -1
+        rings = 0
+        max_rings = rings_within_km(latitude, max_km)
+        while True:
+            for worker in candidates.filter(
+                    geo_cell__in=ring_cells(latitude, longitude, searched + 1, rings)):
+                worker.distance_km = distance_km(latitude, longitude, worker.latitude, worker.longitude)
+                if worker.distance_km <= max_km:
+                    found.append(worker)
+            searched = rings
+            found.sort(key=candidate_order)
+            clearance = ring_clearance_km(latitude, rings)
+            if limit and len(found) >= limit and found[limit - 1].distance_km <= clearance:
+                break
+            if clearance >= max_km or rings >= max_rings:
+                break
+            rings = min(rings * 2 + 1, max_rings)
+        found = found[:limit]
+        candidates = candidates.filter(geo_cell='')
+
+    if limit is None or len(found) < limit:
+        unlocated = candidates[:limit - len(found)] if limit else candidates
+        for worker in unlocated:
+            worker.distance_km = None
+            found.append(worker)
+    return found
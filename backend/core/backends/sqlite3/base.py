@@ -0,0 +1,76 @@
+"""
+SQLite backend for serving production traffic from a single database file.
+
+Enabled by SQLITE_PRODUCTION_MODE (see settings). On top of Django's own
+sqlite3 backend it:
+
+- sets pragmas on every new connection: WAL journaling so readers and the
+  writer no longer block each other, synchronous=NORMAL (safe with WAL, only
+  the last commits can be lost on power failure), a busy timeout, a memory
+  map and a larger page cache;
+- opens atomic() transactions with BEGIN IMMEDIATE, taking the write lock up
+  front. A deferred transaction that reads and then writes cannot wait for
+  the lock when another connection wrote in between, and fails with
+  "database is locked" whatever the busy timeout;
+- retries a BEGIN IMMEDIATE that still finds the database locked after the
+  busy timeout, backing off exponentially with jitter. Nothing has run in
+  the transaction yet, so the retry is always safe.
+
+Every pragma can be overridden through OPTIONS['pragmas'], and the retries
+through OPTIONS['begin_retries'] and OPTIONS['retry_backoff'] (seconds).
+"""
+import random
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative sizes are in KiB: 64 MB per connection
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+BEGIN_RETRIES = 5
+RETRY_BACKOFF = 0.05
+
+
+def is_locked(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pragmas = DEFAULT_PRAGMAS
+    begin_retries = BEGIN_RETRIES
+    retry_backoff = RETRY_BACKOFF
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Options of this backend, which sqlite3.connect() would reject
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.begin_retries = params.pop('begin_retries', BEGIN_RETRIES)
+        self.retry_backoff = params.pop('retry_backoff', RETRY_BACKOFF)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        """
+        Start a transaction holding the write lock, retrying while it is taken
+        """
+        for attempt in range(self.begin_retries + 1):
+            try:
+                self.cursor().execute('BEGIN IMMEDIATE')
+                return
+            except OperationalError as e:
+                if attempt == self.begin_retries or not is_locked(e):
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5))
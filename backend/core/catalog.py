@@ -0,0 +1,116 @@
+"""
+Version stamp and shared response cache for the public service catalog.
+
+service_list and service_details derive strong ETags from the stamp, so a
+client revalidating with If-None-Match gets a 304 without the view touching
+the database. The stamp lives in Django's cache and is bumped by the
+handlers in core.signals whenever a service is saved or deleted or a
+rating is added. Use a shared cache (CACHE_URL) when running more than one
+process, or a bump in one process will not reach the others.
+
+Serialized payloads are cached under the same stamp by cached_payload().
+Only one request rebuilds an expired entry; the rest keep serving the
+expired copy meanwhile, or wait for the rebuild when the stamp has moved
+and the old copy is no longer valid.
+"""
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY = 'core:catalog_version'
+PAYLOAD_KEY = 'core:catalog:{name}'
+LOCK_KEY = 'core:catalog:{name}:lock'
+# How often a request waiting on another's rebuild checks for the result
+WAIT_INTERVAL = 0.05
+
+
+def get_catalog_version():
+    """
+    Current catalog version, starting a new one if the cache has none
+    """
+    version = cache.get(CACHE_KEY)
+    if version is None:
+        # A fresh stamp after eviction only costs clients one full response
+        cache.add(CACHE_KEY, time.time_ns(), None)
+        version = cache.get(CACHE_KEY, time.time_ns())
+    return version
+
+
+def bump_catalog_version():
+    """
+    Start a new catalog version once the current transaction commits.
+
+    Bumping after commit keeps a concurrent reader from pairing the new
+    version with data from before the change.
+    """
+    def bump():
+        cache.set(CACHE_KEY, max(time.time_ns(), cache.get(CACHE_KEY, 0) + 1), None)
+    transaction.on_commit(bump)
+
+
+def catalog_etag(request, service_id=None):
+    """
+    Strong ETag for a catalog response, or None for unsafe methods so
+    writes are not answered from the stamp
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if service_id is None:
+        return f'"catalog-{get_catalog_version()}"'
+    return f'"service-{service_id}-{get_catalog_version()}"'
+
+
+def _store(key, version, payload):
+    fresh_for = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+    cache.set(key, {
+        'version': version,
+        'payload': payload,
+        'fresh_until': time.time() + fresh_for
+    }, fresh_for * 10)
+    return payload
+
+
+def cached_payload(name, build):
+    """
+    The cached payload called name for the current catalog version.
+
+    build() is called to produce it on a miss, by one request at a time:
+    whoever takes the rebuild lock builds and stores it, while the others
+    return the expired copy if it is still for the current version, or
+    poll until the new one is stored. If the builder never finishes, the
+    waiters build it themselves once the lock times out.
+    """
+    version = get_catalog_version()
+    key = PAYLOAD_KEY.format(name=name)
+    entry = cache.get(key)
+    current = entry is not None and entry['version'] == version
+    if current and time.time() < entry['fresh_until']:
+        return entry['payload']
+
+    lock_key = LOCK_KEY.format(name=name)
+    lock_timeout = getattr(settings, 'CATALOG_REBUILD_LOCK_TIMEOUT', 10)
+    # A slow builder whose lock timed out must not release the next holder's
+    lock_token = secrets.token_hex(16)
+    if cache.add(lock_key, lock_token, lock_timeout):
+        try:
+            return _store(key, version, build())
+        finally:
+            if cache.get(lock_key) == lock_token:
+                cache.delete(lock_key)
+
+    if current:
+        # Expired but not invalidated: serve it while the rebuild runs
+        return entry['payload']
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry['payload']
+        if cache.get(lock_key) is None:
+            break
+    return _store(key, version, build())
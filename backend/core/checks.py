@@ -0,0 +1,22 @@
+"""
+System checks for settings that would quietly break a feature.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def notification_stream_broker(app_configs, **kwargs):
+    """
+    Notifications created by Celery workers only reach open streams through Redis
+    """
+    if (getattr(settings, 'CELERY_BROKER_URL', None)
+            and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False)
+            and getattr(settings, 'NOTIFICATION_STREAM_BROKER', 'memory') != 'redis'):
+        return [Warning(
+            'Celery is configured with the in-process notification stream broker, so '
+            'notifications created by Celery tasks never reach open streams.',
+            hint="Set NOTIFICATION_STREAM_BROKER = 'redis'.",
+            id='core.W001',
+        )]
+    return []
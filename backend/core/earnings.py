@@ -0,0 +1,99 @@
+"""
+Worker earnings summaries computed in the database.
+
+All totals come from one grouped aggregate over the worker's payments,
+bucketed by month, payment method and payment status; the summary is then
+folded together from those few rows in Python.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Booking, Payment
+
+# Most recent payments returned alongside the totals
+RECENT_PAYMENTS = 20
+CENTS = Decimal('0.01')
+
+
+def money(amount):
+    """
+    Format an amount with two decimal places, as the payment payloads do
+    """
+    return str(Decimal(amount).quantize(CENTS))
+
+
+def worker_payments(worker, date_from=None, date_to=None):
+    """
+    Payments for the worker's completed bookings, optionally limited to
+    payments made between date_from and date_to inclusive
+    """
+    payments = Payment.objects.filter(booking__worker=worker, booking__status='COMPLETED')
+    if date_from is not None:
+        payments = payments.filter(created_at__date__gte=date_from)
+    if date_to is not None:
+        payments = payments.filter(created_at__date__lte=date_to)
+    return payments
+
+
+def earnings_summary(worker, date_from=None, date_to=None):
+    """
+    Lifetime, monthly and per-method provider earnings of a worker
+    """
+    payments = worker_payments(worker, date_from, date_to)
+    rows = payments.annotate(month=TruncMonth('created_at')).values(
+        'month', 'payment_method', 'payment_status'
+    ).annotate(amount=Sum('provider_amount'), jobs=Count('id')).order_by()
+
+    total = Decimal('0')
+    pending = Decimal('0')
+    paid_jobs = 0
+    monthly = defaultdict(lambda: {'earnings': Decimal('0'), 'jobs': 0})
+    by_method = defaultdict(lambda: {'earnings': Decimal('0'), 'jobs': 0})
+    for row in rows:
+        if row['payment_status'] != 'SUCCESS':
+            # Failed payments are still owed to the worker
+            pending += row['amount']
+            continue
+        total += row['amount']
+        paid_jobs += row['jobs']
+        for bucket in (monthly[row['month'].strftime('%Y-%m')], by_method[row['payment_method']]):
+            bucket['earnings'] += row['amount']
+            bucket['jobs'] += row['jobs']
+
+    completed = Booking.objects.filter(worker=worker, status='COMPLETED')
+    if date_from is not None:
+        completed = completed.filter(updated_at__date__gte=date_from)
+    if date_to is not None:
+        completed = completed.filter(updated_at__date__lte=date_to)
+
+    recent = payments.filter(payment_status='SUCCESS').select_related(
+        'booking__user', 'booking__service').order_by('-created_at', '-id')[:RECENT_PAYMENTS]
+
+    return {
+        'total_earnings': money(total),
+        'pending_payments': money(pending),
+        'completed_jobs': completed.count(),
+        'paid_jobs': paid_jobs,
+        'monthly': [
+            {'month': month, 'earnings': money(bucket['earnings']), 'jobs': bucket['jobs']}
+            for month, bucket in sorted(monthly.items(), reverse=True)
+        ],
+        'by_payment_method': [
+            {'payment_method': method, 'earnings': money(bucket['earnings']), 'jobs': bucket['jobs']}
+            for method, bucket in sorted(by_method.items())
+        ],
+        'recent_payments': [
+            {
+                'booking_id': payment.booking_id,
+                'user_username': payment.booking.user.username,
+                'service_name': payment.booking.service.name,
+                'amount': str(payment.provider_amount),
+                'payment_method': payment.payment_method,
+                'created_at': payment.created_at
+            }
+            for payment in recent
+        ]
+    }
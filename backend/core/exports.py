@@ -0,0 +1,151 @@
+"""
+Streaming exports of bookings, payments and ratings as CSV or NDJSON.
+
+Rows are read with values_list().iterator(), which uses a server-side
+cursor where the database supports one and fetches EXPORT_CHUNK_SIZE rows
+at a time, and each row is encoded and handed on as soon as it is read.
+Nothing holds more than one chunk, so memory stays flat whatever the size
+of the export. The admin export endpoint and the export_data management
+command both use stream_export().
+
+Under ASGI, Django reads a sync iterator handed to StreamingHttpResponse
+to the end before sending anything, so the endpoint wraps the lines in
+async_lines() there instead.
+"""
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Booking, Payment, RatingReview
+
+EXPORT_CHUNK_SIZE = 2000
+
+# dataset: (model, status field or None, [(column, field path), ...])
+DATASETS = {
+    'bookings': (Booking, 'status', [
+        ('id', 'id'),
+        ('user', 'user__username'),
+        ('service', 'service__name'),
+        ('category', 'service__category'),
+        ('worker', 'worker__user__username'),
+        ('date', 'date'),
+        ('time_slot', 'time_slot'),
+        ('status', 'status'),
+        ('address', 'address'),
+        ('total_amount', 'payment__total_amount'),
+        ('payment_status', 'payment__payment_status'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]),
+    'payments': (Payment, 'payment_status', [
+        ('id', 'id'),
+        ('booking_id', 'booking_id'),
+        ('user', 'booking__user__username'),
+        ('worker', 'booking__worker__user__username'),
+        ('service', 'booking__service__name'),
+        ('total_amount', 'total_amount'),
+        ('admin_commission', 'admin_commission'),
+        ('provider_amount', 'provider_amount'),
+        ('payment_status', 'payment_status'),
+        ('payment_method', 'payment_method'),
+        ('transaction_id', 'transaction_id'),
+        ('created_at', 'created_at'),
+    ]),
+    'ratings': (RatingReview, None, [
+        ('id', 'id'),
+        ('booking_id', 'booking_id'),
+        ('user', 'user__username'),
+        ('worker', 'worker__user__username'),
+        ('service', 'service__name'),
+        ('booking_service', 'booking__service__name'),
+        ('rating', 'rating'),
+        ('review', 'review'),
+        ('created_at', 'created_at'),
+    ]),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    """
+    An unknown dataset or format, or a filter the dataset does not support
+    """
+
+
+def export_rows(dataset, date_from=None, date_to=None, status=None):
+    """
+    Column names and a lazy iterator over matching rows as tuples
+    """
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown dataset {dataset}')
+    model, status_field, columns = DATASETS[dataset]
+
+    rows = model.objects.all()
+    if date_from is not None:
+        rows = rows.filter(created_at__date__gte=date_from)
+    if date_to is not None:
+        rows = rows.filter(created_at__date__lte=date_to)
+    if status is not None:
+        if status_field is None:
+            raise ExportError(f'{dataset} cannot be filtered by status')
+        rows = rows.filter(**{status_field: status})
+
+    rows = rows.order_by('id').values_list(*[path for _, path in columns])
+    return [name for name, _ in columns], rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, for csv.writer
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(dataset, file_format, **filters):
+    """
+    Lines of the export, encoded lazily as the rows are read
+    """
+    if file_format not in FORMATS:
+        raise ExportError(f'Unknown format {file_format}')
+    columns, rows = export_rows(dataset, **filters)
+    if file_format == 'csv':
+        return csv_lines(columns, rows)
+    return ndjson_lines(columns, rows)
+
+
+async def async_lines(lines, batch_size=EXPORT_CHUNK_SIZE):
+    """
+    Async iterator over lines for ASGI servers, joined batch_size lines at a
+    time in the thread the view ran in, so the database cursor behind them
+    stays on its own connection
+    """
+    read = sync_to_async(lambda: ''.join(islice(lines, batch_size)))
+    try:
+        while True:
+            chunk = await read()
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
@@ -0,0 +1,152 @@
+"""
+Locations of bookings and workers from postal codes, and the spatial grid
+used to find nearby workers.
+
+Coordinates are looked up offline in a table of postal code centroids
+shipped as core/data/postal_centroids.csv (postal_code, latitude,
+longitude, place); settings.POSTAL_CENTROIDS_FILE can point at a fuller
+table with the same columns. When no postal code is given, the first
+six-digit PIN in the free-text address is used.
+
+Worker profiles store the grid cell their coordinates fall in. Cells are
+CELL_DEGREES square, so the workers near a point are found by reading the
+cells in rings around it, nearest ring first, instead of measuring the
+distance to every worker. This module has no model imports so migrations
+can use it too.
+"""
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+DEFAULT_CENTROIDS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'postal_centroids.csv')
+POSTAL_CODE_PATTERN = re.compile(r'(?<!\d)(\d{3})\s?(\d{3})(?!\d)')
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# About 5.5 km north to south
+CELL_DEGREES = 0.05
+
+# Fields save() keeps in step on models with a location
+LOCATION_FIELDS = ('postal_code', 'latitude', 'longitude')
+
+
+@lru_cache(maxsize=1)
+def postal_centroids():
+    """
+    {postal_code: (latitude, longitude)} read once per process
+    """
+    path = getattr(settings, 'POSTAL_CENTROIDS_FILE', None) or DEFAULT_CENTROIDS_FILE
+    centroids = {}
+    with open(path, newline='', encoding='utf-8') as source:
+        for row in csv.DictReader(source):
+            centroids[row['postal_code'].strip()] = (float(row['latitude']), float(row['longitude']))
+    return centroids
+
+
+def normalize_postal_code(value):
+    """
+    A six-digit PIN from user input such as "560 034", or '' if there is none
+    """
+    match = POSTAL_CODE_PATTERN.search(value or '')
+    return ''.join(match.groups()) if match else ''
+
+
+def parse_location(data):
+    """
+    (postal_code, latitude, longitude) from request data, None for each one
+    not given. Raises ValueError unless coordinates come as a valid pair.
+    """
+    postal_code = data.get('postal_code')
+    if postal_code is not None:
+        postal_code = normalize_postal_code(str(postal_code))
+    latitude, longitude = data.get('latitude'), data.get('longitude')
+    if latitude in (None, '') and longitude in (None, ''):
+        return postal_code, None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError('latitude and longitude must both be numbers')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('latitude and longitude are out of range')
+    return postal_code, latitude, longitude
+
+
+def fill_location(instance):
+    """
+    Complete an instance's postal code from its address and its coordinates
+    from the postal code centroid. Coordinates already set are kept.
+    """
+    if not instance.postal_code:
+        instance.postal_code = normalize_postal_code(instance.address)
+    if instance.latitude is None or instance.longitude is None:
+        instance.latitude, instance.longitude = postal_centroids().get(
+            instance.postal_code, (None, None))
+
+
+def grid_cell(latitude, longitude):
+    """
+    (row, column) of the grid cell holding a point
+    """
+    return (math.floor((latitude + 90) / CELL_DEGREES),
+            math.floor((longitude + 180) / CELL_DEGREES))
+
+
+def cell_key(latitude, longitude):
+    """
+    Indexed representation of a point's grid cell, '' when unknown
+    """
+    if latitude is None or longitude is None:
+        return ''
+    return '%d:%d' % grid_cell(latitude, longitude)
+
+
+def ring_cells(latitude, longitude, first_ring, last_ring):
+    """
+    Keys of the cells between first_ring and last_ring cells away from a
+    point's cell, inclusive; ring 0 is the cell itself
+    """
+    row, column = grid_cell(latitude, longitude)
+    keys = []
+    for d_row in range(-last_ring, last_ring + 1):
+        for d_column in range(-last_ring, last_ring + 1):
+            if max(abs(d_row), abs(d_column)) >= first_ring:
+                keys.append('%d:%d' % (row + d_row, column + d_column))
+    return keys
+
+
+def ring_clearance_km(latitude, rings):
+    """
+    Lower bound on the distance from a point to anything more than rings
+    cells away from its own cell
+    """
+    height = CELL_DEGREES * KM_PER_DEGREE
+    # Cells narrow away from the equator, so use the width of the cells
+    # furthest from it that the rings reach
+    edge = min(abs(latitude) + (rings + 1) * CELL_DEGREES, 90)
+    width = height * max(math.cos(math.radians(edge)), 0.01)
+    return rings * min(height, width)
+
+
+def rings_within_km(latitude, km):
+    """
+    Fewest rings around a point's cell that hold everything within km of it
+    """
+    rings = math.ceil(km / (CELL_DEGREES * KM_PER_DEGREE))
+    while ring_clearance_km(latitude, rings) < km:
+        rings += 1
+    return rings
+
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    """
+    Great-circle distance between two points, None if either is unknown
+    """
+    if None in (latitude, longitude, other_latitude, other_longitude):
+        return None
+    lat1, lon1, lat2, lon2 = map(math.radians, (latitude, longitude, other_latitude, other_longitude))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
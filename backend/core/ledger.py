@@ -0,0 +1,174 @@
+"""
+Double-entry payout ledger.
+
+post_payment() journals a successful payment as cash in, commission and
+the worker's share, and is called inside the same transaction that saves
+the payment. settle_payouts() claims payable entries no run has settled
+yet, in id order and in chunks, by stamping each with the run in the same
+transaction that creates the run's batches, sums them per worker and pays
+each worker in one batch. An entry that commits after a run has read
+past it keeps a null run and is picked up by the next one. Memory grows
+with the number of workers paid, never with the number of entries.
+WorkerBalance is updated with every journal so balances are a single-row
+read.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import LedgerEntry, PayoutBatch, PayoutRun, WorkerBalance
+
+SETTLEMENT_CHUNK_SIZE = 1000
+
+
+class SettlementConflict(Exception):
+    """
+    Another settlement run claimed some of the same entries first
+    """
+
+
+def adjust_balances(changes):
+    """
+    Apply {worker_id: {field: amount}} to the workers' running balances
+    """
+    if not changes:
+        return
+    WorkerBalance.objects.bulk_create(
+        [WorkerBalance(worker_id=worker_id) for worker_id in changes],
+        ignore_conflicts=True
+    )
+    now = timezone.now()
+    for worker_id, fields in changes.items():
+        WorkerBalance.objects.filter(worker_id=worker_id).update(
+            updated_at=now, **{field: F(field) + amount for field, amount in fields.items()})
+
+
+def payment_entries(payment, worker_id):
+    """
+    Unsaved entries journaling a successful payment
+    """
+    journal = f'payment:{payment.id}'
+    share_account = 'WORKER_PAYABLE' if worker_id else 'UNALLOCATED'
+    return [
+        LedgerEntry(journal=journal, source='PAYMENT', account='CASH',
+                    amount=payment.total_amount),
+        LedgerEntry(journal=journal, source='PAYMENT', account='COMMISSION',
+                    amount=-payment.admin_commission),
+        LedgerEntry(journal=journal, source='PAYMENT', account=share_account,
+                    worker_id=worker_id, amount=-payment.provider_amount),
+    ]
+
+
+def post_payment(payment, worker_id):
+    """
+    Journal a successful payment once and credit the worker's balance.
+
+    Call this inside the transaction that saves the payment.
+    """
+    journal = f'payment:{payment.id}'
+    with transaction.atomic():
+        if LedgerEntry.objects.filter(journal=journal).exists():
+            return False
+        LedgerEntry.objects.bulk_create(payment_entries(payment, worker_id))
+        if worker_id:
+            adjust_balances({worker_id: {
+                'balance': payment.provider_amount,
+                'total_earned': payment.provider_amount,
+            }})
+    return True
+
+
+def unsettled_entries():
+    """
+    Payable entries no settlement run has paid out yet
+    """
+    return LedgerEntry.objects.filter(
+        account='WORKER_PAYABLE', source='PAYMENT', settled_run__isnull=True)
+
+
+def claim_unsettled(run, chunk_size=SETTLEMENT_CHUNK_SIZE):
+    """
+    Stamp payable entries no run has settled yet with run and sum them per
+    worker. Call this inside the transaction that creates run.
+
+    Entries are read in keyset-paginated chunks, so only one chunk and the
+    per-worker totals are held in memory. Rows another run has locked are
+    skipped and left to it. Returns {worker_id: [amount, count]}.
+    """
+    totals = defaultdict(lambda: [Decimal('0'), 0])
+    unsettled = unsettled_entries()
+    cursor = 0
+    while True:
+        chunk = list(unsettled.filter(id__gt=cursor).select_for_update(skip_locked=True).order_by(
+            'id').values_list('id', 'worker_id', 'amount')[:chunk_size])
+        if not chunk:
+            break
+        claimed = unsettled.filter(id__in=[entry_id for entry_id, _, _ in chunk]).update(settled_run=run)
+        if claimed != len(chunk):
+            raise SettlementConflict('Entries being settled were claimed by another run')
+        for _, worker_id, amount in chunk:
+            # Payable entries are credits, so the amount owed is the negation
+            totals[worker_id][0] -= amount
+            totals[worker_id][1] += 1
+        cursor = chunk[-1][0]
+    return totals
+
+
+def settle_payouts(chunk_size=SETTLEMENT_CHUNK_SIZE):
+    """
+    Create a payout batch per worker for everything earned and not yet settled.
+
+    A worker whose entries net to less than zero is not paid and the
+    entries are left unsettled, to be netted against later earnings.
+    Returns the PayoutRun, or None when there was nothing new to settle.
+    Raises SettlementConflict if another run claimed the same entries first.
+    """
+    if not unsettled_entries().exists():
+        return None
+
+    with transaction.atomic():
+        run = PayoutRun.objects.create()
+        totals = claim_unsettled(run, chunk_size)
+        if not totals:
+            run.delete()
+            return None
+
+        carried = [worker_id for worker_id, (amount, _) in totals.items() if amount < 0]
+        if carried:
+            LedgerEntry.objects.filter(settled_run=run, worker_id__in=carried).update(settled_run=None)
+        payable = {worker_id: total for worker_id, total in totals.items() if total[0] > 0}
+
+        run.worker_count = len(payable)
+        run.total_amount = sum((amount for amount, _ in payable.values()), Decimal('0'))
+        run.save(update_fields=['worker_count', 'total_amount'])
+        batches = PayoutBatch.objects.bulk_create([
+            PayoutBatch(run=run, worker_id=worker_id, amount=amount, entry_count=count)
+            for worker_id, (amount, count) in payable.items()
+        ])
+
+        entries = []
+        for batch in batches:
+            journal = f'payout:{batch.id}'
+            entries.append(LedgerEntry(journal=journal, source='PAYOUT', account='WORKER_PAYABLE',
+                                       worker_id=batch.worker_id, amount=batch.amount))
+            entries.append(LedgerEntry(journal=journal, source='PAYOUT', account='CASH',
+                                       amount=-batch.amount))
+        LedgerEntry.objects.bulk_create(entries, batch_size=chunk_size)
+        adjust_balances({
+            batch.worker_id: {'balance': -batch.amount, 'total_paid_out': batch.amount}
+            for batch in batches
+        })
+    return run
+
+
+def worker_balance(worker):
+    """
+    A worker's running balance, or zeros if nothing was ever journaled
+    """
+    try:
+        return WorkerBalance.objects.get(worker=worker)
+    except WorkerBalance.DoesNotExist:
+        return WorkerBalance(worker=worker)
@@ -0,0 +1,122 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+
+MODES = {
+    'default': ('django.db.backends.sqlite3', {}),
+    'production': ('core.backends.sqlite3', settings.SQLITE_PRODUCTION_OPTIONS),
+}
+ACCOUNTS = 10
+
+
+def prepare(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TABLE bench_account (id INTEGER PRIMARY KEY, balance INTEGER NOT NULL)')
+        cursor.execute('CREATE TABLE bench_entry (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                       'account_id INTEGER NOT NULL, amount INTEGER NOT NULL)')
+        cursor.executemany('INSERT INTO bench_account (id, balance) VALUES (%s, 0)',
+                           [(i,) for i in range(ACCOUNTS)])
+
+
+def write_transactions(connection, count, think, results, start):
+    """
+    Read a balance, write it back and journal the change, like a payment,
+    in transactions opened the way atomic() opens them
+    """
+    committed = failed = 0
+    latencies = []
+    start.wait()
+    for _ in range(count):
+        account = random.randrange(ACCOUNTS)
+        began = time.perf_counter()
+        try:
+            connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT balance FROM bench_account WHERE id = %s', [account])
+                balance = cursor.fetchone()[0]
+                time.sleep(think)
+                cursor.execute('UPDATE bench_account SET balance = %s WHERE id = %s', [balance + 1, account])
+                cursor.execute('INSERT INTO bench_entry (account_id, amount) VALUES (%s, 1)', [account])
+            connection.commit()
+            committed += 1
+            latencies.append(time.perf_counter() - began)
+        except OperationalError:
+            connection.rollback()
+            failed += 1
+        finally:
+            connection.set_autocommit(True)
+    connection.close()
+    results.append((committed, failed, latencies))
+
+
+def run_benchmark(mode, threads, transactions, think):
+    """
+    Committed and failed transactions, throughput and p95 latency of
+    concurrent writers against a fresh database file in the given mode
+    """
+    engine, options = MODES[mode]
+    directory = tempfile.mkdtemp()
+    try:
+        connections = ConnectionHandler({'default': {
+            'ENGINE': engine, 'NAME': os.path.join(directory, 'bench.sqlite3'), 'OPTIONS': options,
+        }})
+        prepare(connections['default'])
+        connections['default'].close()
+
+        results = []
+        start = threading.Barrier(threads + 1)
+        # Connections are per thread, so each writer opens its own
+        workers = [
+            threading.Thread(target=lambda: write_transactions(
+                connections['default'], transactions, think, results, start))
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        start.wait()
+        began = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - began
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    committed = sum(result[0] for result in results)
+    latencies = sorted(latency for result in results for latency in result[2])
+    return {
+        'mode': mode,
+        'committed': committed,
+        'failed': sum(result[1] for result in results),
+        'per_second': committed / elapsed if elapsed else 0,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent write throughput of the stock SQLite backend and the '
+            'production SQLite mode on a temporary database file')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--transactions', type=int, default=200,
+                            help='Write transactions per thread')
+        parser.add_argument('--think-ms', type=float, default=1.0,
+                            help='Time spent between the read and the write of each transaction')
+        parser.add_argument('--mode', choices=sorted(MODES), action='append',
+                            help='Only benchmark this mode; may be repeated')
+
+    def handle(self, *args, **options):
+        for mode in options['mode'] or ['default', 'production']:
+            result = run_benchmark(
+                mode, options['threads'], options['transactions'], options['think_ms'] / 1000)
+            self.stdout.write(
+                f"{result['mode']:<10} committed={result['committed']} failed={result['failed']} "
+                f"{result['per_second']:.1f} tx/s p95={result['p95_ms']:.1f} ms")
@@ -0,0 +1,52 @@
+import csv
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from core.onboarding import IMPORT_BATCH_SIZE, WorkerImportError, import_workers
+
+
+class Command(BaseCommand):
+    help = ('Bulk import worker accounts from a CSV or JSON file. Rows need username, password, '
+            'email and phone_number, and may have address, postal_code, specialty and services '
+            "(service ids, ';' separated in CSV or a list in JSON)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'json'],
+                            help='Input format; taken from the file extension by default')
+        parser.add_argument('--approve', action='store_true',
+                            help='Create the workers already approved')
+        parser.add_argument('--processes', type=int,
+                            help='Processes hashing passwords; defaults to the number of CPUs')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def read_rows(self, path, file_format):
+        with open(path, newline='', encoding='utf-8') as source:
+            if file_format == 'csv':
+                return list(csv.DictReader(source))
+            rows = json.load(source)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise CommandError('JSON input must be a list of objects')
+        return rows
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError('Cannot tell the input format; pass --format csv or --format json')
+        try:
+            rows = self.read_rows(path, file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        try:
+            count = import_workers(
+                rows, approve=options['approve'], processes=options['processes'],
+                batch_size=options['batch_size'])
+        except WorkerImportError as e:
+            for error in e.errors:
+                self.stderr.write(error)
+            raise CommandError(f'Nothing imported: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {count} workers'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.analytics import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily booking and revenue rollup used by admin analytics'
+
+    def handle(self, *args, **options):
+        # Bookings or payments changed while this runs may be missed; run it
+        # when traffic is low or run it again afterwards
+        count = rebuild_rollup()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} daily rollup rows'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from core.catalog import bump_catalog_version
+from core.models import RatingReview, Service
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored rating count, sum and star histogram of every service'
+
+    def handle(self, *args, **options):
+        # A rating belongs to its own service, or to its booking's service
+        # when it was created without one
+        rows = RatingReview.objects.annotate(
+            rated_service_id=Coalesce('service_id', 'booking__service_id')
+        ).filter(
+            rated_service_id__isnull=False
+        ).values('rated_service_id').annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{f'star_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+        )
+        aggregates = {row['rated_service_id']: row for row in rows}
+
+        services = list(Service.objects.all())
+        for service in services:
+            row = aggregates.get(service.id, {})
+            service.rating_count = row.get('count', 0)
+            service.rating_sum = row.get('total') or 0
+            for star in range(1, 6):
+                setattr(service, f'rating_{star}_count', row.get(f'star_{star}', 0))
+
+        fields = ['rating_count', 'rating_sum'] + \
+            [f'rating_{star}_count' for star in range(1, 6)]
+        with transaction.atomic():
+            Service.objects.bulk_update(services, fields, batch_size=500)
+            # bulk_update sends no signals, so cached catalog ETags are dropped here
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rating aggregates for {len(services)} services'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Reindex the searchable text of every service and review'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} search documents'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.replicas import replica_database, sync_replica
+
+
+class Command(BaseCommand):
+    help = ('Copy the default SQLite database over the SQLite read replica, '
+            'standing in for replication during local development')
+
+    def handle(self, *args, **options):
+        alias = replica_database()
+        if alias is None:
+            raise CommandError('No read replica configured; set READ_REPLICA_NAME')
+        sync_replica(alias)
+        self.stdout.write(self.style.SUCCESS(f'Copied default to {alias}'))
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:53
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """
+    Aggregate existing ratings as the rebuild_rating_aggregates command does
+    """
+    Service = apps.get_model('core', 'Service')
+    RatingReview = apps.get_model('core', 'RatingReview')
+    rows = RatingReview.objects.annotate(
+        rated_service_id=Coalesce('service_id', 'booking__service_id')
+    ).filter(
+        rated_service_id__isnull=False
+    ).values('rated_service_id').annotate(
+        count=Count('id'),
+        total=Sum('rating'),
+        **{f'star_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    )
+    for row in rows:
+        Service.objects.filter(pk=row['rated_service_id']).update(
+            rating_count=row['count'],
+            rating_sum=row['total'] or 0,
+            **{f'rating_{star}_count': row[f'star_{star}'] for star in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_booking_reached_at_alter_booking_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('core', 'Notification')
+    NotificationCounter = apps.get_model('core', 'NotificationCounter')
+    unread = Notification.objects.filter(is_read=False).values(
+        'user_id').annotate(total=models.Count('id'))
+    NotificationCounter.objects.bulk_create([
+        NotificationCounter(user_id=row['user_id'], unread=row['total'])
+        for row in unread
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0014_service_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0015_notificationcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('BOOKING_STATUS', 'Booking Status'), ('ASSIGNMENT', 'Assignment'), ('OTP', 'OTP'), ('PAYMENT', 'Payment'), ('SYSTEM', 'System'), ('BOOKING_REJECTION', 'Booking Rejection')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
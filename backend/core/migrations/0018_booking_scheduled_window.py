@@ -0,0 +1,86 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:00
+
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import migrations, models
+
+
+def parse_slot_time(value):
+    # Frozen copy of core.scheduling.parse_slot_time
+    parts = value.strip().split()
+    if not parts:
+        return None
+    try:
+        hour, minute = map(int, parts[0].split(':'))
+    except ValueError:
+        return None
+    if len(parts) > 1:
+        am_pm = parts[1].upper()
+        if am_pm == 'PM' and hour != 12:
+            hour += 12
+        elif am_pm == 'AM' and hour == 12:
+            hour = 0
+    try:
+        return time(hour=hour, minute=minute)
+    except ValueError:
+        return None
+
+
+def parse_time_slot(booking_date, time_slot):
+    # Frozen copy of core.scheduling.parse_time_slot; Booking.date is
+    # always a date here
+    if not booking_date or not time_slot:
+        return None, None
+    start_text, _, end_text = time_slot.partition(' - ')
+    start_time = parse_slot_time(start_text)
+    if start_time is None:
+        return None, None
+    start = datetime.combine(booking_date, start_time, tzinfo=dt_timezone.utc)
+    end = None
+    end_time = parse_slot_time(end_text) if end_text else None
+    if end_time is not None:
+        end = datetime.combine(booking_date, end_time, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def backfill_scheduled_window(apps, schema_editor):
+    Booking = apps.get_model('core', 'Booking')
+    batch = []
+    for booking in Booking.objects.only('id', 'date', 'time_slot').iterator(chunk_size=1000):
+        booking.scheduled_start, booking.scheduled_end = parse_time_slot(
+            booking.date, booking.time_slot)
+        batch.append(booking)
+        if len(batch) >= 1000:
+            Booking.objects.bulk_update(batch, ['scheduled_start', 'scheduled_end'])
+            batch = []
+    if batch:
+        Booking.objects.bulk_update(batch, ['scheduled_start', 'scheduled_end'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_status_worker_idx',
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='scheduled_end',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='scheduled_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'scheduled_start'], name='booking_status_start_idx'),
+        ),
+        migrations.RunPython(backfill_scheduled_window, migrations.RunPython.noop),
+    ]
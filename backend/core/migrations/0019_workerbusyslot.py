@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:01
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_busy_slots(apps, schema_editor):
+    Booking = apps.get_model('core', 'Booking')
+    WorkerBusySlot = apps.get_model('core', 'WorkerBusySlot')
+    bookings = Booking.objects.filter(
+        status__in=['ASSIGNED', 'CONFIRMED', 'REACHED', 'IN_PROGRESS', 'DELAYED'],
+        worker__isnull=False, scheduled_start__isnull=False
+    ).values_list('id', 'worker_id', 'scheduled_start', 'scheduled_end')
+    WorkerBusySlot.objects.bulk_create([
+        WorkerBusySlot(
+            booking_id=booking_id, worker_id=worker_id, starts_at=start,
+            ends_at=end or start + timedelta(hours=2))
+        for booking_id, worker_id, start, end in bookings.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_booking_scheduled_window'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerBusySlot',
+            fields=[
+                ('booking', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busy_slot', serialize=False, to='core.booking')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='busy_slots', to='core.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['worker', 'starts_at', 'ends_at'], name='busy_slot_worker_time_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_busy_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:08
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+# Frozen copy of core.analytics.STATUS_FIELDS
+STATUS_FIELDS = {
+    'PENDING': 'bookings_pending',
+    'ASSIGNED': 'bookings_assigned',
+    'CONFIRMED': 'bookings_confirmed',
+    'IN_PROGRESS': 'bookings_in_progress',
+    'REACHED': 'bookings_reached',
+    'COMPLETED': 'bookings_completed',
+    'CANCELLED': 'bookings_cancelled',
+    'DELAYED': 'bookings_delayed',
+}
+
+
+def backfill_rollup(apps, schema_editor):
+    Booking = apps.get_model('core', 'Booking')
+    Payment = apps.get_model('core', 'Payment')
+    DailyRollup = apps.get_model('core', 'DailyRollup')
+    rows = {}
+
+    def row(day, category):
+        if (day, category) not in rows:
+            rows[day, category] = DailyRollup(day=day, category=category)
+        return rows[day, category]
+
+    for entry in Booking.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'service__category', 'status'
+    ).annotate(count=Count('id')).order_by():
+        field = STATUS_FIELDS.get(entry['status'])
+        if field:
+            setattr(row(entry['day'], entry['service__category']), field, entry['count'])
+
+    for entry in Payment.objects.filter(payment_status='SUCCESS').annotate(
+        day=TruncDate('created_at')
+    ).values('day', 'booking__service__category').annotate(
+        count=Count('id'),
+        gross_revenue_sum=Sum('total_amount'),
+        admin_commission_sum=Sum('admin_commission'),
+        provider_amount_sum=Sum('provider_amount')
+    ).order_by():
+        rollup = row(entry['day'], entry['booking__service__category'])
+        rollup.payments = entry['count']
+        rollup.gross_revenue = entry['gross_revenue_sum']
+        rollup.admin_commission = entry['admin_commission_sum']
+        rollup.provider_amount = entry['provider_amount_sum']
+
+    DailyRollup.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_workerbusyslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('bookings_pending', models.IntegerField(default=0)),
+                ('bookings_assigned', models.IntegerField(default=0)),
+                ('bookings_confirmed', models.IntegerField(default=0)),
+                ('bookings_in_progress', models.IntegerField(default=0)),
+                ('bookings_reached', models.IntegerField(default=0)),
+                ('bookings_completed', models.IntegerField(default=0)),
+                ('bookings_cancelled', models.IntegerField(default=0)),
+                ('bookings_delayed', models.IntegerField(default=0)),
+                ('payments', models.IntegerField(default=0)),
+                ('gross_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('admin_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('provider_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'category'), name='daily_rollup_day_category_uniq'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
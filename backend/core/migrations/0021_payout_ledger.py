@@ -0,0 +1,97 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:12
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Journal every successful payment made before the ledger existed
+    """
+    Payment = apps.get_model('core', 'Payment')
+    LedgerEntry = apps.get_model('core', 'LedgerEntry')
+    WorkerBalance = apps.get_model('core', 'WorkerBalance')
+
+    earned = defaultdict(Decimal)
+    entries = []
+    for payment in Payment.objects.filter(payment_status='SUCCESS').select_related('booking').iterator():
+        journal = f'payment:{payment.id}'
+        worker_id = payment.booking.worker_id
+        entries += [
+            LedgerEntry(journal=journal, source='PAYMENT', account='CASH', amount=payment.total_amount),
+            LedgerEntry(journal=journal, source='PAYMENT', account='COMMISSION', amount=-payment.admin_commission),
+            LedgerEntry(journal=journal, source='PAYMENT',
+                        account='WORKER_PAYABLE' if worker_id else 'UNALLOCATED',
+                        worker_id=worker_id, amount=-payment.provider_amount),
+        ]
+        if worker_id:
+            earned[worker_id] += payment.provider_amount
+        if len(entries) >= 3000:
+            LedgerEntry.objects.bulk_create(entries)
+            entries = []
+    LedgerEntry.objects.bulk_create(entries)
+    WorkerBalance.objects.bulk_create([
+        WorkerBalance(worker_id=worker_id, balance=amount, total_earned=amount)
+        for worker_id, amount in earned.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkerBalance',
+            fields=[
+                ('worker', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, primary_key=True, related_name='ledger_balance', serialize=False, to='core.userprofile')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_paid_out', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PayoutBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending transfer'), ('PAID', 'Paid')], default='PENDING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='batches', to='core.payoutrun')),
+                ('worker', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payout_batches', to='core.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('journal', models.CharField(max_length=50)),
+                ('source', models.CharField(choices=[('PAYMENT', 'Payment'), ('PAYOUT', 'Payout')], max_length=10)),
+                ('account', models.CharField(choices=[('CASH', 'Cash'), ('COMMISSION', 'Platform commission'), ('WORKER_PAYABLE', 'Payable to worker'), ('UNALLOCATED', 'Provider share without a worker')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('settled_run', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='settled_entries', to='core.payoutrun')),
+                ('worker', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='core.userprofile')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('account', 'WORKER_PAYABLE'), ('settled_run__isnull', True), ('source', 'PAYMENT')), fields=['id'], name='ledger_unsettled_idx'), models.Index(fields=['journal'], name='ledger_journal_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:22
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE core_searchdocument_fts USING fts5(
+        title, body, content='core_searchdocument', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_insert AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_delete AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_update AFTER UPDATE OF title, body ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_fts_update',
+    'DROP TRIGGER IF EXISTS core_searchdocument_fts_delete',
+    'DROP TRIGGER IF EXISTS core_searchdocument_fts_insert',
+    'DROP TABLE IF EXISTS core_searchdocument_fts',
+]
+POSTGRESQL_INDEX = [
+    """
+    ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX core_searchdocument_vector_idx ON core_searchdocument USING GIN (search_vector)',
+]
+POSTGRESQL_DROP = [
+    'DROP INDEX IF EXISTS core_searchdocument_vector_idx',
+    'ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def backfill_documents(apps, schema_editor):
+    """
+    Index every existing service and review with text
+    """
+    Service = apps.get_model('core', 'Service')
+    RatingReview = apps.get_model('core', 'RatingReview')
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+
+    documents = []
+    for service in Service.objects.iterator():
+        items = service.included_items or ''
+        try:
+            parsed = json.loads(items) if items else []
+            if isinstance(parsed, list):
+                items = ' '.join(str(item) for item in parsed)
+        except ValueError:
+            pass
+        documents.append(SearchDocument(
+            kind='SERVICE', object_id=service.id, service_id=service.id,
+            title=service.name, body=f'{service.description}\n{items}'.strip()))
+
+    for rating in RatingReview.objects.exclude(review='').select_related(
+            'service', 'booking__service').iterator():
+        service = rating.service or (rating.booking.service if rating.booking_id else None)
+        documents.append(SearchDocument(
+            kind='REVIEW', object_id=rating.id, service=service,
+            title=service.name if service else '', body=rating.review))
+
+    # Inserts go through the triggers, so the FTS table fills as well
+    SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_payout_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SERVICE', 'Service'), ('REVIEW', 'Review')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(blank=True, max_length=100)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='core.service')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_object_uniq'),
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_INDEX, 'postgresql': POSTGRESQL_INDEX}),
+            run_for_vendor({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+from core.geo import LOCATION_FIELDS, cell_key, fill_location
+
+
+def backfill_locations(apps, schema_editor):
+    """
+    Locate existing profiles and bookings from the PINs in their addresses
+    """
+    for model_name, fields in (('UserProfile', [*LOCATION_FIELDS, 'geo_cell']),
+                               ('Booking', list(LOCATION_FIELDS))):
+        Model = apps.get_model('core', model_name)
+        batch = []
+        for instance in Model.objects.exclude(address__isnull=True).exclude(address='').only(
+                'id', 'address', *fields).iterator(chunk_size=1000):
+            fill_location(instance)
+            if instance.postal_code == '':
+                continue
+            if model_name == 'UserProfile':
+                instance.geo_cell = cell_key(instance.latitude, instance.longitude)
+            batch.append(instance)
+            if len(batch) >= 1000:
+                Model.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            Model.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='postal_code',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='postal_code',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['geo_cell'], name='profile_geo_cell_idx'),
+        ),
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 
+from .geo import LOCATION_FIELDS, cell_key, fill_location
+from .scheduling import parse_time_slot
+
 
 class UserProfile(models.Model):
     ROLE_CHOICES = [
@@ -23,10 +26,44 @@ class UserProfile(models.Model):
     services = models.ManyToManyField(
         'Service', blank=True, related_name='workers')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Located from the postal code or address when not given, see core.geo
+    postal_code = models.CharField(max_length=10, blank=True, default='')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    # Grid cell of the coordinates, '' when unknown; kept in step by save()
+    geo_cell = models.CharField(max_length=20, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # nearest_available_workers: workers in the cells around a booking
+            models.Index(fields=['geo_cell'], name='profile_geo_cell_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
+    def locate(self):
+        """
+        Fill in missing location fields and the grid cell
+        """
+        fill_location(self)
+        self.geo_cell = cell_key(self.latitude, self.longitude)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so core.signals can tell whether a save changed the role
+        instance._loaded_role = instance.__dict__.get('role')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'address', *LOCATION_FIELDS} & set(update_fields):
+            self.locate()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {*LOCATION_FIELDS, 'geo_cell'}
+        super().save(*args, **kwargs)
+
 
 class Service(models.Model):
     CATEGORY_CHOICES = [
@@ -47,6 +84,15 @@ class Service(models.Model):
         max_length=20, choices=CATEGORY_CHOICES, default='OTHER')
     included_items = models.TextField(
         blank=True, null=True, help_text='JSON array of items included in the service')
+    # Denormalized rating aggregates, kept up to date by record_rating()
+    # and the RatingReview delete signal, and rebuilt from scratch by the rebuild_rating_aggregates command
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -54,16 +100,43 @@ class Service(models.Model):
 
     @property
     def average_rating(self):
-        """Calculate the average rating for this service based on all RatingReview entries"""
-        from django.db.models import Avg
-        # Get ratings directly linked to this service
-        direct_ratings = RatingReview.objects.filter(service=self)
-        # Also get ratings linked through bookings that have this service
-        booking_ratings = RatingReview.objects.filter(booking__service=self)
-        # Combine both querysets and calculate average
-        all_ratings = direct_ratings | booking_ratings
-        result = all_ratings.aggregate(Avg('rating'))
-        return result['rating__avg'] or 0.0
+        """Average rating for this service, read from the stored aggregates"""
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
+
+    @property
+    def rating_histogram(self):
+        """Number of ratings per star, keyed 1 to 5"""
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+
+    def record_rating(self, rating):
+        """
+        Fold a new rating into the stored aggregates with a single UPDATE.
+
+        F() expressions let concurrent reviews for the same service add up
+        correctly without locking the row in Python.
+        """
+        Service.fold_rating(self.pk, rating, 1)
+
+    @staticmethod
+    def fold_rating(service_id, rating, step):
+        """
+        Add (step 1) or take away (step -1) one rating in the stored aggregates
+        """
+        star_field = f'rating_{int(rating)}_count'
+        services = Service.objects.filter(pk=service_id)
+        if step < 0:
+            # A rating the aggregates never counted, e.g. one created before
+            # they existed and not yet rebuilt, must not drive them negative
+            services = services.filter(**{
+                'rating_count__gte': -step, 'rating_sum__gte': -step * int(rating),
+                f'{star_field}__gte': -step})
+        services.update(
+            rating_count=models.F('rating_count') + step,
+            rating_sum=models.F('rating_sum') + step * int(rating),
+            **{star_field: models.F(star_field) + step}
+        )
 
 
 class Booking(models.Model):
@@ -97,10 +170,74 @@ class Booking(models.Model):
     is_rated = models.BooleanField(default=False)
     # Track when the worker reached
     reached_at = models.DateTimeField(null=True, blank=True)
+    # Parsed start and end of date + time_slot, kept in step by save()
+    scheduled_start = models.DateTimeField(null=True, blank=True)
+    scheduled_end = models.DateTimeField(null=True, blank=True)
+    # Located from the postal code or address when not given, see core.geo
+    postal_code = models.CharField(max_length=10, blank=True, default='')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # check_and_mark_delayed_bookings: CONFIRMED bookings past their start
+            models.Index(fields=['status', 'scheduled_start'], name='booking_status_start_idx'),
+            # worker_bookings and slot conflict checks for a worker
+            models.Index(fields=['worker', 'date', 'time_slot'], name='booking_worker_slot_idx'),
+            # user_bookings
+            models.Index(fields=['user', 'id'], name='booking_user_id_idx'),
+            # admin_booking_list keyset pages
+            models.Index(fields=['created_at', 'id'], name='booking_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.user.username} - {self.service.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so core.signals can tell which status a save moved from
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        derived = set()
+        if update_fields is None or {'date', 'time_slot'} & set(update_fields):
+            self.scheduled_start, self.scheduled_end = parse_time_slot(
+                self.date, self.time_slot)
+            derived |= {'scheduled_start', 'scheduled_end'}
+        if update_fields is None or {'address', *LOCATION_FIELDS} & set(update_fields):
+            fill_location(self)
+            derived |= set(LOCATION_FIELDS)
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | derived
+        super().save(*args, **kwargs)
+
+
+class WorkerBusySlot(models.Model):
+    """
+    Availability index: the time a worker is committed to an active booking.
+
+    Rows are written by core.availability whenever a booking is saved, so
+    finding free workers for a slot is an indexed overlap lookup instead of
+    a scan over every booking of every worker.
+    """
+    booking = models.OneToOneField(
+        Booking, on_delete=models.CASCADE, primary_key=True, related_name='busy_slot')
+    worker = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name='busy_slots')
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['worker', 'starts_at', 'ends_at'], name='busy_slot_worker_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.worker.user.username} busy {self.starts_at} - {self.ends_at}"
+
 
 class OTP(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -111,6 +248,12 @@ class OTP(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # worker_verify_otp looks up the unverified code for a booking
+            models.Index(fields=['user', 'booking', 'code', 'is_verified'], name='otp_lookup_idx'),
+        ]
+
     def __str__(self):
         return f"OTP {self.code} for {self.user.username}"
 
@@ -132,6 +275,20 @@ class RatingReview(models.Model):
     class Meta:
         # Each user can rate a booking only once
         unique_together = ('user', 'booking')
+        # worker= and service= lookups already use the foreign key indexes
+        indexes = [
+            # admin_ratings_list and rating_list keyset pages
+            models.Index(fields=['created_at', 'id'], name='rating_created_id_idx'),
+        ]
+
+    @property
+    def rated_service(self):
+        """The service this rating counts towards, directly or through its booking"""
+        if self.service_id:
+            return self.service
+        if self.booking_id:
+            return self.booking.service
+        return None
 
     def __str__(self):
         return f"Rating {self.rating} by {self.user.username} for {self.worker.user.username if self.worker else 'N/A'}"
@@ -156,10 +313,53 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # get_notifications keyset pages, newest first
+            models.Index(fields=['user', 'created_at', 'id'], name='notification_user_feed_idx'),
+            # unread counts and bulk mark-read
+            models.Index(fields=['user', 'is_read'], name='notification_user_read_idx'),
+            # archive_read_notifications
+            models.Index(fields=['notification_type', 'is_read', 'created_at'],
+                         name='notification_retention_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({'Read' if self.is_read else 'Unread'})"
 
 
+class ArchivedNotification(models.Model):
+    """
+    Read notifications moved out of the hot Notification table by the
+    archive_read_notifications task. Ids are the original notification ids.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_notifications')
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(
+        max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.title} (Archived)"
+
+
+class NotificationCounter(models.Model):
+    """
+    Number of unread notifications per user, kept in step by core.notifications
+    so the unread badge never has to count the notification table.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread} unread"
+
+
 class Payment(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('SUCCESS', 'Success'),
@@ -190,5 +390,177 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so core.signals can tell which status a save moved from
+        instance._loaded_status = instance.__dict__.get('payment_status')
+        return instance
+
     def __str__(self):
         return f"Payment {self.id} for Booking {self.booking.id} - {self.payment_status}"
+
+
+class DailyRollup(models.Model):
+    """
+    Per-day, per-category booking and revenue totals for admin analytics.
+
+    Bookings are counted on the day they were created, under their current
+    status; revenue is counted on the day of each successful payment.
+    core.analytics keeps the rows up to date as bookings and payments
+    change, and the rebuild_daily_rollup command recomputes them.
+    """
+    day = models.DateField()
+    category = models.CharField(max_length=20)
+    bookings_pending = models.IntegerField(default=0)
+    bookings_assigned = models.IntegerField(default=0)
+    bookings_confirmed = models.IntegerField(default=0)
+    bookings_in_progress = models.IntegerField(default=0)
+    bookings_reached = models.IntegerField(default=0)
+    bookings_completed = models.IntegerField(default=0)
+    bookings_cancelled = models.IntegerField(default=0)
+    bookings_delayed = models.IntegerField(default=0)
+    payments = models.IntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    admin_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    provider_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='daily_rollup_day_category_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Rollup {self.day} {self.category}"
+
+
+class PayoutRun(models.Model):
+    """
+    One settlement run. The payable entries it covered point back to it
+    through LedgerEntry.settled_run, so each entry is settled exactly once
+    whatever order entries commit in.
+    """
+    worker_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Payout run {self.id} of {self.total_amount}"
+
+
+class PayoutBatch(models.Model):
+    """
+    The amount one worker is paid in a settlement run
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending transfer'),
+        ('PAID', 'Paid'),
+    ]
+
+    run = models.ForeignKey(
+        PayoutRun, on_delete=models.PROTECT, related_name='batches')
+    worker = models.ForeignKey(
+        UserProfile, on_delete=models.PROTECT, related_name='payout_batches')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    entry_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Payout of {self.amount} to {self.worker.user.username} ({self.status})"
+
+
+class LedgerEntry(models.Model):
+    """
+    One line of the append-only double-entry ledger.
+
+    amount is positive for a debit and negative for a credit, and the
+    entries of each journal (one payment or one payout) sum to zero.
+    Entries are never updated or deleted; corrections are new journals.
+    The one exception is settled_run, stamped on payable entries by the
+    settlement run that pays them out.
+    """
+    ACCOUNT_CHOICES = [
+        ('CASH', 'Cash'),
+        ('COMMISSION', 'Platform commission'),
+        ('WORKER_PAYABLE', 'Payable to worker'),
+        ('UNALLOCATED', 'Provider share without a worker'),
+    ]
+
+    SOURCE_CHOICES = [
+        ('PAYMENT', 'Payment'),
+        ('PAYOUT', 'Payout'),
+    ]
+
+    journal = models.CharField(max_length=50)  # e.g. "payment:12", "payout:3"
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    account = models.CharField(max_length=20, choices=ACCOUNT_CHOICES)
+    worker = models.ForeignKey(UserProfile, on_delete=models.PROTECT,
+                               null=True, blank=True, related_name='ledger_entries')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    settled_run = models.ForeignKey(PayoutRun, on_delete=models.PROTECT,
+                                    null=True, blank=True, related_name='settled_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Settlement streams unsettled payable entries in id order
+            models.Index(fields=['id'], name='ledger_unsettled_idx', condition=models.Q(
+                account='WORKER_PAYABLE', source='PAYMENT', settled_run__isnull=True)),
+            models.Index(fields=['journal'], name='ledger_journal_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ledger entries are append-only')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only')
+
+    def __str__(self):
+        return f"{self.journal} {self.account} {self.amount}"
+
+
+class WorkerBalance(models.Model):
+    """
+    Running totals of what the platform owes each worker, kept in step with
+    the ledger so reading a balance never sums entries
+    """
+    worker = models.OneToOneField(
+        UserProfile, on_delete=models.PROTECT, primary_key=True, related_name='ledger_balance')
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_earned = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_paid_out = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.worker.user.username} balance {self.balance}"
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of one service or review. The full-text index over
+    these rows is created by migration and kept in step by the database
+    """
+    KIND_CHOICES = [
+        ('SERVICE', 'Service'),
+        ('REVIEW', 'Review'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    service = models.ForeignKey(Service, on_delete=models.CASCADE,
+                                null=True, blank=True, related_name='search_documents')
+    title = models.CharField(max_length=100, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
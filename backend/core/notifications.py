@@ -0,0 +1,136 @@
+"""
+Helpers for creating notifications, shared by views and Celery tasks.
+
+Every write goes through this module so the per-user unread counters in
+NotificationCounter stay in step with the Notification table, and so new
+rows are pushed to open notification streams once they are committed.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .admin_registry import get_admin_user_ids
+from .models import Notification, NotificationCounter
+from .streams import publish_notifications
+
+
+def increment_unread(counts):
+    """
+    Add to the unread counters of several users, given {user_id: amount}
+    """
+    if not counts:
+        return
+    # Make sure every recipient has a counter row before updating in place
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in counts],
+        ignore_conflicts=True
+    )
+    # Recipients that received the same number of rows share one UPDATE
+    by_amount = defaultdict(list)
+    for user_id, amount in counts.items():
+        by_amount[amount].append(user_id)
+    for amount, user_ids in by_amount.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=F('unread') + amount)
+
+
+def decrement_unread(user_id, amount):
+    """
+    Subtract from a user's unread counter without going below zero
+    """
+    if amount:
+        NotificationCounter.objects.filter(user_id=user_id).update(
+            unread=Greatest(F('unread') - amount, 0))
+
+
+def get_unread_count(user):
+    """
+    A user's unread notification count, read from their counter row
+    """
+    try:
+        return NotificationCounter.objects.get(user=user).unread
+    except NotificationCounter.DoesNotExist:
+        # First read for this user: seed the counter from the table once
+        unread = Notification.objects.filter(user=user, is_read=False).count()
+        counter, created = NotificationCounter.objects.get_or_create(
+            user=user, defaults={'unread': unread})
+        return counter.unread
+
+
+def mark_read(user, ids=None, before=None):
+    """
+    Mark a user's unread notifications as read with a single UPDATE.
+
+    ids limits the update to those notification ids and before to
+    notifications created at or before that time; with neither, every
+    unread notification is marked. Returns the number of rows changed.
+    """
+    notifications = Notification.objects.filter(user=user, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    if before is not None:
+        notifications = notifications.filter(created_at__lte=before)
+
+    with transaction.atomic():
+        updated = notifications.update(is_read=True)
+        decrement_unread(user.id, updated)
+    return updated
+
+
+def create_notification(user, title, message, notification_type):
+    """
+    Helper function to create a notification
+    """
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            user=user,
+            title=title,
+            message=message,
+            notification_type=notification_type
+        )
+        increment_unread({notification.user_id: 1})
+        transaction.on_commit(lambda: publish_notifications([notification]))
+    return notification
+
+
+def build_notifications(user_ids, title, message, notification_type):
+    """
+    Unsaved copies of one notification, one per recipient
+    """
+    return [
+        Notification(
+            user_id=user_id,
+            title=title,
+            message=message,
+            notification_type=notification_type
+        )
+        for user_id in user_ids
+    ]
+
+
+def save_notifications(notifications):
+    """
+    Write prepared notifications with a single bulk INSERT
+    """
+    if not notifications:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications)
+        increment_unread(Counter(n.user_id for n in notifications))
+        transaction.on_commit(lambda: publish_notifications(created))
+    return created
+
+
+def notify_admins(title, message, notification_type, admin_ids=None):
+    """
+    Send the same notification to every admin with one bulk INSERT.
+
+    Pass admin_ids when the recipients were already resolved, e.g. by a
+    task that notifies admins about many bookings in one run.
+    """
+    if admin_ids is None:
+        admin_ids = get_admin_user_ids()
+    return save_notifications(
+        build_notifications(admin_ids, title, message, notification_type))
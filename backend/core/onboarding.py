@@ -0,0 +1,202 @@
+"""
+Set-based account creation for registration and bulk worker imports.
+
+Service ids are validated with one query and worker-service links are
+written with one bulk insert, instead of a lookup and an add() per service.
+import_workers() creates whole batches of workers: passwords are hashed
+in a process pool, since hashing is deliberately slow and CPU bound, then
+users, profiles, tokens and service links are bulk-created in chunks
+inside one transaction.
+
+bulk_create() sends no save signals. That is safe here because new
+workers are never admins, have no cached authentication rows and have no
+bookings or payments yet.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from .geo import normalize_postal_code
+from .models import Service, UserProfile
+
+IMPORT_BATCH_SIZE = 500
+PHONE_PATTERN = re.compile(r'^\d{10}$')
+REQUIRED_FIELDS = ('username', 'password', 'email', 'phone_number')
+
+
+class WorkerImportError(ValueError):
+    """
+    Rows that cannot be imported, with one message per problem
+    """
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} invalid rows')
+        self.errors = errors
+
+
+def parse_service_ids(value):
+    """
+    Service ids from a single id, a list of ids or a ';' separated string.
+    Values that are not integers are skipped, as registration always has.
+    """
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    ids = []
+    for item in value:
+        try:
+            ids.append(int(item))
+        except (TypeError, ValueError):
+            continue
+    return list(dict.fromkeys(ids))
+
+
+def existing_service_ids(service_ids):
+    """
+    The subset of service_ids that exist, in one query
+    """
+    if not service_ids:
+        return set()
+    return set(Service.objects.filter(id__in=service_ids).values_list('id', flat=True))
+
+
+def link_services(links, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Bulk insert worker-service links given (profile_id, service_id) pairs
+    """
+    Qualification = UserProfile.services.through
+    Qualification.objects.bulk_create([
+        Qualification(userprofile_id=profile_id, service_id=service_id)
+        for profile_id, service_id in links
+    ], batch_size=batch_size, ignore_conflicts=True)
+
+
+def validate_rows(rows):
+    """
+    Check worker rows before anything is hashed or written.
+
+    Returns the rows with their service ids parsed; raises WorkerImportError
+    listing every problem found, including usernames that already exist and
+    unknown services, which are looked up with one query per batch.
+    """
+    errors = []
+    seen = set()
+    cleaned = []
+    for number, row in enumerate(rows, start=1):
+        missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or '').strip()]
+        if missing:
+            errors.append(f'Row {number}: missing {", ".join(missing)}')
+            continue
+        username = str(row['username']).strip()
+        if not PHONE_PATTERN.match(str(row['phone_number'])):
+            errors.append(f'Row {number}: phone number must be exactly 10 digits')
+        if username in seen:
+            errors.append(f'Row {number}: duplicate username {username}')
+        seen.add(username)
+        cleaned.append({
+            'row': number,
+            'username': username,
+            'password': str(row['password']),
+            'email': str(row['email']).strip(),
+            'phone_number': str(row['phone_number']),
+            'address': row.get('address') or None,
+            'postal_code': normalize_postal_code(str(row.get('postal_code') or '')),
+            'specialty': row.get('specialty') or None,
+            'service_ids': parse_service_ids(row.get('services')),
+        })
+
+    usernames = [row['username'] for row in cleaned]
+    service_ids = sorted({service_id for row in cleaned for service_id in row['service_ids']})
+    taken = set()
+    for start in range(0, len(usernames), IMPORT_BATCH_SIZE):
+        taken.update(User.objects.filter(
+            username__in=usernames[start:start + IMPORT_BATCH_SIZE]
+        ).values_list('username', flat=True))
+    known = set()
+    for start in range(0, len(service_ids), IMPORT_BATCH_SIZE):
+        known |= existing_service_ids(service_ids[start:start + IMPORT_BATCH_SIZE])
+
+    for row in cleaned:
+        if row['username'] in taken:
+            errors.append(f'Row {row["row"]}: username {row["username"]} already exists')
+        unknown = [service_id for service_id in row['service_ids'] if service_id not in known]
+        if unknown:
+            errors.append(f'Row {row["row"]}: unknown services {", ".join(map(str, unknown))}')
+
+    if errors:
+        raise WorkerImportError(errors)
+    return cleaned
+
+
+def hash_passwords(passwords, processes=None):
+    """
+    Hash passwords with the default hasher, in parallel unless processes is 1
+    """
+    processes = min(processes or os.cpu_count() or 1, len(passwords))
+    if processes <= 1:
+        return [make_password(password) for password in passwords]
+    # Children set Django up themselves when they are spawned rather than forked
+    with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as pool:
+        chunksize = max(1, len(passwords) // (processes * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_workers(rows, approve=False, processes=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate, hash and bulk-create worker accounts.
+
+    Either every row is imported or none is. Returns the number of workers
+    created; raises WorkerImportError if any row is invalid.
+    """
+    rows = validate_rows(rows)
+    hashes = hash_passwords([row['password'] for row in rows], processes)
+
+    with transaction.atomic():
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            users = User.objects.bulk_create([
+                User(username=row['username'], email=row['email'], password=password)
+                for row, password in zip(chunk, hashes[start:start + batch_size])
+            ])
+            if any(user.pk is None for user in users):
+                # Backends without RETURNING do not set primary keys
+                ids = dict(User.objects.filter(
+                    username__in=[user.username for user in users]
+                ).values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids[user.username]
+
+            profiles = [
+                UserProfile(
+                    user_id=user.pk, phone_number=row['phone_number'], address=row['address'],
+                    postal_code=row['postal_code'], specialty=row['specialty'], role='WORKER',
+                    is_approved=approve)
+                for row, user in zip(chunk, users)
+            ]
+            # bulk_create skips save(), which locates profiles
+            for profile in profiles:
+                profile.locate()
+            profiles = UserProfile.objects.bulk_create(profiles)
+            if any(profile.pk is None for profile in profiles):
+                ids = dict(UserProfile.objects.filter(
+                    user_id__in=[user.pk for user in users]
+                ).values_list('user_id', 'id'))
+                for profile in profiles:
+                    profile.pk = ids[profile.user_id]
+
+            Token.objects.bulk_create([Token(key=Token.generate_key(), user_id=user.pk) for user in users])
+            link_services([
+                (profile.pk, service_id)
+                for row, profile in zip(chunk, profiles)
+                for service_id in row['service_ids']
+            ], batch_size=batch_size)
+    return len(rows)
@@ -0,0 +1,123 @@
+"""
+Keyset (cursor) pagination for the function-based list views.
+
+Pages are ordered by (timestamp, id) and the cursor encodes the last row of
+the previous page, so fetching page N is one indexed range scan no matter
+how deep N is, unlike OFFSET pagination.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
+
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(timestamp, pk):
+    """
+    Opaque cursor pointing just after the row (timestamp, pk)
+    """
+    raw = json.dumps([timestamp.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Inverse of encode_cursor, raises ValueError for malformed cursors
+    """
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        parsed = parse_datetime(timestamp)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if parsed is None or not isinstance(pk, int):
+        raise ValueError('Invalid cursor')
+    return parsed, pk
+
+
+def get_page_size(request):
+    """
+    Page size from the optional ?limit= parameter, capped at MAX_PAGE_SIZE
+    """
+    default = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+    limit = request.query_params.get('limit')
+    if limit is None:
+        return default
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_date_range(params, names=('from', 'to')):
+    """
+    (first, last) dates from the optional YYYY-MM-DD parameters called
+    names, None for each one not given. Raises ValueError naming the first
+    malformed or impossible date, such as 2025-02-30.
+    """
+    dates = []
+    for name in names:
+        value = params.get(name)
+        parsed = None
+        if value:
+            try:
+                parsed = parse_date(value)
+            except ValueError:
+                pass
+            if parsed is None:
+                raise ValueError(f'{name} must be a date in YYYY-MM-DD format')
+        dates.append(parsed)
+    return tuple(dates)
+
+
+def paginate(request, queryset, serialize, order_field='created_at', descending=True):
+    """
+    Return a Response with one keyset page of queryset.
+
+    serialize turns a single object into its payload. The response carries
+    the page under 'results' plus 'next_cursor' and a ready-made 'next' URL,
+    both None on the last page.
+    """
+    try:
+        page_size = get_page_size(request)
+        cursor = request.query_params.get('cursor')
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return Response({'error': 'Invalid cursor or limit'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if descending:
+        ordering = (f'-{order_field}', '-id')
+        after, tie_break = f'{order_field}__lt', 'id__lt'
+    else:
+        ordering = (order_field, 'id')
+        after, tie_break = f'{order_field}__gt', 'id__gt'
+
+    queryset = queryset.order_by(*ordering)
+    if position:
+        timestamp, pk = position
+        queryset = queryset.filter(
+            Q(**{after: timestamp}) | Q(**{order_field: timestamp, tie_break: pk}))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    next_url = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, order_field), last.pk)
+        params = request.query_params.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+    return Response({
+        'results': [serialize(row) for row in rows],
+        'next_cursor': next_cursor,
+        'next': next_url
+    })
@@ -1,43 +1,86 @@
 """
 Custom permission classes for role-based access control.
+
+The caller's role is resolved once per request by request_role() from the
+user's profile, which CachedTokenAuthentication attaches to request.user, so
+a permission check adds no query of its own. Anonymous requests get the
+usual 401; authenticated callers without the role get a 403 with the same
+{'error': ...} body the views return for their other errors.
 """
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import BasePermission
 
-from .models import User
+from .models import UserProfile
+
+
+def request_profile(request):
+    """
+    The authenticated user's profile, loaded at most once per request, or None
+    """
+    if not hasattr(request, '_role_profile'):
+        profile = None
+        if request.user and request.user.is_authenticated:
+            try:
+                profile = request.user.userprofile
+            except UserProfile.DoesNotExist:
+                pass
+        request._role_profile = profile
+    return request._role_profile
+
+
+def request_role(request):
+    """
+    'ADMIN', 'WORKER' or 'USER' for the authenticated user, or None if anonymous.
+    Superusers are admins whatever their profile says, as at login.
+    """
+    if not (request.user and request.user.is_authenticated):
+        return None
+    if request.user.is_superuser:
+        return 'ADMIN'
+    profile = request_profile(request)
+    return profile.role if profile else 'USER'
 
 
-class IsAdminUserRole(BasePermission):
+class RolePermission(BasePermission):
     """
-    Permission class to allow access only to users with ADMIN role.
+    Base class granting access to authenticated users holding one role
     """
+    role = None
+    message = 'Permission denied'
+
+    def has_role(self, request):
+        return request_role(request) == self.role
+
     def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and request.user.role == User.ROLE_ADMIN
-        )
+        if not (request.user and request.user.is_authenticated):
+            return False
+        if not self.has_role(request):
+            raise PermissionDenied({'error': self.message})
+        return True
 
 
-class IsWorkerUserRole(BasePermission):
+class IsAdminUserRole(RolePermission):
+    """
+    Permission class to allow access only to superusers and users with ADMIN role.
+    """
+    role = 'ADMIN'
+    message = 'Only admins can access this endpoint'
+
+
+class IsWorkerUserRole(RolePermission):
     """
     Permission class to allow access only to approved WORKER users.
     """
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and request.user.role == User.ROLE_WORKER
-            and request.user.is_approved
-        )
+    role = 'WORKER'
+    message = 'Only approved workers can access this endpoint'
 
+    def has_role(self, request):
+        return super().has_role(request) and request_profile(request).is_approved
 
-class IsRegularUserRole(BasePermission):
+
+class IsRegularUserRole(RolePermission):
     """
     Permission class to allow access only to regular USER role.
     """
-    def has_permission(self, request, view):
-        return (
-            request.user
-            and request.user.is_authenticated
-            and request.user.role == User.ROLE_USER
-        )
+    role = 'USER'
+    message = 'Only users can access this endpoint'
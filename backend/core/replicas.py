@@ -0,0 +1,147 @@
+"""
+Routing of heavy read-only work to a read replica.
+
+settings.READ_REPLICA_DATABASE names a database alias holding a copy of
+default: a streaming replica in production, or locally a second SQLite file
+refreshed with sync_replica(). ReplicaRouter sends reads there only inside
+read_from_replica(), which the read-only admin list views enter through
+@replica_reads and reporting commands enter directly. A streamed response
+is read after its view has returned, so the admin export wraps its lines
+in replica_iterator() instead. Every other read and every write stays on
+default, so nothing else can see stale rows.
+
+Read-your-writes: ReplicaPinMiddleware pins a user to default for
+READ_REPLICA_PIN_SECONDS after each successful write request they make,
+long enough for the replica to catch up, so a user who just created or
+changed something sees it on the next page. Reads inside a transaction on
+default also stay on default.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_KEY = 'core:replica:pin:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica = ContextVar('read_replica', default=None)
+
+
+def replica_database():
+    """
+    The configured replica alias, or None when reads all go to default
+    """
+    alias = getattr(settings, 'READ_REPLICA_DATABASE', None)
+    return alias if alias and alias in connections.settings else None
+
+
+def pin_to_primary(user_id):
+    """
+    Read from default for a while on behalf of a user who just wrote
+    """
+    cache.set(PIN_KEY.format(user_id), 1, settings.READ_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return user_id is not None and cache.get(PIN_KEY.format(user_id)) is not None
+
+
+@contextmanager
+def read_from_replica(user_id=None):
+    """
+    Route reads in this block to the replica, unless there is none or the
+    user on whose behalf they run is pinned to default
+    """
+    alias = replica_database()
+    token = _replica.set(None if is_pinned(user_id) else alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def replica_reads(view):
+    """
+    Run a read-only view's queries on the replica, below @api_view so the
+    caller is already authenticated
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with read_from_replica(user_id=request.user.pk):
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+def replica_iterator(iterable, user_id=None):
+    """
+    Iterate lazily, reading each item inside read_from_replica(), for
+    results such as streamed exports that are consumed outside the view
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            with read_from_replica(user_id=user_id):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+
+
+def sync_replica(alias=None):
+    """
+    Copy the default SQLite database over a SQLite replica with the online
+    backup API, standing in for replication locally and in tests
+    """
+    alias = alias or replica_database()
+    source, target = connections[DEFAULT_DB_ALIAS], connections[alias]
+    source.ensure_connection()
+    target.ensure_connection()
+    source.connection.backup(target.connection)
+
+
+class ReplicaRouter:
+    """
+    Reads inside read_from_replica() go to the replica, everything else to default
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica.get()
+        if alias and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Rows read from the replica are still saved to default
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A replica gets its schema from the primary
+        return db != replica_database()
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin users to default after their successful write requests
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the user it authenticated onto the Django request
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            pin_to_primary(user.pk)
+        return response
@@ -0,0 +1,62 @@
+"""
+Parsing of booking time slots into timezone-aware datetimes.
+
+Slots come from the frontend either as a 12-hour range such as
+"9:00 AM - 11:00 AM" or as a single 24-hour start time such as "12:00".
+"""
+from datetime import date, datetime, time, timezone as dt_timezone
+
+
+def parse_slot_time(value):
+    """
+    Parse "9:00 AM", "12:30 PM" or "14:00" into a time, or None if malformed
+    """
+    parts = value.strip().split()
+    if not parts:
+        return None
+    try:
+        hour, minute = map(int, parts[0].split(':'))
+    except ValueError:
+        return None
+
+    # Check if AM/PM is present
+    if len(parts) > 1:
+        am_pm = parts[1].upper()
+        if am_pm == 'PM' and hour != 12:
+            hour += 12
+        elif am_pm == 'AM' and hour == 12:
+            hour = 0
+
+    try:
+        return time(hour=hour, minute=minute)
+    except ValueError:
+        return None
+
+
+def parse_time_slot(booking_date, time_slot):
+    """
+    Return (start, end) aware datetimes for a booking date and time slot.
+
+    end is None for single-time slots and both are None when the slot
+    cannot be parsed. Times are taken as UTC, matching how the delayed
+    booking check has always interpreted them.
+    """
+    if not booking_date or not time_slot:
+        return None, None
+    if isinstance(booking_date, str):
+        try:
+            booking_date = date.fromisoformat(booking_date)
+        except ValueError:
+            return None, None
+
+    start_text, _, end_text = time_slot.partition(' - ')
+    start_time = parse_slot_time(start_text)
+    if start_time is None:
+        return None, None
+    start = datetime.combine(booking_date, start_time, tzinfo=dt_timezone.utc)
+
+    end = None
+    end_time = parse_slot_time(end_text) if end_text else None
+    if end_time is not None:
+        end = datetime.combine(booking_date, end_time, tzinfo=dt_timezone.utc)
+    return start, end
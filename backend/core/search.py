@@ -0,0 +1,271 @@
+"""
+Full-text search over services and reviews.
+
+SearchDocument holds the text of every service (name, description and
+included items) and every review. Signal handlers in core.signals rewrite
+a service's or review's document whenever it is saved or deleted, so the
+index is maintained one row at a time instead of being rebuilt.
+
+The index itself lives in the database and is created by migration 0022.
+On SQLite it is an external-content FTS5 table that triggers keep in step
+with SearchDocument, ranked with bm25(). On PostgreSQL it is a stored,
+weighted tsvector column with a GIN index, ranked with ts_rank_cd(). Other
+backends fall back to an unranked icontains scan. Either way a search is
+one index lookup plus one query per kind of result to load the rows.
+
+Results are keyset-paginated on (rank, id) like the list endpoints, so a
+page never re-reads the pages before it.
+"""
+import base64
+import json
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import RatingReview, SearchDocument, Service
+
+FTS_TABLE = 'core_searchdocument_fts'
+# bm25() column weights: a match in the title counts ten times one in the body
+FTS_WEIGHTS = (10.0, 1.0)
+SNIPPET_WORDS = 16
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def included_items_text(value):
+    """
+    Included items stored as a JSON array, flattened to plain text
+    """
+    if not value:
+        return ''
+    try:
+        items = json.loads(value)
+    except ValueError:
+        return value
+    if isinstance(items, list):
+        return ' '.join(str(item) for item in items)
+    return str(items)
+
+
+def index_service(service):
+    """
+    Write a service's document, and the service name on its reviews' documents
+    """
+    SearchDocument.objects.update_or_create(
+        kind='SERVICE', object_id=service.id,
+        defaults={
+            'service': service,
+            'title': service.name,
+            'body': f'{service.description}\n{included_items_text(service.included_items)}'.strip(),
+        })
+    SearchDocument.objects.filter(kind='REVIEW', service=service).exclude(
+        title=service.name).update(title=service.name)
+
+
+def index_review(rating):
+    """
+    Write a review's document, or drop it when the review has no text
+    """
+    if not rating.review.strip():
+        unindex('REVIEW', rating.id)
+        return
+    service = rating.rated_service
+    SearchDocument.objects.update_or_create(
+        kind='REVIEW', object_id=rating.id,
+        defaults={
+            'service': service,
+            'title': service.name if service else '',
+            'body': rating.review,
+        })
+
+
+def unindex(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index():
+    """
+    Reindex every service and review from scratch, e.g. after text was
+    changed with QuerySet.update(), which sends no signals
+    """
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for service in Service.objects.iterator():
+            index_service(service)
+        for rating in RatingReview.objects.exclude(review='').select_related(
+                'service', 'booking__service').iterator():
+            index_review(rating)
+        if connection.vendor == 'sqlite':
+            # Also repairs an FTS table that drifted from its content table
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return SearchDocument.objects.count()
+
+
+def search_terms(query):
+    """
+    Word tokens of a user query; everything else, including operators, is dropped
+    """
+    return TOKEN_PATTERN.findall(query.lower())[:16]
+
+
+def encode_cursor(rank, pk):
+    return base64.urlsafe_b64encode(json.dumps([rank, pk]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Inverse of encode_cursor, raises ValueError for malformed cursors
+    """
+    try:
+        rank, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(rank, (int, float)) or not isinstance(pk, int):
+        raise ValueError('Invalid cursor')
+    return rank, pk
+
+
+def sqlite_hits(terms, kind, after, limit):
+    # Every term must match, each as a prefix so partial words find results
+    match = ' '.join(f'"{term}"*' for term in terms)
+    conditions = []
+    params = [match]
+    if kind:
+        conditions.append('document.kind = %s')
+        params.append(kind)
+    if after:
+        conditions.append('(hits.rank > %s OR (hits.rank = %s AND hits.id > %s))')
+        params += [after[0], after[0], after[1]]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    params.append(limit)
+    sql = f'''
+        SELECT hits.id, document.kind, document.object_id, hits.snippet, hits.rank
+        FROM (
+            SELECT rowid AS id,
+                   snippet({FTS_TABLE}, -1, '', '', '...', {SNIPPET_WORDS}) AS snippet,
+                   bm25({FTS_TABLE}, {FTS_WEIGHTS[0]}, {FTS_WEIGHTS[1]}) AS rank
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+        ) hits
+        JOIN core_searchdocument document ON document.id = hits.id
+        {where}
+        ORDER BY hits.rank, hits.id
+        LIMIT %s
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def postgresql_hits(terms, kind, after, limit):
+    # Terms are plain words, so they can be joined into tsquery syntax safely
+    query = ' & '.join(f'{term}:*' for term in terms)
+    conditions = ['document.search_vector @@ query']
+    params = [query]
+    if kind:
+        conditions.append('document.kind = %s')
+        params.append(kind)
+    keyset = ''
+    if after:
+        keyset = 'WHERE (ranked.rank > %s OR (ranked.rank = %s AND ranked.id > %s))'
+    sql = f'''
+        WITH ranked AS (
+            SELECT document.id, document.kind, document.object_id, document.body, query,
+                   -ts_rank_cd(document.search_vector, query) AS rank
+            FROM core_searchdocument document, to_tsquery('english', %s) query
+            WHERE {' AND '.join(conditions)}
+        ), page AS (
+            SELECT * FROM ranked {keyset} ORDER BY rank, id LIMIT %s
+        )
+        SELECT id, kind, object_id,
+               ts_headline('english', body, query, 'MaxWords={SNIPPET_WORDS}, MinWords=8'),
+               rank
+        FROM page
+        ORDER BY rank, id
+    '''
+    if after:
+        params += [after[0], after[0], after[1]]
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def fallback_hits(terms, kind, after, limit):
+    documents = SearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    if kind:
+        documents = documents.filter(kind=kind)
+    if after:
+        documents = documents.filter(id__gt=after[1])
+    return [
+        (pk, document_kind, object_id, body[:200], 0)
+        for pk, document_kind, object_id, body in documents.order_by('id').values_list(
+            'id', 'kind', 'object_id', 'body')[:limit]
+    ]
+
+
+def find_hits(terms, kind=None, after=None, limit=20):
+    """
+    (document id, kind, object id, snippet, rank) rows best first; lower
+    ranks are better. after is the (rank, id) of the previous page's last row
+    """
+    if connection.vendor == 'sqlite':
+        return sqlite_hits(terms, kind, after, limit)
+    if connection.vendor == 'postgresql':
+        return postgresql_hits(terms, kind, after, limit)
+    return fallback_hits(terms, kind, after, limit)
+
+
+def search(query, kind=None, after=None, limit=20):
+    """
+    One page of ranked search results and the cursor of the next page, or None
+    """
+    terms = search_terms(query)
+    if not terms:
+        return [], None
+    hits = find_hits(terms, kind, after, limit + 1)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1][4], hits[-1][0])
+
+    services = Service.objects.in_bulk(
+        [object_id for _, hit_kind, object_id, _, _ in hits if hit_kind == 'SERVICE'])
+    reviews = RatingReview.objects.select_related(
+        'user', 'service', 'booking__service'
+    ).in_bulk([object_id for _, hit_kind, object_id, _, _ in hits if hit_kind == 'REVIEW'])
+
+    results = []
+    for _, hit_kind, object_id, snippet, rank in hits:
+        if hit_kind == 'SERVICE' and object_id in services:
+            service = services[object_id]
+            results.append({
+                'type': 'service',
+                'id': service.id,
+                'service_id': service.id,
+                'name': service.name,
+                'category': service.category,
+                'price': service.price,
+                'average_rating': service.average_rating,
+                'snippet': snippet,
+                'score': -rank,
+            })
+        elif hit_kind == 'REVIEW' and object_id in reviews:
+            rating = reviews[object_id]
+            service = rating.rated_service
+            results.append({
+                'type': 'review',
+                'id': rating.id,
+                'service_id': service.id if service else None,
+                'service_name': service.name if service else None,
+                'user_username': rating.user.username,
+                'rating': rating.rating,
+                'review': rating.review,
+                'snippet': snippet,
+                'created_at': rating.created_at,
+                'score': -rank,
+            })
+    return results, next_cursor
@@ -0,0 +1,209 @@
+"""
+Shared read helpers for turning model instances into API payloads.
+"""
+import json
+
+from .models import Booking, Payment, RatingReview, UserProfile
+
+
+def booking_queryset(**filters):
+    """
+    Bookings with every relation the list endpoints read loaded in one query.
+
+    user, service, worker.user and the reverse one-to-one payment are all
+    joined, so serializing the rows never goes back to the database.
+    """
+    return Booking.objects.filter(**filters).select_related(
+        'user', 'service', 'worker__user', 'payment'
+    ).order_by('id')
+
+
+def serialize_payment(booking):
+    """
+    Payment payload for a booking, or None if it has not been paid
+    """
+    try:
+        payment = booking.payment
+    except Payment.DoesNotExist:
+        return None
+
+    return {
+        'id': payment.id,
+        'total_amount': str(payment.total_amount),
+        'admin_commission': str(payment.admin_commission),
+        'provider_amount': str(payment.provider_amount),
+        'payment_status': payment.payment_status,
+        'payment_method': payment.payment_method,
+        'transaction_id': payment.transaction_id,
+        'created_at': payment.created_at
+    }
+
+
+def serialize_service_detail(service):
+    """
+    Short service payload embedded in booking responses
+    """
+    return {
+        'id': service.id,
+        'name': service.name,
+        'description': service.description,
+        'price': service.price
+    }
+
+
+def serialize_catalog_service(service):
+    """
+    Service payload for the public service list
+    """
+    # Parse included_items if it exists
+    included_items = []
+    if service.included_items:
+        try:
+            included_items = json.loads(service.included_items)
+        except ValueError:
+            included_items = []
+
+    return {
+        'id': service.id,
+        'name': service.name,
+        'description': service.description,
+        'price': service.price,
+        'estimated_duration': service.estimated_duration,
+        'included_items': included_items,
+        'average_rating': service.average_rating,
+        'rating_count': service.rating_count,
+        'rating_histogram': service.rating_histogram
+    }
+
+
+def serialize_public_service(service):
+    """
+    Service payload for the public service detail page
+    """
+    return {
+        'id': service.id,
+        'name': service.name,
+        'description': service.description,
+        'price': service.price,
+        'estimated_duration': service.estimated_duration,
+        'category': service.category,
+        'average_rating': service.average_rating,
+        'rating_count': service.rating_count,
+        'rating_histogram': service.rating_histogram
+    }
+
+
+def serialize_admin_booking(booking):
+    """
+    Booking payload used by the admin booking list
+    """
+    return {
+        'id': booking.id,
+        'user_username': booking.user.username if booking.user else 'N/A',
+        'service_name': booking.service.name if booking.service else 'N/A',
+        'service_price': booking.service.price if booking.service else 'N/A',
+        'worker_username': booking.worker.user.username if booking.worker and booking.worker.user else 'Not assigned',
+        'date': booking.date,
+        'scheduled_date': booking.date,  # For compatibility with frontend
+        'scheduled_time': booking.time_slot,  # For compatibility with frontend
+        'suggested_date': booking.suggested_date,
+        'suggested_time': booking.suggested_time,
+        'time_slot': booking.time_slot,
+        'status': booking.status,
+        'address': booking.address,
+        'is_rated': booking.is_rated,
+        'created_at': booking.created_at,
+        'updated_at': booking.updated_at,
+        'payment': serialize_payment(booking)
+    }
+
+
+def rating_queryset(**filters):
+    """
+    Ratings with user, worker, service and booking service joined in
+    """
+    return RatingReview.objects.filter(**filters).select_related(
+        'user', 'worker__user', 'service', 'booking__service'
+    )
+
+
+def serialize_rating(rating):
+    """
+    Rating payload shared by the rating list endpoints
+    """
+    # Get service name, with fallback to service from booking if rating doesn't have direct service
+    service_name = rating.service.name if rating.service else None
+    if not service_name and rating.booking and rating.booking.service:
+        service_name = rating.booking.service.name
+
+    return {
+        'id': rating.id,
+        'booking': rating.booking_id,
+        'user': rating.user.username,
+        'user_username': rating.user.username,
+        'worker': rating.worker.user.username if rating.worker else None,
+        'worker_username': rating.worker.user.username if rating.worker else None,
+        'service': service_name,
+        'service_name': service_name,
+        'rating': rating.rating,
+        'review': rating.review,
+        'created_at': rating.created_at
+    }
+
+
+def serialize_notification(notification):
+    """
+    Notification payload for the notification feed
+    """
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at
+    }
+
+
+def serialize_list_user(user):
+    """
+    User payload for the user list, tolerating users without a profile
+    """
+    try:
+        profile = user.userprofile
+    except UserProfile.DoesNotExist:
+        # Users without profiles shouldn't happen in our system, but just in case
+        return {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'role': 'USER'  # Default role
+        }
+
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'phone_number': profile.phone_number,
+        'address': profile.address,
+        'role': profile.role
+    }
+
+
+def serialize_worker_candidate(worker):
+    """
+    Worker payload for the assignment candidate list, read from the
+    annotations added by core.availability.nearest_available_workers
+    """
+    return {
+        'id': worker.id,
+        'user_id': worker.user_id,
+        'username': worker.user.username,
+        'email': worker.user.email,
+        'phone_number': worker.phone_number,
+        'specialty': worker.specialty,
+        'average_rating': round(worker.average_rating, 1),
+        'active_bookings': worker.active_bookings,
+        'postal_code': worker.postal_code,
+        'distance_km': round(worker.distance_km, 2) if worker.distance_km is not None else None
+    }
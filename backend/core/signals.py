@@ -0,0 +1,155 @@
+"""
+Signal handlers that keep denormalized and cached state in step with the models.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import analytics, search
+from .admin_registry import invalidate_after_commit, sync_admin_membership
+from .authentication import invalidate_token, invalidate_user
+from .availability import sync_busy_slot
+from .catalog import bump_catalog_version
+from .models import Booking, Payment, RatingReview, Service, UserProfile
+
+
+def _touches(update_fields, field):
+    return update_fields is None or field in update_fields
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Refresh the admin registry when is_superuser is toggled
+    """
+    # Saves such as login's last_login update cannot change admin status
+    if not _touches(update_fields, 'is_superuser'):
+        return
+    if instance.is_superuser:
+        sync_admin_membership(instance.id, True)
+        return
+    try:
+        is_admin = instance.userprofile.role == 'ADMIN'
+    except UserProfile.DoesNotExist:
+        is_admin = False
+    sync_admin_membership(instance.id, is_admin)
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Refresh the admin registry when a profile role changes
+    """
+    if not _touches(update_fields, 'role'):
+        return
+    loaded_role = getattr(instance, '_loaded_role', None)
+    instance._loaded_role = instance.role
+    # Ordinary profile saves leave the role alone and cost nothing here
+    if not created and loaded_role == instance.role:
+        return
+    if instance.role == 'ADMIN':
+        sync_admin_membership(instance.user_id, True)
+    elif UserProfile.user.is_cached(instance):
+        sync_admin_membership(instance.user_id, instance.user.is_superuser)
+    else:
+        is_superuser = User.objects.filter(pk=instance.user_id).values_list(
+            'is_superuser', flat=True).first()
+        sync_admin_membership(instance.user_id, bool(is_superuser))
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserProfile)
+def admin_candidate_deleted(sender, instance, **kwargs):
+    invalidate_after_commit()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def identity_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop cached authentication rows, e.g. after an approval or role change
+    """
+    # login() only stamps last_login, which is not cached
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_user(instance.id if sender is User else instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Keep the worker availability index and the analytics rollup in step with the booking
+    """
+    sync_busy_slot(instance)
+    if created or _touches(update_fields, 'status'):
+        analytics.booking_saved(instance, created)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    analytics.booking_deleted(instance)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or _touches(update_fields, 'payment_status'):
+        analytics.payment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    analytics.payment_deleted(instance)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, instance, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Reindex a service's searchable text
+    """
+    if any(_touches(update_fields, field) for field in ('name', 'description', 'included_items')):
+        search.index_service(instance)
+
+
+@receiver(post_save, sender=RatingReview)
+def rating_saved(sender, instance, update_fields=None, **kwargs):
+    if any(_touches(update_fields, field) for field in ('review', 'service', 'booking')):
+        search.index_review(instance)
+
+
+@receiver(post_delete, sender=RatingReview)
+def rating_deleted(sender, instance, **kwargs):
+    """
+    Unindex the review and take it out of its service's rating aggregates,
+    also when it goes in a cascade from its booking
+    """
+    search.unindex('REVIEW', instance.id)
+    service_id = instance.service_id
+    if service_id is None and instance.booking_id:
+        # Cascades delete ratings before the booking they hang off
+        service_id = Booking.objects.filter(pk=instance.booking_id).values_list(
+            'service_id', flat=True).first()
+    if service_id is not None:
+        Service.fold_rating(service_id, instance.rating, -1)
+
+
+@receiver(post_save, sender=RatingReview)
+@receiver(post_delete, sender=RatingReview)
+def rating_changed(sender, instance, **kwargs):
+    """
+    Ratings feed the stored aggregates shown in the catalog
+    """
+    bump_catalog_version()
@@ -0,0 +1,353 @@
+"""
+Server-sent event stream of new notifications, served by the ASGI app.
+
+Notification writes publish to a broker once their transaction commits and
+each open stream holds one subscription for its user. The default broker is
+in-process, which is enough when the web server runs a single process
+and no Celery worker creates notifications; the core.W001 system check
+warns when Celery is configured with it. Set NOTIFICATION_STREAM_BROKER =
+'redis' to fan out across processes and Celery workers through Redis
+pub/sub, over one pubsub connection per web process.
+
+Each connection is an async generator parked on a queue, so thousands of
+idle clients cost one event loop rather than one thread each. That only
+holds under ASGI: a WSGI server would tie up a thread per stream forever,
+so there the endpoint answers 501 and clients poll the unread count.
+
+EventSource cannot send an Authorization header, so browsers first POST to
+notifications/stream/ticket/ and open the stream with the single-use
+ticket it returns, which expires after TICKET_SECONDS, rather than putting
+their API token in the URL. A stream ends within HEARTBEAT_SECONDS of its
+token being deleted, as on logout.
+"""
+import asyncio
+import json
+import logging
+import secrets
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+
+from .models import Notification
+from .serializers import serialize_notification
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+RECONNECT_MILLISECONDS = 5000
+# Notifications replayed on reconnect when the client sends Last-Event-ID
+MAX_REPLAY = 100
+TICKET_KEY = 'core:stream:ticket:{}'
+TICKET_SECONDS = 30
+
+
+class InProcessBroker:
+    """
+    Pub/sub between threads of this process and the event loop.
+
+    publish() may be called from any thread (sync views run in a thread
+    pool under ASGI), so messages are handed to each subscriber's loop with
+    call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, user_id, message):
+        self._deliver(user_id, message)
+
+    def _deliver(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.queue.put_nowait, message)
+
+    async def subscribe(self, user_id):
+        subscription = _QueueSubscription(self, user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        self._unsubscribe(subscription)
+
+    def _unsubscribe(self, subscription):
+        """
+        Drop a subscription; True if it was its user's last one
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+                    return True
+        return False
+
+
+class _QueueSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    async def get(self, timeout):
+        """
+        Next message, or None if nothing arrived within timeout seconds
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        await self.broker.unsubscribe(self)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Pub/sub over Redis channels, one channel per user.
+
+    A process holds a single pubsub connection, subscribed to the channels
+    of the users with a stream open in it, and one reader task that hands
+    each message to those streams' queues like the in-process broker.
+    Idle streams therefore cost no Redis connections of their own.
+    """
+    PREFIX = 'notifications:'
+
+    def __init__(self, url):
+        super().__init__()
+        import redis
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        self._pubsub = None
+        self._reader = None
+
+    @classmethod
+    def channel(cls, user_id):
+        return f'{cls.PREFIX}{user_id}'
+
+    def publish(self, user_id, message):
+        self._client.publish(self.channel(user_id), message)
+
+    async def subscribe(self, user_id):
+        subscription = await super().subscribe(user_id)
+        pubsub = self._listen()
+        # Subscribing again to a channel is harmless, so no count is kept
+        await pubsub.subscribe(self.channel(user_id))
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        if self._unsubscribe(subscription) and self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel(subscription.user_id))
+
+    def _listen(self):
+        """
+        The shared pubsub connection, with its reader running on this loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._reader is None or self._reader.done() or self._reader.get_loop() is not loop:
+            import redis.asyncio
+            self._pubsub = redis.asyncio.Redis.from_url(self._url).pubsub()
+            self._reader = loop.create_task(self._read(self._pubsub))
+        return self._pubsub
+
+    async def _read(self, pubsub):
+        while True:
+            if not pubsub.subscribed:
+                # Every stream in this process has closed
+                await asyncio.sleep(1)
+                continue
+            try:
+                item = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # The pubsub reconnects and resubscribes on the next read
+                logger.error(f"Notification stream reader failed: {str(exc)}")
+                await asyncio.sleep(1)
+                continue
+            if item is None:
+                continue
+            channel = item['channel']
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            user_id = int(channel[len(self.PREFIX):])
+            self._deliver(user_id, item['data'].decode())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    The broker configured by NOTIFICATION_STREAM_BROKER, created on first use
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if getattr(settings, 'NOTIFICATION_STREAM_BROKER', 'memory') == 'redis':
+                    _broker = RedisBroker(settings.NOTIFICATION_STREAM_REDIS_URL)
+                else:
+                    _broker = InProcessBroker()
+    return _broker
+
+
+def publish_notifications(notifications):
+    """
+    Push saved notifications to their recipients' open streams.
+
+    Publishing is best effort: a broker failure is logged and never breaks
+    the write that produced the notification.
+    """
+    broker = get_broker()
+    for notification in notifications:
+        if notification.pk is None:
+            continue
+        try:
+            broker.publish(notification.user_id, json.dumps(
+                serialize_notification(notification), cls=DjangoJSONEncoder))
+        except Exception as exc:
+            logger.error(f"Failed to publish notification {notification.pk}: {str(exc)}")
+
+
+def format_event(payload, event_id=None):
+    """
+    One server-sent event frame
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('event: notification')
+    lines.append(f'data: {payload}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def served_over_asgi(request):
+    """
+    Whether a Django or DRF request came in through the ASGI handler
+    """
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def issue_stream_ticket(token):
+    """
+    A random ticket that opens one stream as the token's user
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(TICKET_KEY.format(ticket), (token.user_id, token.key), TICKET_SECONDS)
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """
+    (user id, token key) a ticket was issued for, or None if it is unknown,
+    expired or already used
+    """
+    key = TICKET_KEY.format(ticket)
+    value = cache.get(key)
+    # Only one of two concurrent redemptions gets to delete the ticket
+    if value is None or not cache.delete(key):
+        return None
+    return value
+
+
+async def authenticate_stream(request):
+    """
+    The user and token key for a stream ticket in ?ticket=, or for a DRF
+    token in the Authorization header of clients that can set one
+    """
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Token '):
+        key = header[len('Token '):].strip()
+    else:
+        redeemed = await sync_to_async(redeem_stream_ticket)(request.GET.get('ticket', ''))
+        if redeemed is None:
+            return None, None
+        key = redeemed[1]
+    if not key:
+        return None, None
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None, None
+    return (token.user, key) if token.user.is_active else (None, None)
+
+
+@sync_to_async
+def missed_notifications(user_id, last_id):
+    return list(Notification.objects.filter(
+        user_id=user_id, id__gt=last_id).order_by('id')[:MAX_REPLAY])
+
+
+@sync_to_async
+def token_exists(key):
+    return Token.objects.filter(key=key).exists()
+
+
+async def event_stream(user_id, last_id=None, token_key=None):
+    yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+    loop = asyncio.get_running_loop()
+    recheck_at = loop.time() + HEARTBEAT_SECONDS
+
+    # Subscribe before replaying so nothing published in between is lost
+    subscription = await get_broker().subscribe(user_id)
+    try:
+        if last_id is not None:
+            for notification in await missed_notifications(user_id, last_id):
+                payload = json.dumps(serialize_notification(notification), cls=DjangoJSONEncoder)
+                yield format_event(payload, notification.id)
+                last_id = notification.id
+
+        while True:
+            payload = await subscription.get(HEARTBEAT_SECONDS)
+            if token_key is not None and loop.time() >= recheck_at:
+                if not await token_exists(token_key):
+                    # Logged out or revoked
+                    return
+                recheck_at = loop.time() + HEARTBEAT_SECONDS
+            if payload is None:
+                # Comment frame keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                continue
+            event_id = json.loads(payload).get('id')
+            # Skip anything the replay above already delivered
+            if last_id is not None and event_id is not None and event_id <= last_id:
+                continue
+            yield format_event(payload, event_id)
+    finally:
+        await subscription.close()
+
+
+async def notification_stream(request):
+    """
+    Stream new notifications for the authenticated user as server-sent events
+    """
+    if not served_over_asgi(request):
+        return JsonResponse({'error': 'Notification streams need the ASGI server'}, status=501)
+    user, token_key = await authenticate_stream(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided'}, status=401)
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+
+    response = StreamingHttpResponse(
+        event_stream(user.id, last_id, token_key), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
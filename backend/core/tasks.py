@@ -71,87 +71,61 @@ def check_and_mark_delayed_bookings():
     """
     Periodic task to check for bookings that should have been marked as 'Reached'
     but weren't, and automatically mark them as 'Delayed'
+
+    Overdue bookings are found with one range query on the indexed
+    scheduled_start field and flipped to DELAYED with one bulk UPDATE, so
+    the cost follows the number of late bookings, not all confirmed ones.
     """
+    from django.db import transaction
     from django.utils import timezone
-    from django.contrib.auth.models import User
-    from django.db.models import Q
-    from .models import Notification, Booking
-    from datetime import timedelta, datetime
+    from .admin_registry import get_admin_user_ids
+    from .analytics import bookings_moved
+    from .models import Booking
+    from .notifications import build_notifications, save_notifications
+    from datetime import timedelta
 
     try:
         # Get current time in UTC
         now = timezone.now()
         logger.info(f"Starting delayed booking check at {now}")
 
-        # Only check bookings that are CONFIRMED (ASSIGNED is not a valid status)
-        bookings_to_check = Booking.objects.filter(
+        # Only CONFIRMED bookings with a worker can be late; give a grace
+        # period of 15 minutes after the scheduled start
+        overdue = Booking.objects.filter(
             status='CONFIRMED',
-            worker__isnull=False  # Worker must be assigned
+            worker__isnull=False,  # Worker must be assigned
+            scheduled_start__lt=now - timedelta(minutes=15)
         )
-
-        logger.info(f"Found {bookings_to_check.count()} CONFIRMED bookings to check")
-        delayed_count = 0
-
-        for booking in bookings_to_check:
-            try:
-                # Combine date and time_slot to create a datetime object
-                # time_slot format: "9:00 AM - 11:00 AM" or "12:00" (24-hour)
-                time_slot_start = booking.time_slot.split(' - ')[0].strip()
-                time_parts = time_slot_start.split()
-                time_str = time_parts[0]  # Get the time part like "9:00" or "12:00"
-                
-                # Parse hour and minute
-                hour, minute = map(int, time_str.split(':'))
-                
-                # Check if AM/PM is present
-                if len(time_parts) > 1:
-                    # 12-hour format with AM/PM
-                    am_pm = time_parts[1].upper()
-                    
-                    if am_pm == 'PM':
-                        if hour != 12:
-                            hour += 12
-                    elif am_pm == 'AM':
-                        if hour == 12:
-                            hour = 0
-                
-                # Create a timezone-aware datetime combining the booking date with the scheduled time
-                # Assuming bookings are in the system's default timezone
-                scheduled_time = datetime.min.time().replace(hour=hour, minute=minute)
-                naive_datetime = datetime.combine(booking.date, scheduled_time)
-                
-                # Make it timezone-aware (use UTC for now, can be changed based on user timezone)
-                scheduled_datetime = timezone.make_aware(naive_datetime, timezone.utc)
-
-                # Check if scheduled time has passed and booking hasn't been marked as reached
-                # Give a grace period of 15 minutes
-                if now > scheduled_datetime + timedelta(minutes=15):
-                    logger.info(f"Booking {booking.id} marked as DELAYED. Scheduled: {scheduled_datetime}, Now: {now}")
-                    
-                    # Update booking status to DELAYED
-                    booking.status = 'DELAYED'
-                    booking.save()
-
-                    # Create notification for admin
-                    # Get all admin users (both superusers and users with ADMIN role)
-                    admin_users = User.objects.filter(
-                        Q(is_superuser=True) |
-                        Q(userprofile__role='ADMIN')
-                    ).distinct()
-
-                    for admin_user in admin_users:
-                        Notification.objects.create(
-                            user=admin_user,
-                            title='Booking Delayed - Worker Did Not Reach On Time',
-                            message=f'Worker did not reach on time for booking #{booking.id} ({booking.service.name}). Service is delayed.',
-                            notification_type='SYSTEM'
-                        )
-
-                    delayed_count += 1
-
-            except Exception as e:
-                logger.error(f"Error processing booking {booking.id}: {str(e)}")
-                continue
+        with transaction.atomic():
+            # Lock the rows so none is marked REACHED between reading and
+            # updating them, which would leave the rollup counts off
+            late_bookings = list(overdue.select_for_update(of=('self',)).values_list(
+                'id', 'service__name', 'service__category', 'created_at'))
+            if not late_bookings:
+                logger.info("Checked for delayed bookings. 0 bookings marked as delayed.")
+                return "0 bookings marked as delayed."
+
+            delayed_ids = [booking[0] for booking in late_bookings]
+            delayed_count = Booking.objects.filter(
+                id__in=delayed_ids, status='CONFIRMED'
+            ).update(status='DELAYED', updated_at=now)
+            # QuerySet.update() sends no signals, so report the move to the rollup
+            bookings_moved([
+                (created_at, category, 'CONFIRMED')
+                for _, _, category, created_at in late_bookings
+            ], 'DELAYED')
+
+        # Create notifications for admin with one bulk INSERT
+        admin_ids = get_admin_user_ids()
+        admin_notifications = []
+        for booking_id, service_name, _, _ in late_bookings:
+            admin_notifications.extend(build_notifications(
+                admin_ids,
+                title='Booking Delayed - Worker Did Not Reach On Time',
+                message=f'Worker did not reach on time for booking #{booking_id} ({service_name}). Service is delayed.',
+                notification_type='SYSTEM'
+            ))
+        save_notifications(admin_notifications)
 
         logger.info(f"Checked for delayed bookings. {delayed_count} bookings marked as delayed.")
         return f"{delayed_count} bookings marked as delayed."
@@ -159,3 +133,117 @@ def check_and_mark_delayed_bookings():
     except Exception as exc:
         logger.error(f"Failed to check for delayed bookings: {str(exc)}")
         return f"Failed to check for delayed bookings: {str(exc)}"
+
+
+@shared_task
+def archive_read_notifications(max_batches=None):
+    """
+    Periodic task to move old read notifications into ArchivedNotification.
+
+    How long a read notification stays in the hot table depends on its type,
+    see NOTIFICATION_RETENTION_DAYS. Rows are moved in batches of
+    NOTIFICATION_ARCHIVE_BATCH_SIZE, each in its own short transaction, so
+    the task never holds a long lock on the notification table.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from datetime import timedelta
+    from .models import ArchivedNotification, Notification
+
+    retention = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})
+    batch_size = getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 1000)
+    now = timezone.now()
+    archived_count = 0
+    batches = 0
+
+    try:
+        for notification_type, _ in Notification.NOTIFICATION_TYPES:
+            days = retention.get(notification_type, retention.get('default'))
+            if days is None:
+                # No policy for this type: keep it in the hot table
+                continue
+            expired = Notification.objects.filter(
+                notification_type=notification_type,
+                is_read=True,
+                created_at__lt=now - timedelta(days=days)
+            )
+
+            while max_batches is None or batches < max_batches:
+                with transaction.atomic():
+                    batch = list(expired.order_by('id')[:batch_size])
+                    if not batch:
+                        break
+                    ArchivedNotification.objects.bulk_create([
+                        ArchivedNotification(
+                            id=notification.id,
+                            user_id=notification.user_id,
+                            title=notification.title,
+                            message=notification.message,
+                            notification_type=notification.notification_type,
+                            created_at=notification.created_at
+                        )
+                        for notification in batch
+                    ], ignore_conflicts=True)
+                    Notification.objects.filter(
+                        id__in=[notification.id for notification in batch]).delete()
+                archived_count += len(batch)
+                batches += 1
+
+        logger.info(f"Archived {archived_count} read notifications in {batches} batches.")
+        return f"{archived_count} notifications archived."
+
+    except Exception as exc:
+        logger.error(f"Failed to archive notifications: {str(exc)}")
+        return f"Failed to archive notifications: {str(exc)}"
+
+
+@shared_task
+def auto_assign_pending_bookings(window_hours=None, dry_run=False):
+    """
+    Assign all PENDING bookings starting within the next window_hours
+    (AUTO_ASSIGN_WINDOW_HOURS by default) in one batch
+    """
+    from django.utils import timezone
+    from datetime import timedelta
+    from .assignment import auto_assign
+
+    if window_hours is None:
+        window_hours = getattr(settings, 'AUTO_ASSIGN_WINDOW_HOURS', 24)
+    now = timezone.now()
+
+    try:
+        result = auto_assign(now, now + timedelta(hours=window_hours), dry_run=dry_run)
+        summary = (f"{len(result['assignments'])} bookings {'planned' if dry_run else 'assigned'}, "
+                   f"{len(result['unassigned'])} left pending.")
+        logger.info(f"Auto-assignment: {summary} Matching took {result['matching_ms']} ms.")
+        return summary
+
+    except Exception as exc:
+        logger.error(f"Failed to auto-assign bookings: {str(exc)}")
+        return f"Failed to auto-assign bookings: {str(exc)}"
+
+
+@shared_task
+def settle_worker_payouts():
+    """
+    Periodic task that turns everything workers earned since the last run
+    into one payout batch per worker, reading the ledger in chunks of
+    PAYOUT_SETTLEMENT_CHUNK_SIZE entries
+    """
+    from .ledger import SettlementConflict, settle_payouts
+
+    chunk_size = getattr(settings, 'PAYOUT_SETTLEMENT_CHUNK_SIZE', 1000)
+    try:
+        run = settle_payouts(chunk_size=chunk_size)
+        if run is None:
+            logger.info("No new earnings to settle.")
+            return "0 workers settled."
+        logger.info(f"Payout run {run.id} settled {run.total_amount} for {run.worker_count} workers.")
+        return f"{run.worker_count} workers settled."
+
+    except SettlementConflict as exc:
+        logger.warning(f"Skipped payout settlement: {str(exc)}")
+        return f"Skipped payout settlement: {str(exc)}"
+    except Exception as exc:
+        logger.error(f"Failed to settle worker payouts: {str(exc)}")
+        return f"Failed to settle worker payouts: {str(exc)}"
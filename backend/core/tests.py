@@ -0,0 +1,1710 @@
+import asyncio
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.db.models import QuerySet, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from .admin_registry import get_admin_user_ids, invalidate_admin_registry
+from .analytics import rollup_rows
+from .assignment import auto_assign
+from .authentication import CachedTokenAuthentication, clear_local_cache
+from .exports import export_rows
+from .geo import CELL_DEGREES, KM_PER_DEGREE, cell_key, distance_km, ring_clearance_km
+from .ledger import SettlementConflict, post_payment, settle_payouts
+from .checks import notification_stream_broker
+from .catalog import LOCK_KEY, PAYLOAD_KEY, cached_payload, get_catalog_version
+from .availability import available_workers, is_worker_free, nearest_available_workers
+from .replicas import ReplicaRouter, read_from_replica, sync_replica
+from .models import (
+    UserProfile, Service, Booking, Payment, Notification, ArchivedNotification, OTP, RatingReview,
+    WorkerBusySlot, DailyRollup, LedgerEntry, PayoutBatch, PayoutRun, WorkerBalance, SearchDocument
+)
+from .notifications import notify_admins
+from .scheduling import parse_time_slot
+from .serializers import booking_queryset
+from .streams import RedisBroker, event_stream, get_broker, redeem_stream_ticket
+from .tasks import archive_read_notifications, check_and_mark_delayed_bookings
+
+
+class BookingFixtureMixin:
+    """
+    Users, a worker, a service and helpers to create bookings in bulk
+    """
+
+    def setUp(self):
+        # Cached state outlives each test's rolled-back transaction
+        cache.clear()
+        invalidate_admin_registry()
+        self.client = APIClient()
+        self.admin = User.objects.create_user('admin')
+        UserProfile.objects.create(
+            user=self.admin, phone_number='9000000000', role='ADMIN')
+        self.customer = User.objects.create_user('customer')
+        UserProfile.objects.create(
+            user=self.customer, phone_number='9000000001', role='USER')
+        worker_user = User.objects.create_user('worker')
+        self.worker = UserProfile.objects.create(
+            user=worker_user, phone_number='9000000002', role='WORKER',
+            is_approved=True)
+        self.service = Service.objects.create(
+            name='Plumbing', description='Fix pipes', price=Decimal('500.00'),
+            estimated_duration='1 hour', category='PLUMBING')
+        self.worker.services.add(self.service)
+
+    def create_bookings(self, count, **kwargs):
+        bookings = []
+        for i in range(count):
+            booking = Booking.objects.create(
+                user=kwargs.get('user', self.customer),
+                worker=kwargs.get('worker', self.worker),
+                service=kwargs.get('service', self.service),
+                date=kwargs.get('date', '2026-01-01'),
+                time_slot=kwargs.get('time_slot', '9:00 AM - 11:00 AM'),
+                status=kwargs.get('status', 'COMPLETED'),
+                address='Street 1'
+            )
+            # Pay every other booking so both payment branches are exercised
+            if i % 2 == 0:
+                Payment.objects.create(
+                    booking=booking, total_amount=Decimal('500.00'),
+                    admin_commission=Decimal('100.00'),
+                    provider_amount=Decimal('400.00'),
+                    payment_status='SUCCESS',
+                    transaction_id=f'txn_{booking.id}')
+            bookings.append(booking)
+        return bookings
+
+
+class BookingListQueryCountTests(BookingFixtureMixin, TestCase):
+    """
+    The booking list endpoints must not issue per-row queries
+    """
+
+    MAX_QUERIES = 6
+
+    def count_queries(self, user, url):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assert_constant_queries(self, user, url):
+        self.create_bookings(2)
+        small = self.count_queries(user, url)
+        self.create_bookings(20)
+        large = self.count_queries(user, url)
+        self.assertEqual(small, large, f'{url} query count grows with bookings')
+        self.assertLessEqual(large, self.MAX_QUERIES)
+
+    def test_user_bookings(self):
+        self.assert_constant_queries(self.customer, '/api/bookings/my/')
+
+    def test_worker_bookings(self):
+        self.assert_constant_queries(self.worker.user, '/api/workers/bookings/')
+
+    def test_admin_booking_list(self):
+        self.assert_constant_queries(self.admin, '/api/admin/bookings/')
+
+    def test_admin_payment_list(self):
+        self.assert_constant_queries(self.admin, '/api/admin/payments/')
+        self.create_bookings(1, status='PENDING')
+        data = self.client.get('/api/admin/payments/', {'limit': 100}).data
+        self.assertTrue(all(booking['payment'] for booking in data['results']))
+        self.assertEqual(len(data['results']), Payment.objects.count())
+
+    def test_booking_list(self):
+        self.assert_constant_queries(self.customer, '/api/bookings/')
+
+    def test_payment_payload(self):
+        self.create_bookings(2)
+        self.client.force_authenticate(user=self.customer)
+        data = self.client.get('/api/bookings/my/').json()
+        self.assertEqual(data[0]['payment']['provider_amount'], '400.00')
+        self.assertIsNone(data[1]['payment'])
+
+
+class ServiceRatingAggregateTests(BookingFixtureMixin, TestCase):
+    """
+    Stored rating aggregates stay in step with RatingReview rows
+    """
+
+    def test_rate_booking_updates_aggregates(self):
+        booking = self.create_bookings(1)[0]
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(
+            f'/api/bookings/{booking.id}/rate/', {'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.rating_count, 1)
+        self.assertEqual(self.service.average_rating, 4.0)
+        self.assertEqual(self.service.rating_histogram[4], 1)
+
+    def test_rebuild_command_matches_incremental_updates(self):
+        for booking, stars in zip(self.create_bookings(3), (5, 3, 3)):
+            self.client.force_authenticate(user=self.customer)
+            self.client.post(
+                '/api/ratings/', {'rating': stars, 'booking': booking.id}, format='json')
+        self.service.refresh_from_db()
+        incremental = (self.service.rating_count, self.service.rating_sum,
+                       self.service.rating_histogram)
+
+        Service.objects.update(rating_count=0, rating_sum=0, rating_3_count=0)
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.service.refresh_from_db()
+        self.assertEqual(incremental, (3, 11, {1: 0, 2: 0, 3: 2, 4: 0, 5: 1}))
+        self.assertEqual(incremental, (self.service.rating_count, self.service.rating_sum,
+                                       self.service.rating_histogram))
+
+    def test_deleted_ratings_leave_the_aggregates(self):
+        bookings = self.create_bookings(2)
+        self.client.force_authenticate(user=self.customer)
+        for booking, stars in zip(bookings, (5, 2)):
+            self.client.post(f'/api/bookings/{booking.id}/rate/', {'rating': stars}, format='json')
+
+        RatingReview.objects.get(booking=bookings[0]).delete()
+        # The rating goes with its booking
+        Payment.objects.filter(booking=bookings[1]).delete()
+        bookings[1].delete()
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.rating_count, self.service.rating_sum), (0, 0))
+        self.assertEqual(self.service.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+    def test_catalog_loads_with_one_query(self):
+        Service.objects.create(
+            name='Painting', description='Walls', price=Decimal('900.00'),
+            estimated_duration='4 hours', category='PAINTING')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/services/')
+        self.assertEqual(len(response.json()), 2)
+
+
+class KeysetPaginationTests(BookingFixtureMixin, TestCase):
+    """
+    Cursor pages are stable, complete and equally cheap at any depth
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.admin)
+        notifications = Notification.objects.bulk_create([
+            Notification(user=self.admin, title=f'n{i}', message='m',
+                         notification_type='SYSTEM')
+            for i in range(25)
+        ])
+        # Force timestamp ties so the id tie-breaker is exercised
+        Notification.objects.filter(
+            id__in=[n.id for n in notifications[:10]]
+        ).update(created_at=timezone.now())
+
+    def test_walks_every_row_once(self):
+        seen = []
+        url = '/api/notifications/?limit=7'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        with CaptureQueriesContext(connection) as first:
+            data = self.client.get('/api/notifications/?limit=5').json()
+        for _ in range(3):
+            data = self.client.get(
+                '/api/notifications/', {'limit': 5, 'cursor': data['next_cursor']}).json()
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get('/api/notifications/', {'limit': 5, 'cursor': data['next_cursor']})
+        self.assertEqual(len(first), len(deep))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/notifications/?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_booking_list_is_paginated(self):
+        self.create_bookings(3)
+        data = self.client.get('/api/admin/bookings/?limit=2').json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next_cursor'])
+
+
+class AdminFanOutTests(BookingFixtureMixin, TestCase):
+    """
+    Notifying admins costs the same number of queries for any number of admins
+    """
+
+    def add_admins(self, count):
+        for i in range(count):
+            user = User.objects.create_user(f'extra_admin_{User.objects.count()}')
+            UserProfile.objects.create(user=user, phone_number='9000000009', role='ADMIN')
+
+    def cancel_queries(self):
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+        self.client.force_authenticate(user=self.customer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.put(f'/api/bookings/{booking.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_cancel_booking_fan_out_is_constant(self):
+        few = self.cancel_queries()
+        self.add_admins(10)
+        many = self.cancel_queries()
+        self.assertEqual(few, many)
+        self.assertEqual(Notification.objects.filter(
+            title='Booking Cancelled by User').count(), 1 + 11)
+
+    def test_delayed_task_notifies_every_admin(self):
+        self.add_admins(2)
+        self.create_bookings(2, status='CONFIRMED', date='2020-01-01', time_slot='9:00 AM - 11:00 AM')
+        check_and_mark_delayed_bookings()
+        self.assertEqual(Booking.objects.filter(status='DELAYED').count(), 2)
+        self.assertEqual(Notification.objects.filter(notification_type='SYSTEM').count(), 2 * 3)
+
+
+class AdminRegistryTests(BookingFixtureMixin, TestCase):
+    """
+    The cached admin id set follows role and superuser changes
+    """
+
+    def test_served_from_cache_after_first_read(self):
+        get_admin_user_ids()
+        with self.assertNumQueries(0):
+            self.assertIn(self.admin.id, get_admin_user_ids())
+
+    def test_role_change_invalidates(self):
+        self.assertNotIn(self.customer.id, get_admin_user_ids())
+        profile = self.customer.userprofile
+        profile.role = 'ADMIN'
+        profile.save()
+        self.assertIn(self.customer.id, get_admin_user_ids())
+
+        profile.role = 'USER'
+        profile.save()
+        self.assertNotIn(self.customer.id, get_admin_user_ids())
+
+    def test_profile_saves_load_the_user_only_when_the_role_changes(self):
+        get_admin_user_ids()
+        profile = UserProfile.objects.get(user=self.customer)
+        profile.address = 'Street 2'
+        # Just the UPDATE
+        with self.assertNumQueries(1):
+            profile.save()
+        profile.role = 'WORKER'
+        # The UPDATE and the superuser flag
+        with self.assertNumQueries(2):
+            profile.save()
+
+    def test_superuser_toggle_invalidates(self):
+        worker_user = self.worker.user
+        self.assertNotIn(worker_user.id, get_admin_user_ids())
+        worker_user.is_superuser = True
+        worker_user.save()
+        self.assertIn(worker_user.id, get_admin_user_ids())
+
+    def test_ids_read_before_commit_are_not_written_back(self):
+        old_ids = get_admin_user_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = self.customer.userprofile
+            profile.role = 'ADMIN'
+            profile.save()
+            # Another request reads the ids the database held before the commit
+            with mock.patch('core.admin_registry.load_admin_user_ids', return_value=old_ids):
+                self.assertNotIn(self.customer.id, get_admin_user_ids())
+        self.assertIn(self.customer.id, get_admin_user_ids())
+
+
+class NotificationCounterTests(BookingFixtureMixin, TestCase):
+    """
+    Unread counters follow notification writes and bulk mark-read
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.admin)
+        for i in range(3):
+            notify_admins(f'n{i}', 'm', 'SYSTEM')
+
+    def unread_count(self):
+        with self.assertNumQueries(1):
+            return self.client.get('/api/notifications/unread-count/').json()['unread_count']
+
+    def test_fan_out_increments_counter(self):
+        self.assertEqual(self.unread_count(), 3)
+
+    def test_bulk_mark_read_by_ids(self):
+        ids = list(Notification.objects.filter(user=self.admin).values_list('id', flat=True)[:2])
+        response = self.client.post('/api/notifications/mark-read/', {'ids': ids}, format='json')
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_impossible_before_timestamp_is_rejected(self):
+        for before in ('yesterday', '2025-13-01T00:00'):
+            response = self.client.post('/api/notifications/mark-read/', {'before': before}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.unread_count(), 3)
+
+    def test_bulk_mark_read_everything_is_one_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/api/notifications/mark-read/', {}, format='json')
+        updates = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('UPDATE "core_notification"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_marking_twice_does_not_double_count(self):
+        notification = Notification.objects.filter(user=self.admin).first()
+        for _ in range(2):
+            self.client.post(f'/api/notifications/{notification.id}/mark-read/')
+        self.assertEqual(self.unread_count(), 2)
+
+
+class NotificationStreamTests(BookingFixtureMixin, TestCase):
+    """
+    New notifications reach open streams once committed
+    """
+
+    def test_stream_delivers_published_message(self):
+        async def scenario():
+            stream = event_stream(self.admin.id)
+            self.assertTrue((await stream.__anext__()).startswith('retry:'))
+            next_event = asyncio.ensure_future(stream.__anext__())
+            while self.admin.id not in get_broker()._subscribers:
+                await asyncio.sleep(0)
+            # Views publish from worker threads, not from the event loop
+            await asyncio.to_thread(
+                get_broker().publish, self.admin.id, json.dumps({'id': 7, 'title': 'Hi'}))
+            event = await asyncio.wait_for(next_event, timeout=1)
+            await stream.aclose()
+            return event
+
+        event = asyncio.run(scenario())
+        self.assertIn('id: 7', event)
+        self.assertIn('"title": "Hi"', event)
+        self.assertNotIn(self.admin.id, get_broker()._subscribers)
+
+    def test_stream_ends_once_token_is_revoked(self):
+        async def scenario():
+            frames = []
+            async for frame in event_stream(self.admin.id, token_key='abc'):
+                frames.append(frame)
+            return frames
+
+        with mock.patch('core.streams.HEARTBEAT_SECONDS', 0.01), \
+                mock.patch('core.streams.token_exists', side_effect=[True, False]) as exists:
+            frames = asyncio.run(asyncio.wait_for(scenario(), timeout=1))
+        self.assertEqual(exists.call_count, 2)
+        self.assertTrue(frames[0].startswith('retry:'))
+        self.assertNotIn(self.admin.id, get_broker()._subscribers)
+
+    def test_stream_refused_outside_asgi(self):
+        response = self.client.get('/api/notifications/stream/')
+        self.assertEqual(response.status_code, 501)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/notifications/stream/ticket/')
+        self.assertEqual(response.status_code, 501)
+
+    def test_ticket_opens_one_stream(self):
+        token = Token.objects.create(user=self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with mock.patch('core.views.served_over_asgi', return_value=True):
+            ticket = self.client.post('/api/notifications/stream/ticket/').json()['ticket']
+        self.assertNotIn(token.key, ticket)
+        self.assertEqual(redeem_stream_ticket(ticket), (self.admin.id, token.key))
+        self.assertIsNone(redeem_stream_ticket(ticket))
+        self.assertIsNone(redeem_stream_ticket('made-up'))
+
+    def test_redis_broker_shares_one_pubsub_connection(self):
+        class FakePubSub:
+            def __init__(self):
+                self.channels = set()
+                self.queue = asyncio.Queue()
+
+            @property
+            def subscribed(self):
+                return bool(self.channels)
+
+            async def subscribe(self, *channels):
+                self.channels.update(channels)
+
+            async def unsubscribe(self, *channels):
+                self.channels.difference_update(channels)
+
+            async def get_message(self, ignore_subscribe_messages, timeout):
+                try:
+                    return await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return None
+
+        pubsubs = []
+        redis_asyncio = mock.Mock()
+        redis_asyncio.Redis.from_url.return_value.pubsub.side_effect = (
+            lambda: pubsubs.append(FakePubSub()) or pubsubs[-1])
+        redis = mock.Mock(asyncio=redis_asyncio)
+
+        async def scenario(broker):
+            first, second, other = [await broker.subscribe(user_id) for user_id in (1, 1, 2)]
+            pubsubs[0].queue.put_nowait({'channel': b'notifications:2', 'data': b'hello'})
+            received = (await other.get(1), await first.get(0.01))
+            await first.close()
+            await second.close()
+            channels = set(pubsubs[0].channels)
+            await other.close()
+            broker._reader.cancel()
+            return received, channels
+
+        with mock.patch.dict('sys.modules', {'redis': redis, 'redis.asyncio': redis_asyncio}):
+            broker = RedisBroker('redis://test')
+            received, channels = asyncio.run(scenario(broker))
+            broker.publish(3, 'hi')
+        self.assertEqual(len(pubsubs), 1)
+        self.assertEqual(received, ('hello', None))
+        self.assertEqual(channels, {'notifications:2'})
+        self.assertEqual(pubsubs[0].channels, set())
+        redis.Redis.from_url.return_value.publish.assert_called_once_with('notifications:3', 'hi')
+
+    def test_celery_with_memory_broker_warns(self):
+        with override_settings(CELERY_BROKER_URL='redis://x', NOTIFICATION_STREAM_BROKER='memory'):
+            self.assertEqual([w.id for w in notification_stream_broker(None)], ['core.W001'])
+        with override_settings(CELERY_BROKER_URL='redis://x', NOTIFICATION_STREAM_BROKER='redis'):
+            self.assertEqual(notification_stream_broker(None), [])
+
+    def test_fan_out_publishes_after_commit(self):
+        with mock.patch('core.notifications.publish_notifications') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                notify_admins('Hello', 'm', 'SYSTEM')
+                publish.assert_not_called()
+        published = publish.call_args[0][0]
+        self.assertEqual([n.user_id for n in published], [self.admin.id])
+        self.assertIsNotNone(published[0].pk)
+
+
+class NotificationArchiveTests(BookingFixtureMixin, TestCase):
+    """
+    Old read notifications move to the archive according to their type
+    """
+
+    def make(self, notification_type, days_old, is_read=True):
+        notification = Notification.objects.create(
+            user=self.admin, title=notification_type, message='m',
+            notification_type=notification_type, is_read=is_read)
+        Notification.objects.filter(id=notification.id).update(
+            created_at=timezone.now() - timedelta(days=days_old))
+        return notification
+
+    @override_settings(NOTIFICATION_RETENTION_DAYS={'default': 30, 'OTP': 7, 'PAYMENT': None},
+                       NOTIFICATION_ARCHIVE_BATCH_SIZE=2)
+    def test_archives_by_type_policy(self):
+        old_system = [self.make('SYSTEM', 40) for _ in range(3)]
+        recent_system = self.make('SYSTEM', 10)
+        old_otp = self.make('OTP', 8)
+        unread = self.make('SYSTEM', 40, is_read=False)
+        payment = self.make('PAYMENT', 400)
+
+        archive_read_notifications()
+
+        archived = set(ArchivedNotification.objects.values_list('id', flat=True))
+        self.assertEqual(archived, {n.id for n in old_system} | {old_otp.id})
+        remaining = set(Notification.objects.values_list('id', flat=True))
+        self.assertEqual(remaining, {recent_system.id, unread.id, payment.id})
+
+    @override_settings(NOTIFICATION_RETENTION_DAYS={'default': 30},
+                       NOTIFICATION_ARCHIVE_BATCH_SIZE=2)
+    def test_max_batches_bounds_a_run(self):
+        for _ in range(5):
+            self.make('SYSTEM', 40)
+        archive_read_notifications(max_batches=2)
+        self.assertEqual(ArchivedNotification.objects.count(), 4)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(BookingFixtureMixin, TestCase):
+    """
+    The hot filters in core.views and core.tasks are served by indexes
+    """
+
+    def assert_uses_index(self, queryset, table):
+        plan = queryset.explain()
+        steps = [line for line in plan.splitlines() if f' {table}' in line]
+        self.assertTrue(steps, plan)
+        for step in steps:
+            self.assertRegex(step, r'USING (COVERING )?INDEX|USING INTEGER PRIMARY KEY', plan)
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_delayed_booking_scan(self):
+        self.assert_uses_index(
+            Booking.objects.filter(status='CONFIRMED', worker__isnull=False,
+                                   scheduled_start__lt=timezone.now()),
+            'core_booking')
+
+    def test_worker_bookings(self):
+        self.assert_uses_index(booking_queryset(worker=self.worker), 'core_booking')
+
+    def test_user_bookings(self):
+        self.assert_uses_index(booking_queryset(user=self.customer), 'core_booking')
+
+    def test_admin_booking_page(self):
+        self.assert_uses_index(
+            Booking.objects.order_by('-created_at', '-id')[:21], 'core_booking')
+
+    def test_notification_feed_page(self):
+        self.assert_uses_index(
+            Notification.objects.filter(user=self.admin).order_by('-created_at', '-id')[:21],
+            'core_notification')
+
+    def test_unread_notifications(self):
+        self.assert_uses_index(
+            Notification.objects.filter(user=self.admin, is_read=False), 'core_notification')
+
+    def test_ratings_by_worker_and_service(self):
+        self.assert_uses_index(RatingReview.objects.filter(worker=self.worker), 'core_ratingreview')
+        self.assert_uses_index(RatingReview.objects.filter(service=self.service), 'core_ratingreview')
+
+    def test_otp_verification_lookup(self):
+        booking = self.create_bookings(1)[0]
+        self.assert_uses_index(
+            OTP.objects.filter(user=self.customer, booking=booking, code='123456', is_verified=False),
+            'core_otp')
+
+
+class ScheduledWindowTests(BookingFixtureMixin, TestCase):
+    """
+    Bookings carry a parsed, indexed schedule used by the delay check
+    """
+
+    def test_parse_time_slot_formats(self):
+        start, end = parse_time_slot('2026-03-01', '9:00 AM - 11:30 AM')
+        self.assertEqual((start.hour, end.hour, end.minute), (9, 11, 30))
+        start, end = parse_time_slot(date(2026, 3, 1), '12:00 PM - 2:00 PM')
+        self.assertEqual((start.hour, end.hour), (12, 14))
+        start, end = parse_time_slot('2026-03-01', '12:00')
+        self.assertEqual((start.hour, end), (12, None))
+        self.assertEqual(parse_time_slot('2026-03-01', 'whenever'), (None, None))
+
+    def test_accepting_suggested_time_moves_schedule(self):
+        booking = self.create_bookings(1, status='DELAYED')[0]
+        Booking.objects.filter(id=booking.id).update(
+            suggested_date='2026-05-02', suggested_time='2:00 PM - 4:00 PM')
+        self.client.force_authenticate(user=self.customer)
+        self.client.post(f'/api/bookings/{booking.id}/respond-to-delayed/',
+                         {'action': 'accept'}, format='json')
+        booking.refresh_from_db()
+        self.assertEqual(booking.scheduled_start.date(), date(2026, 5, 2))
+        self.assertEqual(booking.scheduled_start.hour, 14)
+
+    def test_only_overdue_bookings_are_delayed(self):
+        late = self.create_bookings(1, status='CONFIRMED', date='2020-01-01')[0]
+        future = self.create_bookings(
+            1, status='CONFIRMED', date=(timezone.now() + timedelta(days=2)).date())[0]
+        unassigned = self.create_bookings(
+            1, status='CONFIRMED', date='2020-01-01', worker=None)[0]
+        check_and_mark_delayed_bookings()
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[late.id], 'DELAYED')
+        self.assertEqual(statuses[future.id], 'CONFIRMED')
+        self.assertEqual(statuses[unassigned.id], 'CONFIRMED')
+
+
+class WorkerAvailabilityTests(BookingFixtureMixin, TestCase):
+    """
+    Assignment candidates come from the busy-slot index in one query
+    """
+
+    def add_worker(self, name, **kwargs):
+        worker = UserProfile.objects.create(
+            user=User.objects.create_user(name), phone_number='9000000009',
+            role='WORKER', is_approved=kwargs.get('is_approved', True))
+        if kwargs.get('qualified', True):
+            worker.services.add(self.service)
+        return worker
+
+    def test_busy_slot_follows_booking_status(self):
+        booking = self.create_bookings(1, status='ASSIGNED')[0]
+        slot = WorkerBusySlot.objects.get(booking=booking)
+        self.assertEqual(slot.worker, self.worker)
+        self.assertEqual(slot.ends_at - slot.starts_at, timedelta(hours=2))
+
+        booking.status = 'COMPLETED'
+        booking.save()
+        self.assertFalse(WorkerBusySlot.objects.filter(booking=booking).exists())
+
+    def test_candidates_exclude_busy_unqualified_and_unapproved(self):
+        self.create_bookings(1, status='CONFIRMED', time_slot='10:00 AM - 12:00 PM')
+        free = self.add_worker('free')
+        self.add_worker('unqualified', qualified=False)
+        self.add_worker('unapproved', is_approved=False)
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+
+        with self.assertNumQueries(1):
+            candidates = list(available_workers(booking))
+        self.assertEqual(candidates, [free])
+
+    def test_candidates_ranked_by_rating_then_load(self):
+        busy = self.add_worker('busy')
+        idle = self.add_worker('idle')
+        self.create_bookings(1, status='ASSIGNED', worker=busy, date='2026-02-01')
+        RatingReview.objects.create(
+            user=self.customer, worker=self.worker, service=self.service, rating=5)
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+
+        ranked = list(available_workers(booking))
+        self.assertEqual(ranked, [self.worker, idle, busy])
+        self.assertEqual(ranked[0].average_rating, 5)
+        self.assertEqual(ranked[2].active_bookings, 1)
+
+    def test_assigning_busy_worker_is_rejected(self):
+        self.create_bookings(1, status='ASSIGNED')
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(f'/api/admin/bookings/{booking.id}/available-workers/')
+        self.assertEqual(response.data, [])
+        response = self.client.post(f'/api/admin/bookings/{booking.id}/assign-worker/',
+                                    {'worker_id': self.worker.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        other = self.add_worker('other')
+        response = self.client.post(f'/api/admin/bookings/{booking.id}/assign-worker/',
+                                    {'worker_id': other.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(WorkerBusySlot.objects.get(booking=booking).worker, other)
+
+    def test_assignment_checks_availability_under_worker_lock(self):
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+        self.client.force_authenticate(user=self.admin)
+        locked = []
+        select_for_update = QuerySet.select_for_update
+
+        def record(queryset, *args, **kwargs):
+            locked.append(queryset.model)
+            return select_for_update(queryset, *args, **kwargs)
+
+        def check(worker, booking):
+            # Still inside the transaction that holds the lock
+            self.assertIn(UserProfile, locked)
+            return is_worker_free(worker, booking)
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=record), \
+                mock.patch('core.views.is_worker_free', side_effect=check) as free:
+            response = self.client.post(f'/api/admin/bookings/{booking.id}/assign-worker/',
+                                        {'worker_id': self.worker.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        free.assert_called_once()
+
+
+class AutoAssignmentTests(BookingFixtureMixin, TestCase):
+    """
+    PENDING bookings are matched and written in one batch
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.window = (timezone.now() - timedelta(days=3650), timezone.now() + timedelta(days=3650))
+
+    def add_worker(self, name):
+        worker = UserProfile.objects.create(
+            user=User.objects.create_user(name), phone_number='9000000009',
+            role='WORKER', is_approved=True)
+        worker.services.add(self.service)
+        return worker
+
+    def test_dry_run_writes_nothing(self):
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+        result = auto_assign(*self.window, dry_run=True)
+        self.assertEqual([entry['booking_id'] for entry in result['assignments']], [booking.id])
+        self.assertIn('matching_ms', result)
+        booking.refresh_from_db()
+        self.assertEqual((booking.status, booking.worker), ('PENDING', None))
+        self.assertFalse(Notification.objects.filter(notification_type='ASSIGNMENT').exists())
+
+    def test_conflicting_slots_are_spread_across_workers(self):
+        other = self.add_worker('other')
+        first, second, third = self.create_bookings(3, status='PENDING', worker=None)
+
+        result = auto_assign(*self.window)
+
+        workers = dict(Booking.objects.values_list('id', 'worker_id'))
+        self.assertEqual({workers[first.id], workers[second.id]}, {self.worker.id, other.id})
+        self.assertEqual(result['unassigned'], [third.id])
+        self.assertEqual(Booking.objects.filter(status='ASSIGNED').count(), 2)
+        self.assertEqual(WorkerBusySlot.objects.count(), 2)
+        self.assertEqual(Notification.objects.filter(notification_type='ASSIGNMENT').count(), 2)
+
+    def count_assignment_queries(self, count, first_day):
+        for offset in range(count):
+            self.create_bookings(1, status='PENDING', worker=None,
+                                 date=first_day + timedelta(days=offset))
+        with CaptureQueriesContext(connection) as ctx:
+            result = auto_assign(*self.window)
+        self.assertEqual((len(result['assignments']), result['unassigned']), (count, []))
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_bookings(self):
+        # Bookings fall on separate days, so self.worker takes them all
+        small = self.count_assignment_queries(3, date(2026, 3, 1))
+        large = self.count_assignment_queries(6, date(2026, 4, 1))
+        self.assertEqual(small, large, 'auto_assign query count grows with bookings')
+
+    def test_prefers_higher_rating_then_lower_load(self):
+        # self.worker is rated but already holds a booking, idle has neither
+        RatingReview.objects.create(
+            user=self.customer, worker=self.worker, service=self.service, rating=4)
+        self.create_bookings(1, status='ASSIGNED', date='2026-02-01')
+        booking = self.create_bookings(1, status='PENDING', worker=None)[0]
+        idle = self.add_worker('idle')
+
+        result = auto_assign(*self.window, dry_run=True)
+        self.assertEqual(result['assignments'][0]['worker_id'], self.worker.id)
+
+        RatingReview.objects.all().delete()
+        result = auto_assign(*self.window, dry_run=True)
+        self.assertEqual(result['assignments'][0]['worker_id'], idle.id)
+        self.assertEqual(result['assignments'][0]['booking_id'], booking.id)
+
+    def test_endpoint_requires_admin_and_validates_window(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/api/admin/bookings/auto-assign/', {}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/admin/bookings/auto-assign/', {'start': 'soon'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/admin/bookings/auto-assign/', {'start': '2025-13-01T00:00'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/admin/bookings/auto-assign/', {
+            'start': '2025-12-31T00:00:00Z', 'end': '2026-01-02T00:00:00Z', 'dry_run': True
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['dry_run'])
+
+
+class CatalogConditionalGetTests(BookingFixtureMixin, TestCase):
+    """
+    Catalog endpoints answer If-None-Match from the version stamp
+    """
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return etag, response
+
+    def test_unchanged_catalog_returns_304_without_queries(self):
+        for url in ('/api/services/', f'/api/service-details/{self.service.id}/'):
+            etag, response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_new_service_or_rating_changes_etag(self):
+        url = f'/api/service-details/{self.service.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            RatingReview.objects.create(
+                user=self.customer, worker=self.worker, service=self.service, rating=3)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.create(name='Painting', description='Walls', price=Decimal('300.00'),
+                                   estimated_duration='2 hours', category='PAINTING')
+        self.assertEqual(self.client.get('/api/services/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_ignore_etag(self):
+        etag = self.client.get('/api/services/')['ETag']
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.delete('/api/services/', {'service_id': self.service.id},
+                                      format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class CatalogCacheTests(BookingFixtureMixin, TestCase):
+    """
+    Catalog payloads are served from the shared cache and rebuilt once
+    """
+
+    def test_repeat_requests_skip_the_database(self):
+        first = self.client.get('/api/services/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/services/')
+        self.assertEqual(first.data, second.data)
+
+    def test_new_rating_invalidates_payload(self):
+        url = f'/api/service-details/{self.service.id}/'
+        self.assertEqual(self.client.get(url).data['rating_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            RatingReview.objects.create(
+                user=self.customer, worker=self.worker, service=self.service, rating=4)
+            self.service.record_rating(4)
+        self.assertEqual(self.client.get(url).data['rating_count'], 1)
+        self.assertEqual(self.client.get('/api/service-details/999/').status_code, 404)
+
+    def test_concurrent_misses_build_once(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return ['catalog']
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cached_payload('test', build)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['catalog']] * 8)
+
+    def test_expired_copy_served_while_rebuilding(self):
+        cached_payload('test', lambda: 'old')
+        key = PAYLOAD_KEY.format(name='test')
+        cache.set(key, dict(cache.get(key), fresh_until=0))
+        cache.add(LOCK_KEY.format(name='test'), get_catalog_version())
+        self.assertEqual(cached_payload('test', lambda: 'new'), 'old')
+        cache.delete(LOCK_KEY.format(name='test'))
+        self.assertEqual(cached_payload('test', lambda: 'new'), 'new')
+        self.assertEqual(cache.get(key)['payload'], 'new')
+
+    def test_slow_builder_leaves_the_next_lock_alone(self):
+        lock_key = LOCK_KEY.format(name='test')
+
+        def slow_build():
+            # Our lock timed out and another request took over the rebuild
+            cache.set(lock_key, 'other', 10)
+            return 'slow'
+
+        self.assertEqual(cached_payload('test', slow_build), 'slow')
+        self.assertEqual(cache.get(lock_key), 'other')
+        cache.delete(lock_key)
+        cached_payload('other', lambda: 'fast')
+        self.assertIsNone(cache.get(LOCK_KEY.format(name='other')))
+
+
+class WorkerEarningsTests(BookingFixtureMixin, TestCase):
+    """
+    Earnings totals are aggregated in the database
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.worker.user)
+
+    def test_totals_by_month_and_method(self):
+        bookings = self.create_bookings(4)
+        Payment.objects.filter(booking=bookings[0]).update(
+            created_at=timezone.now().replace(year=2025, month=6, day=15))
+        Payment.objects.create(
+            booking=bookings[1], total_amount=Decimal('500.00'),
+            admin_commission=Decimal('100.00'), provider_amount=Decimal('400.00'),
+            payment_status='FAILED', payment_method='UPI', transaction_id='txn_failed')
+        Payment.objects.filter(booking=bookings[2]).update(payment_method='UPI')
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/workers/me/earnings/')
+        data = response.data
+        self.assertEqual(data['total_earnings'], '800.00')
+        self.assertEqual(data['pending_payments'], '400.00')
+        self.assertEqual((data['completed_jobs'], data['paid_jobs']), (4, 2))
+        self.assertEqual([entry['month'] for entry in data['monthly']],
+                         [timezone.localtime().strftime('%Y-%m'), '2025-06'])
+        self.assertEqual({entry['payment_method']: entry['earnings'] for entry in data['by_payment_method']},
+                         {'CARD': '400.00', 'UPI': '400.00'})
+        self.assertEqual(len(data['recent_payments']), 2)
+
+    def test_date_range_filter(self):
+        bookings = self.create_bookings(2)
+        Payment.objects.filter(booking=bookings[0]).update(
+            created_at=timezone.now().replace(year=2025, month=6, day=15))
+        response = self.client.get('/api/workers/me/earnings/', {'from': '2025-06-01', 'to': '2025-06-30'})
+        self.assertEqual(response.data['total_earnings'], '400.00')
+        response = self.client.get('/api/workers/me/earnings/', {'from': 'June'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/workers/me/earnings/', {'to': '2025-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'to must be a date in YYYY-MM-DD format')
+
+    def test_customers_are_refused(self):
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get('/api/workers/me/earnings/').status_code, 403)
+
+
+class DailyRollupTests(BookingFixtureMixin, TestCase):
+    """
+    The analytics rollup follows bookings and payments incrementally
+    """
+
+    ROLLUP_FIELDS = [
+        'day', 'category', 'bookings_pending', 'bookings_assigned', 'bookings_confirmed',
+        'bookings_in_progress', 'bookings_reached', 'bookings_completed', 'bookings_cancelled',
+        'bookings_delayed', 'payments', 'gross_revenue', 'admin_commission', 'provider_amount'
+    ]
+
+    def snapshot(self, rows):
+        return sorted(
+            tuple(getattr(row, field) for field in self.ROLLUP_FIELDS) for row in rows)
+
+    def assert_matches_rebuild(self):
+        self.assertEqual(self.snapshot(DailyRollup.objects.all()), self.snapshot(rollup_rows()))
+
+    def test_incremental_updates_match_rebuild(self):
+        bookings = self.create_bookings(3, status='PENDING', date='2020-01-01')
+        bookings[0].status = 'CONFIRMED'
+        bookings[0].save()
+        check_and_mark_delayed_bookings()
+        bookings[1].status = 'CANCELLED'
+        bookings[1].save(update_fields=['status'])
+        Payment.objects.get(booking=bookings[2]).delete()
+        bookings[2].delete()
+        self.assert_matches_rebuild()
+
+        row = DailyRollup.objects.get()
+        self.assertEqual((row.bookings_delayed, row.bookings_cancelled, row.bookings_pending), (1, 1, 0))
+        self.assertEqual((row.payments, row.gross_revenue), (1, Decimal('500.00')))
+
+    def test_payment_status_change_moves_revenue(self):
+        booking = self.create_bookings(2)[1]
+        payment = Payment.objects.create(
+            booking=booking, total_amount=Decimal('500.00'), admin_commission=Decimal('100.00'),
+            provider_amount=Decimal('400.00'), payment_status='FAILED', transaction_id='txn_retry')
+        self.assertEqual(DailyRollup.objects.get().payments, 1)
+        payment.payment_status = 'SUCCESS'
+        payment.save()
+        self.assertEqual(DailyRollup.objects.get().provider_amount, Decimal('800.00'))
+        self.assert_matches_rebuild()
+
+    def test_rebuild_command(self):
+        self.create_bookings(2)
+        DailyRollup.objects.update(bookings_completed=0, payments=0)
+        call_command('rebuild_daily_rollup', stdout=StringIO())
+        self.assertEqual(DailyRollup.objects.get().bookings_completed, 2)
+
+    def test_endpoint_reads_only_the_rollup(self):
+        self.create_bookings(3)
+        self.client.force_authenticate(user=self.admin)
+        today = timezone.localdate().isoformat()
+        # Totals, per category and per day, all from the rollup
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/admin/analytics/', {'from': today, 'to': today})
+        data = response.data
+        self.assertEqual(data['totals']['bookings'], 3)
+        self.assertEqual(data['totals']['gross_revenue'], '1000.00')
+        self.assertEqual(data['by_status']['COMPLETED'], 3)
+        self.assertEqual(data['by_category'][0]['category'], 'PLUMBING')
+        self.assertEqual(len(data['daily']), 1)
+
+        response = self.client.get('/api/admin/analytics/', {'to': '2000-01-01'})
+        self.assertEqual(response.data['totals']['bookings'], 0)
+        response = self.client.get('/api/admin/analytics/', {'from': '2025-02-30'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get('/api/admin/analytics/').status_code, 403)
+
+
+class PayoutLedgerTests(BookingFixtureMixin, TestCase):
+    """
+    Payments are journaled with the payment and settled in chunks
+    """
+
+    def pay(self, booking):
+        self.client.force_authenticate(user=booking.user)
+        response = self.client.post(f'/api/bookings/{booking.id}/payment/',
+                                    {'payment_method': 'UPI'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_payment_is_journaled_and_balanced(self):
+        booking = self.create_bookings(2, status='IN_PROGRESS')[1]
+        self.pay(booking)
+        payment = Payment.objects.get(booking=booking)
+        entries = LedgerEntry.objects.filter(journal=f'payment:{payment.id}')
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(entries.aggregate(total=Sum('amount'))['total'], 0)
+        self.assertFalse(post_payment(payment, self.worker.id))
+
+        self.client.force_authenticate(user=self.worker.user)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/workers/me/balance/')
+        self.assertEqual(response.data['balance'], '400.00')
+
+    def test_entries_are_append_only(self):
+        booking = self.create_bookings(2, status='IN_PROGRESS')[1]
+        self.pay(booking)
+        entry = LedgerEntry.objects.first()
+        entry.amount = 0
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.delete()
+
+    def test_settlement_pays_each_worker_once(self):
+        other = UserProfile.objects.create(
+            user=User.objects.create_user('other'), phone_number='9000000009',
+            role='WORKER', is_approved=True)
+        for worker in (self.worker, self.worker, other):
+            booking = self.create_bookings(2, status='IN_PROGRESS', worker=worker)[1]
+            self.pay(booking)
+
+        run = settle_payouts(chunk_size=2)
+        self.assertEqual((run.worker_count, run.total_amount), (2, Decimal('1200.00')))
+        amounts = dict(PayoutBatch.objects.values_list('worker_id', 'amount'))
+        self.assertEqual(amounts, {self.worker.id: Decimal('800.00'), other.id: Decimal('400.00')})
+        self.assertEqual(WorkerBalance.objects.get(worker=self.worker).balance, 0)
+        self.assertEqual(LedgerEntry.objects.aggregate(total=Sum('amount'))['total'], 0)
+        self.assertIsNone(settle_payouts())
+
+        booking = self.create_bookings(2, status='IN_PROGRESS')[1]
+        self.pay(booking)
+        self.assertEqual(settle_payouts().total_amount, Decimal('400.00'))
+
+    def payable(self, amount, **kwargs):
+        LedgerEntry.objects.bulk_create([LedgerEntry(
+            journal='payment:test', source='PAYMENT', account='WORKER_PAYABLE',
+            worker=self.worker, amount=-Decimal(amount), **kwargs)])
+
+    def test_entry_committed_after_a_run_is_settled_by_the_next(self):
+        self.payable('400.00', id=1000)
+        self.assertEqual(settle_payouts().total_amount, Decimal('400.00'))
+        # Took its id before the run but committed after it
+        self.payable('150.00', id=500)
+        run = settle_payouts()
+        self.assertEqual(run.total_amount, Decimal('150.00'))
+        self.assertEqual(list(run.settled_entries.values_list('id', flat=True)), [500])
+        self.assertIsNone(settle_payouts())
+
+    def test_negative_net_is_carried_to_the_next_run(self):
+        self.payable('-100.00')
+        self.assertIsNone(settle_payouts().batches.first())
+        self.assertEqual(LedgerEntry.objects.get(journal='payment:test').settled_run, None)
+        self.payable('400.00')
+        batch = settle_payouts().batches.get()
+        self.assertEqual((batch.amount, batch.entry_count), (Decimal('300.00'), 2))
+
+    def test_overlapping_run_is_rejected(self):
+        booking = self.create_bookings(2, status='IN_PROGRESS')[1]
+        self.pay(booking)
+        other = PayoutRun.objects.create()
+        update = QuerySet.update
+
+        def racing_update(queryset, **kwargs):
+            # Another run claims the entries between our read and our write
+            if kwargs.get('settled_run') not in (None, other):
+                update(LedgerEntry.objects.all(), settled_run=other)
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=racing_update):
+            with self.assertRaises(SettlementConflict):
+                settle_payouts()
+        self.assertFalse(PayoutBatch.objects.exists())
+
+
+class StreamingExportTests(BookingFixtureMixin, TestCase):
+    """
+    Exports are streamed row by row with filters applied in the database
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_bookings_csv_with_status_filter(self):
+        self.create_bookings(2)
+        self.create_bookings(1, status='CANCELLED')
+        response = self.client.get('/api/admin/exports/bookings.csv', {'status': 'COMPLETED'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'user', 'service'])
+        self.assertEqual(len(lines), 3)
+
+    def test_payments_ndjson_with_date_filter(self):
+        self.create_bookings(4)
+        today = timezone.localdate().isoformat()
+        response = self.client.get('/api/admin/exports/payments.ndjson', {'from': today, 'to': today})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['provider_amount'], '400.00')
+
+        response = self.client.get('/api/admin/exports/payments.ndjson', {'to': '2000-01-01'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.client.get('/api/admin/exports/users.csv').status_code, 400)
+        self.assertEqual(self.client.get('/api/admin/exports/bookings.xlsx').status_code, 400)
+        self.assertEqual(self.client.get('/api/admin/exports/ratings.csv', {'status': 'X'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/admin/exports/bookings.csv', {'from': '2025-02-30'}).status_code, 400)
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.get('/api/admin/exports/bookings.csv').status_code, 403)
+
+    def test_rows_are_read_lazily(self):
+        self.create_bookings(5)
+        first_id = Booking.objects.order_by('id').values_list('id', flat=True).first()
+        # Nothing is fetched until the first row is asked for
+        with self.assertNumQueries(0):
+            columns, rows = export_rows('bookings')
+        with self.assertNumQueries(1):
+            self.assertEqual(next(rows)[0], first_id)
+
+    def test_management_command(self):
+        self.create_bookings(3)
+        out = StringIO()
+        call_command('export_data', 'payments', '--format', 'ndjson', '--status', 'SUCCESS', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+        out = StringIO()
+        call_command('export_data', 'bookings', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'bookings', '--to', '2025-02-30', stdout=StringIO())
+
+    def test_asgi_response_streams_without_buffering(self):
+        self.create_bookings(3)
+        with mock.patch('core.views.served_over_asgi', return_value=True):
+            response = self.client.get('/api/admin/exports/bookings.csv')
+
+        async def consume():
+            return [chunk async for chunk in response]
+
+        with warnings.catch_warnings():
+            # Django warns before reading a sync iterator into a list
+            warnings.simplefilter('error')
+            chunks = async_to_sync(consume)()
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 4)
+
+
+class CachedTokenAuthenticationTests(BookingFixtureMixin, TestCase):
+    """
+    Token requests resolve the user and profile from cache after the first
+    """
+
+    def setUp(self):
+        super().setUp()
+        clear_local_cache()
+        self.token = Token.objects.create(user=self.worker.user)
+        # Let the invalidation markers left by creating the fixtures lapse
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def whoami(self):
+        return self.client.get('/api/workers/me/balance/')
+
+    def test_one_query_on_miss_and_none_on_hit(self):
+        authentication = CachedTokenAuthentication()
+        with self.assertNumQueries(1):
+            user, token = authentication.authenticate_credentials(self.token.key)
+        for _ in range(2):
+            with self.assertNumQueries(0):
+                user, token = authentication.authenticate_credentials(self.token.key)
+                self.assertEqual(user.id, self.worker.user_id)
+                self.assertEqual(user.userprofile.role, 'WORKER')
+                self.assertEqual(token.key, self.token.key)
+            # Another process would only have the shared tier
+            clear_local_cache()
+
+    def test_role_and_approval_changes_invalidate(self):
+        self.assertEqual(self.whoami().status_code, 200)
+        self.worker.role = 'USER'
+        self.worker.save()
+        self.assertEqual(self.whoami().status_code, 403)
+
+        self.worker.role = 'WORKER'
+        self.worker.is_approved = False
+        self.worker.save(update_fields=['role', 'is_approved'])
+        self.assertEqual(self.whoami().status_code, 403)
+
+    def test_logout_revokes_token(self):
+        self.assertEqual(self.whoami().status_code, 200)
+        self.assertEqual(self.client.post('/api/logout/').status_code, 200)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(self.whoami().status_code, 401)
+
+    def test_revocation_elsewhere_is_seen_at_once(self):
+        key = self.token.key
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(key)
+        # Deleted by another process, whose invalidation only reaches the shared tier
+        with mock.patch('core.authentication._local', {}):
+            self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(key)
+
+    def test_raw_token_is_not_a_cache_key(self):
+        self.assertEqual(self.whoami().status_code, 200)
+        self.assertFalse(any(self.token.key in key for key in cache._cache))
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(self.whoami().status_code, 401)
+
+
+class RolePermissionTests(BookingFixtureMixin, TestCase):
+    """
+    Admin and worker views are guarded by the role permission classes
+    """
+
+    def setUp(self):
+        super().setUp()
+        clear_local_cache()
+        self.tokens = {
+            user.username: Token.objects.create(user=user).key
+            for user in (self.admin, self.customer, self.worker.user)
+        }
+        cache.clear()
+
+    def get(self, path, username=None):
+        client = APIClient()
+        if username:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[username]}')
+        return client.get(path)
+
+    def test_admin_views(self):
+        self.assertEqual(self.get('/api/admin/bookings/').status_code, 401)
+        for username in ('customer', 'worker'):
+            response = self.get('/api/admin/bookings/', username)
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.json(), {'error': 'Only admins can access this endpoint'})
+        self.assertEqual(self.get('/api/admin/bookings/', 'admin').status_code, 200)
+
+    def test_user_count(self):
+        self.assertEqual(self.get('/api/admin/users/count/', 'customer').status_code, 403)
+        self.get('/api/admin/users/count/', 'admin')
+        with self.assertNumQueries(1):
+            response = self.get('/api/admin/users/count/', 'admin')
+        # The customer; the admin and the worker are not regular users
+        self.assertEqual(response.data, {'count': 1})
+
+    def test_superuser_without_profile_is_admin(self):
+        root = User.objects.create_superuser('root', password='x')
+        self.tokens['root'] = Token.objects.create(user=root).key
+        cache.clear()
+        self.assertEqual(self.get('/api/admin/analytics/', 'root').status_code, 200)
+
+    def test_worker_views(self):
+        for username in ('customer', 'admin'):
+            self.assertEqual(self.get('/api/workers/bookings/', username).status_code, 403)
+        self.assertEqual(self.get('/api/workers/bookings/', 'worker').status_code, 200)
+
+    def test_worker_views_match_login(self):
+        # Login turns away unapproved workers and treats superusers as
+        # admins whatever their profile says, so worker views do the same
+        UserProfile.objects.filter(pk=self.worker.pk).update(is_approved=False)
+        cache.clear()
+        response = self.get('/api/workers/bookings/', 'worker')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'Only approved workers can access this endpoint'})
+
+        UserProfile.objects.filter(pk=self.worker.pk).update(is_approved=True)
+        User.objects.filter(pk=self.worker.user.pk).update(is_superuser=True)
+        clear_local_cache()
+        cache.clear()
+        self.assertEqual(self.get('/api/workers/bookings/', 'worker').status_code, 403)
+        self.assertEqual(self.get('/api/admin/bookings/', 'worker').status_code, 200)
+
+    def test_checks_add_no_queries(self):
+        self.get('/api/admin/analytics/', 'admin')
+        # The rollup summary's own three queries and nothing else
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get('/api/admin/analytics/', 'admin').status_code, 200)
+        self.get('/api/workers/me/balance/', 'worker')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get('/api/workers/me/balance/', 'worker').status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class WorkerOnboardingTests(BookingFixtureMixin, TestCase):
+    """
+    Registration and bulk imports link services with set-based writes
+    """
+
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w') as output:
+            output.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_register_links_valid_services(self):
+        other = Service.objects.create(
+            name='Wiring', description='Rewire', price=Decimal('300.00'),
+            estimated_duration='2 hours', category='ELECTRICIAN')
+        response = self.client.post('/api/register/', {
+            'username': 'fixer', 'password': 'secret', 'email': 'fixer@example.com',
+            'phone_number': '9000000009', 'role': 'WORKER',
+            'service': [self.service.id, str(other.id), 'nope', 99999]
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        profile = UserProfile.objects.get(user__username='fixer')
+        self.assertEqual(set(profile.services.values_list('id', flat=True)), {self.service.id, other.id})
+        self.assertTrue(Token.objects.filter(user=profile.user, key=response.data['token']).exists())
+
+    def test_import_csv_in_parallel(self):
+        path = self.write_file('.csv', (
+            'username,password,email,phone_number,specialty,services\n'
+            f'w1,pw1,w1@example.com,9100000001,Pipes,{self.service.id}\n'
+            'w2,pw2,w2@example.com,9100000002,,\n'
+            f'w3,pw3,w3@example.com,9100000003,,{self.service.id}\n'
+        ))
+        out = StringIO()
+        call_command('import_workers', path, '--approve', '--processes', '2', '--batch-size', '2', stdout=out)
+        self.assertIn('Imported 3 workers', out.getvalue())
+
+        workers = UserProfile.objects.filter(user__username__in=['w1', 'w2', 'w3']).select_related('user')
+        self.assertEqual(len(workers), 3)
+        for worker in workers:
+            self.assertEqual(worker.role, 'WORKER')
+            self.assertTrue(worker.is_approved)
+            self.assertTrue(worker.user.check_password(f'pw{worker.user.username[1]}'))
+            self.assertTrue(Token.objects.filter(user=worker.user).exists())
+        self.assertEqual(
+            set(self.service.workers.values_list('user__username', flat=True)), {'worker', 'w1', 'w3'})
+
+    def test_invalid_rows_import_nothing(self):
+        path = self.write_file('.json', json.dumps([
+            {'username': 'w1', 'password': 'pw', 'email': 'w1@example.com', 'phone_number': '9100000001'},
+            {'username': 'worker', 'password': 'pw', 'email': 'x@example.com', 'phone_number': '9100000002'},
+            {'username': 'w3', 'password': 'pw', 'email': 'w3@example.com', 'phone_number': '91',
+             'services': [99999]},
+        ]))
+        err = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_workers', path, stderr=err)
+        self.assertIn('username worker already exists', err.getvalue())
+        self.assertIn('unknown services 99999', err.getvalue())
+        self.assertIn('phone number must be exactly 10 digits', err.getvalue())
+        self.assertFalse(User.objects.filter(username='w1').exists())
+
+
+class SearchTests(BookingFixtureMixin, TestCase):
+    """
+    Services and reviews are indexed on write and searched by rank
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.wiring = Service.objects.create(
+            name='Electrical wiring', description='Rewire rooms and fix faulty switches',
+            price=Decimal('800.00'), estimated_duration='3 hours', category='ELECTRICIAN',
+            included_items='["Switch boards", "Copper cable"]')
+        self.cleaning = Service.objects.create(
+            name='Deep cleaning', description='Kitchen and bathroom, including pipes under the sink',
+            price=Decimal('400.00'), estimated_duration='4 hours', category='CLEANING')
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ranked_by_field_weight(self):
+        data = self.search(q='pipes')
+        # A title match outranks a description match
+        self.assertEqual([hit['id'] for hit in data['results']], [self.service.id, self.cleaning.id])
+        self.assertEqual(data['results'][0]['type'], 'service')
+        self.assertIn('pipes', data['results'][1]['snippet'])
+
+    def test_included_items_and_prefixes(self):
+        self.assertEqual([hit['id'] for hit in self.search(q='copp')['results']], [self.wiring.id])
+        self.assertEqual(self.search(q='wiring "OR" nonexistent')['results'], [])
+
+    def test_index_follows_writes(self):
+        self.wiring.name = 'Solar panels'
+        self.wiring.save()
+        self.assertEqual(self.search(q='wiring')['results'], [])
+        self.assertEqual(self.search(q='solar')['results'][0]['id'], self.wiring.id)
+
+        booking = self.create_bookings(1)[0]
+        rating = RatingReview.objects.create(
+            user=self.customer, worker=self.worker, booking=booking, rating=5,
+            review='Arrived early and sorted the leak')
+        data = self.search(q='leak', type='review')
+        self.assertEqual([hit['id'] for hit in data['results']], [rating.id])
+        self.assertEqual(data['results'][0]['service_name'], 'Plumbing')
+
+        rating.delete()
+        self.assertEqual(self.search(q='leak')['results'], [])
+        self.cleaning.delete()
+        self.assertEqual(self.search(q='kitchen')['results'], [])
+
+    def test_pages_do_not_overlap(self):
+        for i in range(5):
+            Service.objects.create(
+                name=f'Garden care {i}', description='Lawn mowing' + ' lawn' * i,
+                price=Decimal('100.00'), estimated_duration='1 hour')
+        seen = []
+        cursor = None
+        with self.assertNumQueries(2):
+            data = self.search(q='lawn', limit=2)
+        while True:
+            seen += [hit['id'] for hit in data['results']]
+            if not data['next_cursor']:
+                break
+            data = self.search(q='lawn', limit=2, cursor=data['next_cursor'])
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 3 search documents', out.getvalue())
+        self.assertEqual(self.search(q='copper')['results'][0]['id'], self.wiring.id)
+
+    def test_requires_query(self):
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'user'}).status_code, 400)
+
+
+class LocationMatchingTests(BookingFixtureMixin, TestCase):
+    """
+    Bookings and workers are located from postal codes and matched by distance
+    """
+
+    def add_worker(self, name, **location):
+        worker = UserProfile.objects.create(
+            user=User.objects.create_user(name), phone_number='9000000009',
+            role='WORKER', is_approved=True, **location)
+        worker.services.add(self.service)
+        return worker
+
+    def pending_booking(self, **location):
+        return Booking.objects.create(
+            user=self.customer, service=self.service, date='2026-01-01',
+            time_slot='9:00 AM - 11:00 AM', status='PENDING', **location)
+
+    def test_located_from_postal_code_in_address(self):
+        worker = self.add_worker('koramangala', address='4th Block, Koramangala, Bengaluru 560 034')
+        self.assertEqual(worker.postal_code, '560034')
+        self.assertAlmostEqual(worker.latitude, 12.9352)
+        self.assertEqual(worker.geo_cell, cell_key(12.9352, 77.6245))
+
+        worker.address = 'Indiranagar 560038'
+        worker.postal_code = ''
+        worker.latitude = worker.longitude = None
+        worker.save(update_fields=['address'])
+        worker.refresh_from_db()
+        self.assertEqual((worker.postal_code, worker.geo_cell), ('560038', cell_key(12.9784, 77.6408)))
+
+        # Unknown PINs keep the code but stay unlocated
+        booking = self.pending_booking(address='Somewhere 999999')
+        self.assertEqual((booking.postal_code, booking.latitude), ('999999', None))
+
+    def test_nearest_workers_within_radius(self):
+        far = self.add_worker('whitefield', postal_code='560066')
+        near = self.add_worker('indiranagar', postal_code='560038')
+        self.add_worker('mumbai', postal_code='400001')
+        booking = self.pending_booking(address='Koramangala', postal_code='560034')
+
+        candidates = nearest_available_workers(booking)
+        # self.worker has no location so comes last
+        self.assertEqual(candidates, [near, far, self.worker])
+        self.assertAlmostEqual(candidates[0].distance_km, distance_km(
+            12.9352, 77.6245, 12.9784, 77.6408), places=6)
+        self.assertIsNone(candidates[-1].distance_km)
+
+        # The booking's own cell, then the ring around it, which is far enough out
+        with self.assertNumQueries(2):
+            self.assertEqual(nearest_available_workers(booking, limit=1), [near])
+
+    def test_search_reaches_max_km(self):
+        # About 290 km from Koramangala, further than a fixed ring cap reached
+        chennai = self.add_worker('chennai', postal_code='600001')
+        booking = self.pending_booking(address='Koramangala', postal_code='560034')
+        self.assertEqual(nearest_available_workers(booking, max_km=300), [chennai, self.worker])
+        self.assertEqual(nearest_available_workers(booking, max_km=250), [self.worker])
+
+    def test_ring_clearance_uses_narrowest_cells_reached(self):
+        # 40 rings north of 60 degrees reach past 62 degrees, where cells are narrower
+        narrowest = 40 * CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(62))
+        self.assertLess(ring_clearance_km(60, 40), narrowest)
+
+    def test_candidate_endpoint_and_auto_assign_include_distance(self):
+        near = self.add_worker('indiranagar', postal_code='560038')
+        self.add_worker('chennai', postal_code='600001')
+        booking = self.pending_booking(address='Koramangala', postal_code='560034')
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(f'/api/admin/bookings/{booking.id}/available-workers/')
+        self.assertEqual([(worker['id'], worker['distance_km'] is None) for worker in response.data],
+                         [(near.id, False), (self.worker.id, True)])
+
+        window = (timezone.now() - timedelta(days=3650), timezone.now() + timedelta(days=3650))
+        entry = auto_assign(*window, dry_run=True)['assignments'][0]
+        self.assertEqual(entry['worker_id'], near.id)
+        self.assertEqual(entry['distance_km'], response.data[0]['distance_km'])
+
+    def test_booking_takes_location_from_request_or_profile(self):
+        self.customer.userprofile.address = 'HSR Layout 560068'
+        self.customer.userprofile.save()
+        self.client.force_authenticate(user=self.customer)
+
+        response = self.client.post('/api/bookings/', {
+            'service': self.service.id, 'date': '2026-01-01', 'time_slot': '9:00 AM - 11:00 AM',
+            'address': '',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['postal_code'], '560068')
+
+        response = self.client.post('/api/bookings/', {
+            'service': self.service.id, 'date': '2026-01-01', 'time_slot': '9:00 AM - 11:00 AM',
+            'address': 'Gate 2', 'latitude': 12.95, 'longitude': 77.6,
+        }, format='json')
+        self.assertEqual((response.data['latitude'], response.data['postal_code']), (12.95, ''))
+
+        response = self.client.post('/api/bookings/', {
+            'service': self.service.id, 'date': '2026-01-01', 'time_slot': '9:00 AM - 11:00 AM',
+            'address': 'Gate 2', 'latitude': 120,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SQLiteProductionModeTests(SimpleTestCase):
+    """
+    The production SQLite backend tunes connections and locks writes up front
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def connect(self, **options):
+        connections = ConnectionHandler({'default': {
+            'ENGINE': 'core.backends.sqlite3', 'NAME': self.path, 'OPTIONS': options}})
+        self.addCleanup(connections.close_all)
+        return connections['default']
+
+    def test_pragmas_applied_to_new_connections(self):
+        with self.connect(pragmas={'busy_timeout': 250}).cursor() as cursor:
+            values = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {pragma}')
+                values[pragma] = cursor.fetchone()[0]
+        self.assertEqual(values, {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 250, 'cache_size': -64000})
+
+    def test_write_lock_taken_at_begin_and_retried(self):
+        writer = self.connect()
+        other = self.connect(pragmas={'busy_timeout': 0}, begin_retries=2, retry_backoff=0.001)
+        writer.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        self.addCleanup(writer.set_autocommit, True)
+        self.addCleanup(writer.rollback)
+
+        # The open transaction holds the lock before it has written anything
+        with mock.patch('core.backends.sqlite3.base.time.sleep') as sleep:
+            with self.assertRaises(OperationalError):
+                other.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        self.assertEqual(sleep.call_count, 2)
+        other.set_autocommit(True)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_sqlite', threads=2, transactions=5, think_ms=0, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines], ['default', 'production'])
+        self.assertIn('committed=10 failed=0', lines[1])
+
+
+class ReplicaFixtureMixin:
+    """
+    A second SQLite file registered as the read replica, brought up to date
+    with default by sync() as replication would. The alias is not one from
+    settings, so this works whether or not a replica is configured.
+    """
+    replica = 'test_replica'
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.settings[self.replica] = {
+            **connections.settings['default'], 'NAME': os.path.join(directory, 'replica.sqlite3')}
+        self.addCleanup(self.remove_replica)
+        replica_setting = override_settings(READ_REPLICA_DATABASE=self.replica)
+        replica_setting.enable()
+        self.addCleanup(replica_setting.disable)
+        self.sync()
+
+    def remove_replica(self):
+        connections[self.replica].close()
+        del connections[self.replica]
+        del connections.settings[self.replica]
+
+    def sync(self):
+        sync_replica(self.replica)
+
+
+class ReadReplicaTests(ReplicaFixtureMixin, BookingFixtureMixin, TransactionTestCase):
+    """
+    Read-only admin views read from the replica, except for users who just wrote
+    """
+
+    def booking_ids(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/admin/bookings/')
+        self.assertEqual(response.status_code, 200)
+        return [booking['id'] for booking in response.data['results']]
+
+    def test_admin_lists_read_from_replica(self):
+        booking = self.create_bookings(1)[0]
+        self.assertEqual(self.booking_ids(self.admin), [])
+        self.sync()
+        self.assertEqual(self.booking_ids(self.admin), [booking.id])
+
+    def test_writer_reads_own_writes(self):
+        other_admin = User.objects.create_user('other_admin')
+        UserProfile.objects.create(user=other_admin, phone_number='9000000003', role='ADMIN')
+        self.sync()
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/bookings/', {
+            'service': self.service.id, 'date': '2026-01-01', 'time_slot': '9:00 AM - 11:00 AM',
+            'address': 'Street 1',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.booking_ids(self.admin), [response.data['id']])
+        # Replication has not caught up for everyone else yet
+        self.assertEqual(self.booking_ids(other_admin), [])
+
+    def test_writes_and_transactions_stay_on_default(self):
+        router = ReplicaRouter()
+        with read_from_replica():
+            self.assertEqual(router.db_for_read(Booking), self.replica)
+            self.assertEqual(router.db_for_write(Booking), 'default')
+            Service.objects.create(name='Painting', description='Walls', price=Decimal('100.00'),
+                                   estimated_duration='1 hour')
+            self.assertFalse(Service.objects.filter(name='Painting').exists())
+            with transaction.atomic():
+                self.assertTrue(Service.objects.filter(name='Painting').exists())
+        self.assertEqual(router.db_for_read(Booking), 'default')
+
+    def test_streamed_export_reads_from_replica(self):
+        self.create_bookings(1)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/admin/exports/bookings.csv')
+        # Only the header: the replica has not seen the booking yet
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+        self.sync()
+        response = self.client.get('/api/admin/exports/bookings.csv')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 2)
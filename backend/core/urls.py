@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import streams, views
 
 router = DefaultRouter()
 
@@ -26,6 +26,7 @@ urlpatterns = [
          views.service_details, name='service_details'),
     path('services/<int:service_id>/ratings/',
          views.service_ratings, name='service_ratings'),
+    path('search/', views.search_catalog, name='search'),
 
     # Worker-specific endpoints
     path('workers/bookings/', views.worker_bookings, name='worker_bookings'),
@@ -34,23 +35,42 @@ urlpatterns = [
     path('workers/bookings/<int:booking_id>/generate-otp/',
          views.worker_generate_otp, name='worker_generate_otp'),
     path('workers/verify-otp/', views.worker_verify_otp, name='worker_verify_otp'),
+    path('workers/me/earnings/', views.worker_earnings, name='worker_earnings'),
+    path('workers/me/balance/', views.worker_payout_balance, name='worker_payout_balance'),
     path('workers/me/ratings/', views.worker_received_ratings,
          name='worker_received_ratings'),
 
     path('admin/workers/', views.admin_worker_list, name='admin_worker_list'),
     path('admin/users/', views.admin_user_list, name='admin_user_list'),
+    path('admin/users/count/', views.admin_user_count, name='admin_user_count'),
     path('admin/workers/<int:worker_id>/approval/',
          views.admin_worker_approval_action, name='admin_worker_approval_action'),
     path('admin/workers/<int:worker_id>/approve/',
          views.admin_approve_worker, name='admin_approve_worker'),
     path('admin/bookings/<int:booking_id>/assign-worker/',
          views.admin_assign_worker, name='admin_assign_worker'),
+    path('admin/bookings/<int:booking_id>/available-workers/',
+         views.admin_available_workers, name='admin_available_workers'),
+    path('admin/bookings/auto-assign/',
+         views.admin_auto_assign, name='admin_auto_assign'),
     path('admin/bookings/', views.admin_booking_list, name='admin_booking_list'),
+    path('admin/payments/', views.admin_payment_list, name='admin_payment_list'),
+    path('admin/analytics/', views.admin_analytics, name='admin_analytics'),
+    path('admin/exports/<str:dataset>.<str:file_format>',
+         views.admin_export, name='admin_export'),
     path('admin/ratings/', views.admin_ratings_list, name='admin_ratings_list'),
 
     path('notifications/', views.get_notifications, name='get_notifications'),
     path('notifications/<int:notification_id>/mark-read/',
          views.mark_notification_as_read, name='mark_notification_as_read'),
+    path('notifications/mark-read/',
+         views.mark_notifications_read, name='mark_notifications_read'),
+    path('notifications/unread-count/',
+         views.unread_notification_count, name='unread_notification_count'),
+    path('notifications/stream/',
+         streams.notification_stream, name='notification_stream'),
+    path('notifications/stream/ticket/',
+         views.notification_stream_ticket, name='notification_stream_ticket'),
 
     # Payment endpoints
     path('bookings/<int:booking_id>/payment/',
@@ -1,17 +1,43 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.utils.decorators import method_decorator
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework import status
+from datetime import timedelta
 from decimal import Decimal
+from .analytics import analytics_summary
+from .assignment import auto_assign
+from .availability import is_worker_free, nearest_available_workers
+from .catalog import cached_payload, catalog_etag
+from .earnings import earnings_summary, money
+from .exports import FORMATS as EXPORT_FORMATS, ExportError, async_lines, stream_export
+from .geo import parse_location
+from .ledger import post_payment, worker_balance
 from .models import UserProfile, Service, Booking, OTP, RatingReview, Notification, Payment
+from .permissions import IsAdminUserRole, IsWorkerUserRole, request_profile, request_role
+from .replicas import replica_iterator, replica_reads
+from .notifications import create_notification, get_unread_count, mark_read, notify_admins
+from .onboarding import existing_service_ids, link_services, parse_service_ids
+from .pagination import get_page_size, paginate, parse_date_range
+from .search import decode_cursor as decode_search_cursor, search
+from .streams import TICKET_SECONDS, issue_stream_ticket, served_over_asgi
+from .serializers import (
+    booking_queryset, rating_queryset, serialize_admin_booking, serialize_list_user,
+    serialize_catalog_service, serialize_notification, serialize_payment, serialize_public_service,
+    serialize_rating, serialize_service_detail, serialize_worker_candidate
+)
 from .tasks import send_otp_email
 import json
 
@@ -49,46 +75,41 @@ def register(request):
         return Response({'error': 'Username already exists'},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    # Create the user
-    user = User.objects.create_user(
-        username=username,
-        password=password,
-        email=email
-    )
-
-    # Create the user profile
-    user_profile = UserProfile.objects.create(
-        user=user,
-        phone_number=phone_number,
-        address=address,
-        specialty=specialty if specialty else None,
-        role=role
-    )
+    try:
+        postal_code, latitude, longitude = parse_location(data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    # If the user is a worker and selected services, assign them
+    # Services a new worker provides; unknown or invalid ids are skipped
+    service_ids = []
     if role == 'WORKER':
-        service_data = data.get('service')
-        if service_data:
-            # Handle both single service ID and array of service IDs
-            if isinstance(service_data, int):
-                # Single service ID
-                try:
-                    service = Service.objects.get(id=service_data)
-                    user_profile.services.add(service)
-                except Service.DoesNotExist:
-                    pass
-            elif isinstance(service_data, list):
-                # Array of service IDs
-                for service_id in service_data:
-                    try:
-                        service = Service.objects.get(id=int(service_id))
-                        user_profile.services.add(service)
-                    except (ValueError, Service.DoesNotExist):
-                        # Skip invalid service IDs
-                        continue
-
-    # Create auth token
-    token, created = Token.objects.get_or_create(user=user)
+        service_ids = parse_service_ids(data.get('service'))
+        known = existing_service_ids(service_ids)
+        service_ids = [service_id for service_id in service_ids if service_id in known]
+
+    with transaction.atomic():
+        # Create the user
+        user = User.objects.create_user(
+            username=username,
+            password=password,
+            email=email
+        )
+
+        # Create the user profile
+        user_profile = UserProfile.objects.create(
+            user=user,
+            phone_number=phone_number,
+            address=address,
+            postal_code=postal_code or '',
+            latitude=latitude,
+            longitude=longitude,
+            specialty=specialty if specialty else None,
+            role=role
+        )
+        link_services([(user_profile.id, service_id) for service_id in service_ids])
+
+        # Create auth token
+        token = Token.objects.create(user=user)
 
     return Response({
         'token': token.key,
@@ -172,34 +193,26 @@ def logout_view(request):
 @permission_classes([IsAuthenticated])
 def user_list(request):
     """
-    Get list of all users
+    Get a page of regular users, oldest first
     """
-    users = User.objects.all()
-    user_data = []
+    users = regular_users().select_related('userprofile')
+    return paginate(request, users, serialize_list_user,
+                    order_field='date_joined', descending=False)
 
-    for user in users:
-        try:
-            profile = UserProfile.objects.get(user=user)
-            # Only include users with role 'USER', exclude 'WORKER' and 'ADMIN'
-            if profile.role == 'USER':
-                user_data.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'phone_number': profile.phone_number,
-                    'address': profile.address,
-                    'role': profile.role
-                })
-        except UserProfile.DoesNotExist:
-            # Include users without profiles (shouldn't happen in our system, but just in case)
-            user_data.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'role': 'USER'  # Default role
-            })
 
-    return Response(user_data)
+def regular_users():
+    # Only include users with role 'USER' (or no profile), exclude 'WORKER' and 'ADMIN'
+    return User.objects.filter(Q(userprofile__role='USER') | Q(userprofile__isnull=True))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUserRole])
+@replica_reads
+def admin_user_count(request):
+    """
+    Number of regular users, counted in the database (admin only)
+    """
+    return Response({'count': regular_users().count()})
 
 
 @api_view(['GET'])
@@ -227,34 +240,17 @@ def worker_list(request):
 
 @api_view(['GET', 'POST', 'DELETE'])
 @permission_classes([AllowAny])  # Allow public access to services
+@condition(etag_func=catalog_etag)
 def service_list(request):
     """
-    Get list of all services or create a new service
+    Get list of all services or create a new service.
+    GET answers If-None-Match from the catalog version without querying
+    and serves the list from the shared catalog cache
     """
     if request.method == 'GET':
-        services = Service.objects.all()
-        service_data = []
-
-        for service in services:
-            # Parse included_items if it exists
-            included_items = []
-            if service.included_items:
-                try:
-                    import json
-                    included_items = json.loads(service.included_items)
-                except:
-                    included_items = []
-
-            service_data.append({
-                'id': service.id,
-                'name': service.name,
-                'description': service.description,
-                'price': service.price,
-                'estimated_duration': service.estimated_duration,
-                'included_items': included_items,
-                'average_rating': service.average_rating
-            })
-
+        service_data = cached_payload('services', lambda: [
+            serialize_catalog_service(service) for service in Service.objects.all()
+        ])
         return Response(service_data)
 
     elif request.method == 'POST':
@@ -290,7 +286,7 @@ def service_list(request):
 
     elif request.method == 'DELETE':
         # Check if user is admin (only admins can delete services)
-        if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
+        if request_role(request) != 'ADMIN':
             return Response({'error': 'Only admins can delete services'}, status=status.HTTP_403_FORBIDDEN)
 
         service_id = request.data.get('service_id')
@@ -313,35 +309,13 @@ def user_bookings(request):
     Get bookings for the authenticated user
     """
     try:
-        bookings = Booking.objects.filter(user=request.user)
+        bookings = booking_queryset(user=request.user)
         booking_data = []
 
         for booking in bookings:
-            # Get payment information if it exists
-            payment_info = None
-            try:
-                payment = booking.payment  # Access the related payment
-                payment_info = {
-                    'id': payment.id,
-                    'total_amount': str(payment.total_amount),
-                    'admin_commission': str(payment.admin_commission),
-                    'provider_amount': str(payment.provider_amount),
-                    'payment_status': payment.payment_status,
-                    'payment_method': payment.payment_method,
-                    'transaction_id': payment.transaction_id,
-                    'created_at': payment.created_at
-                }
-            except Payment.DoesNotExist:
-                pass  # No payment exists for this booking
-
             booking_data.append({
                 'id': booking.id,
-                'service_detail': {
-                    'id': booking.service.id,
-                    'name': booking.service.name,
-                    'description': booking.service.description,
-                    'price': booking.service.price
-                },
+                'service_detail': serialize_service_detail(booking.service),
                 'service_name': booking.service.name,
                 'worker_username': booking.worker.user.username if booking.worker else None,
                 'status': booking.status,
@@ -352,7 +326,7 @@ def user_bookings(request):
                 'address': booking.address,
                 'is_rated': booking.is_rated,
                 'created_at': booking.created_at,
-                'payment': payment_info
+                'payment': serialize_payment(booking)
             })
 
         return Response(booking_data)
@@ -367,7 +341,7 @@ def booking_list(request):
     Get list of all bookings or create a new booking
     """
     if request.method == 'GET':
-        bookings = Booking.objects.all()
+        bookings = booking_queryset()
         booking_data = []
 
         for booking in bookings:
@@ -402,15 +376,20 @@ def booking_list(request):
             if field not in data:
                 return Response({'error': f'{field} is required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            postal_code, latitude, longitude = parse_location(data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         # Get address from request data or user profile
         address = data.get('address', '').strip()
         if not address:
-            # Try to get address from user profile
-            try:
-                user_profile = UserProfile.objects.get(user=request.user)
-                address = user_profile.address or ''
-            except UserProfile.DoesNotExist:
-                address = ''
+            # Try to get address, and its location, from user profile
+            user_profile = request_profile(request)
+            address = (user_profile.address or '') if user_profile else ''
+            if user_profile and postal_code is None and latitude is None:
+                postal_code = user_profile.postal_code
+                latitude, longitude = user_profile.latitude, user_profile.longitude
 
         try:
             booking = Booking.objects.create(
@@ -419,6 +398,9 @@ def booking_list(request):
                 date=data['date'],
                 time_slot=data['time_slot'],
                 address=address,
+                postal_code=postal_code or '',
+                latitude=latitude,
+                longitude=longitude,
                 status='PENDING'
             )
         except Exception as e:
@@ -431,7 +413,10 @@ def booking_list(request):
             'date': booking.date,
             'time_slot': booking.time_slot,
             'status': booking.status,
-            'address': booking.address
+            'address': booking.address,
+            'postal_code': booking.postal_code,
+            'latitude': booking.latitude,
+            'longitude': booking.longitude
         }, status=status.HTTP_201_CREATED)
 
 
@@ -515,22 +500,11 @@ def cancel_booking(request, pk):
             )
 
         # Send notification to all admin users
-        from django.contrib.auth.models import User
-        from django.db.models import Q
-
-        # Get all admin users (both superusers and users with ADMIN role)
-        admin_users = User.objects.filter(
-            Q(is_superuser=True) |
-            Q(userprofile__role='ADMIN')
-        ).distinct()
-
-        for admin_user in admin_users:
-            create_notification(
-                user=admin_user,
-                title='Booking Cancelled by User',
-                message=f'Booking #{booking.id} for {booking.service.name} has been cancelled by {request.user.username}.',
-                notification_type='BOOKING_STATUS'
-            )
+        notify_admins(
+            title='Booking Cancelled by User',
+            message=f'Booking #{booking.id} for {booking.service.name} has been cancelled by {request.user.username}.',
+            notification_type='BOOKING_STATUS'
+        )
 
         return Response({'message': 'Booking cancelled successfully', 'booking_id': booking.id})
 
@@ -555,6 +529,9 @@ def profile(request):
                 'email': request.user.email,
                 'phone_number': profile.phone_number,
                 'address': profile.address,
+                'postal_code': profile.postal_code,
+                'latitude': profile.latitude,
+                'longitude': profile.longitude,
                 'role': profile.role,
                 'specialty': profile.specialty,
                 'is_approved': profile.is_approved
@@ -573,6 +550,9 @@ def profile(request):
                 'email': request.user.email,
                 'phone_number': profile.phone_number,
                 'address': profile.address,
+                'postal_code': profile.postal_code,
+                'latitude': profile.latitude,
+                'longitude': profile.longitude,
                 'role': profile.role,
                 'specialty': profile.specialty,
                 'is_approved': profile.is_approved
@@ -613,9 +593,18 @@ def profile(request):
                 role='USER'
             )
 
+        try:
+            postal_code, latitude, longitude = parse_location(data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         profile.phone_number = data.get('phone_number', profile.phone_number)
-        profile.address = data.get('address', profile.address)
         profile.specialty = data.get('specialty', profile.specialty)
+        if 'address' in data or postal_code is not None or latitude is not None:
+            # A new address or postal code is located again unless coordinates come with it
+            profile.address = data.get('address', profile.address)
+            profile.postal_code = postal_code if postal_code is not None else ''
+            profile.latitude, profile.longitude = latitude, longitude
         profile.save()
 
         return Response({
@@ -624,6 +613,9 @@ def profile(request):
             'email': request.user.email,
             'phone_number': profile.phone_number,
             'address': profile.address,
+            'postal_code': profile.postal_code,
+            'latitude': profile.latitude,
+            'longitude': profile.longitude,
             'role': profile.role,
             'specialty': profile.specialty,
             'is_approved': profile.is_approved
@@ -677,18 +669,11 @@ def verify_otp(request):
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
 def approve_worker(request, user_id):
     """
     Approve a worker (admin only)
     """
-    # Check if user is admin
-    profile = UserProfile.objects.get(user=request.user)
-    if profile.role != 'ADMIN':
-        return Response({
-            'error': 'Permission denied'
-        }, status=status.HTTP_403_FORBIDDEN)
-
     try:
         worker_profile = UserProfile.objects.get(
             user_id=user_id, role='WORKER')
@@ -709,7 +694,7 @@ def approve_worker(request, user_id):
 @permission_classes([IsAuthenticated])
 def rating_list(request):
     """
-    Get list of all ratings/reviews or create a new rating
+    Get a page of ratings/reviews or create a new rating
     """
     if request.method == 'POST':
         # Create a new rating
@@ -742,20 +727,24 @@ def rating_list(request):
         # Get worker from booking if available
         worker = booking.worker if booking else None
 
-        # Create the rating
-        rating = RatingReview.objects.create(
-            user=user,
-            rating=rating_value,
-            review=review_text,
-            service=service,
-            booking=booking,
-            worker=worker
-        )
+        # Create the rating and fold it into the service aggregates together
+        with transaction.atomic():
+            rating = RatingReview.objects.create(
+                user=user,
+                rating=rating_value,
+                review=review_text,
+                service=service,
+                booking=booking,
+                worker=worker
+            )
+            rated_service = rating.rated_service
+            if rated_service:
+                rated_service.record_rating(rating.rating)
 
-        # If booking exists, mark it as rated
-        if booking:
-            booking.is_rated = True
-            booking.save()
+            # If booking exists, mark it as rated
+            if booking:
+                booking.is_rated = True
+                booking.save()
 
         # Return the created rating
         rating_data = {
@@ -773,51 +762,27 @@ def rating_list(request):
 
         return Response(rating_data, status=status.HTTP_201_CREATED)
 
-    # GET request - return all ratings
-    ratings = RatingReview.objects.all()
-    rating_data = []
-
-    for rating in ratings:
-        # Get service name, with fallback to service from booking if rating doesn't have direct service
-        service_name = rating.service.name if rating.service else None
-        if not service_name and rating.booking and rating.booking.service:
-            service_name = rating.booking.service.name
-
-        rating_data.append({
-            'id': rating.id,
-            'user': rating.user.username,
-            'user_username': rating.user.username,
-            'worker': rating.worker.user.username if rating.worker else None,
-            'worker_username': rating.worker.user.username if rating.worker else None,
-            'service': service_name,
-            'service_name': service_name,
-            'rating': rating.rating,
-            'review': rating.review,
-            'created_at': rating.created_at
-        })
-
-    return Response(rating_data)
+    # GET request - return one page of ratings, newest first
+    return paginate(request, rating_queryset(), serialize_rating)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@condition(etag_func=catalog_etag)
 def service_details(request, service_id):
     """
-    Get detailed information about a specific service (public access)
+    Get detailed information about a specific service (public access).
+    Answers If-None-Match from the catalog version without querying
+    and serves the details from the shared catalog cache
     """
-    try:
-        service = Service.objects.get(id=service_id)
-        return Response({
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'price': service.price,
-            'estimated_duration': service.estimated_duration,
-            'category': service.category,
-            'average_rating': service.average_rating
-        })
-    except Service.DoesNotExist:
+    def build():
+        service = Service.objects.filter(id=service_id).first()
+        return serialize_public_service(service) if service else None
+
+    service_data = cached_payload(f'service:{service_id}', build)
+    if service_data is None:
         return Response({'error': 'Service not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(service_data)
 
 
 @api_view(['GET'])
@@ -860,75 +825,81 @@ def service_ratings(request, service_id):
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def worker_bookings(request):
+@permission_classes([AllowAny])
+def search_catalog(request):
     """
-    Get bookings assigned to the authenticated worker
+    Ranked full-text search over services and reviews.
+    'q' is required; 'type' (service or review) narrows it, and 'limit' and
+    'cursor' page through the results
     """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = {'service': 'SERVICE', 'review': 'REVIEW'}
+    kind = request.query_params.get('type')
+    if kind and kind not in kinds:
+        return Response({'error': 'type must be service or review'}, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        worker_profile = UserProfile.objects.get(
-            user=request.user, role='WORKER')
-        bookings = Booking.objects.filter(worker=worker_profile)
+        page_size = get_page_size(request)
+        cursor = request.query_params.get('cursor')
+        after = decode_search_cursor(cursor) if cursor else None
+    except ValueError:
+        return Response({'error': 'Invalid cursor or limit'}, status=status.HTTP_400_BAD_REQUEST)
 
-        booking_data = []
-        for booking in bookings:
-            # Get payment information if it exists
-            payment_info = None
-            try:
-                payment = booking.payment  # Access the related payment
-                payment_info = {
-                    'id': payment.id,
-                    'total_amount': str(payment.total_amount),
-                    'admin_commission': str(payment.admin_commission),
-                    'provider_amount': str(payment.provider_amount),
-                    'payment_status': payment.payment_status,
-                    'payment_method': payment.payment_method,
-                    'transaction_id': payment.transaction_id,
-                    'created_at': payment.created_at
-                }
-            except Payment.DoesNotExist:
-                pass  # No payment exists for this booking
+    results, next_cursor = search(query, kind=kinds.get(kind), after=after, limit=page_size)
+    next_url = None
+    if next_cursor:
+        params = request.query_params.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    return Response({'results': results, 'next_cursor': next_cursor, 'next': next_url})
 
-            booking_data.append({
-                'id': booking.id,
-                'user': {
-                    'id': booking.user.id,
-                    'username': booking.user.username,
-                    'email': booking.user.email
-                },
-                'service_detail': {
-                    'id': booking.service.id,
-                    'name': booking.service.name,
-                    'description': booking.service.description,
-                    'price': booking.service.price
-                },
-                'service_name': booking.service.name,
-                'user_username': booking.user.username,
-                'date': booking.date,
-                'time_slot': booking.time_slot,
-                'suggested_date': booking.suggested_date,
-                'suggested_time': booking.suggested_time,
-                'status': booking.status,
-                'address': booking.address,
-                'is_rated': booking.is_rated,
-                'created_at': booking.created_at,
-                'payment': payment_info
-            })
 
-        return Response(booking_data)
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Only workers can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+@api_view(['GET'])
+@permission_classes([IsWorkerUserRole])
+def worker_bookings(request):
+    """
+    Get bookings assigned to the authenticated worker
+    """
+    worker_profile = request_profile(request)
+    bookings = booking_queryset(worker=worker_profile)
+
+    booking_data = []
+    for booking in bookings:
+        booking_data.append({
+            'id': booking.id,
+            'user': {
+                'id': booking.user.id,
+                'username': booking.user.username,
+                'email': booking.user.email
+            },
+            'service_detail': serialize_service_detail(booking.service),
+            'service_name': booking.service.name,
+            'user_username': booking.user.username,
+            'date': booking.date,
+            'time_slot': booking.time_slot,
+            'suggested_date': booking.suggested_date,
+            'suggested_time': booking.suggested_time,
+            'status': booking.status,
+            'address': booking.address,
+            'is_rated': booking.is_rated,
+            'created_at': booking.created_at,
+            'payment': serialize_payment(booking)
+        })
+
+    return Response(booking_data)
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsWorkerUserRole])
 def worker_booking_decision(request, booking_id):
     """
     Accept or reject a booking (worker only)
     """
     try:
-        worker_profile = UserProfile.objects.get(
-            user=request.user, role='WORKER')
+        worker_profile = request_profile(request)
         booking = Booking.objects.get(id=booking_id, worker=worker_profile)
 
         decision = request.data.get('decision')  # 'accept' or 'reject'
@@ -943,43 +914,28 @@ def worker_booking_decision(request, booking_id):
             booking.save()
 
             # Create a notification for admins about the rejection
-            from django.contrib.auth.models import User
-            from .models import Notification
-            from django.db.models import Q
-
-            # Get all admin users (both superusers and users with ADMIN role)
-            admin_users = User.objects.filter(
-                Q(is_superuser=True) |
-                Q(userprofile__role='ADMIN')
-            ).distinct()
-
-            for admin_user in admin_users:
-                create_notification(
-                    user=admin_user,
-                    title='Booking Rejected by Worker',
-                    message=f'Booking #{booking.id} for {booking.service.name} was rejected by {worker_profile.user.username}. Please reassign to another worker.',
-                    notification_type='BOOKING_REJECTION'
-                )
+            notify_admins(
+                title='Booking Rejected by Worker',
+                message=f'Booking #{booking.id} for {booking.service.name} was rejected by {worker_profile.user.username}. Please reassign to another worker.',
+                notification_type='BOOKING_REJECTION'
+            )
 
             return Response({'message': 'Booking rejected and returned to pending for reassignment'})
         else:
             return Response({'error': 'Invalid decision. Use "accept" or "reject"'}, status=status.HTTP_400_BAD_REQUEST)
 
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Only workers can make this decision'}, status=status.HTTP_403_FORBIDDEN)
     except Booking.DoesNotExist:
         return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsWorkerUserRole])
 def worker_generate_otp(request, booking_id):
     """
     Generate OTP for a completed booking (worker only)
     """
     try:
-        worker_profile = UserProfile.objects.get(
-            user=request.user, role='WORKER')
+        worker_profile = request_profile(request)
         booking = Booking.objects.get(id=booking_id, worker=worker_profile)
 
         # Generate a random 6-digit OTP
@@ -1016,14 +972,46 @@ def worker_generate_otp(request, booking_id):
 
         return Response({'message': 'OTP generated and sent to customer', 'otp_id': otp.id})
 
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Only workers can generate OTP'}, status=status.HTTP_403_FORBIDDEN)
     except Booking.DoesNotExist:
         return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
+@api_view(['GET'])
+@permission_classes([IsWorkerUserRole])
+def worker_earnings(request):
+    """
+    Earnings totals of the authenticated worker, lifetime, per month and per payment method.
+    Optional 'from' and 'to' dates (YYYY-MM-DD) limit the payments counted
+    """
+    worker_profile = request_profile(request)
+
+    try:
+        date_from, date_to = parse_date_range(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(earnings_summary(worker_profile, date_from=date_from, date_to=date_to))
+
+
+@api_view(['GET'])
+@permission_classes([IsWorkerUserRole])
+def worker_payout_balance(request):
+    """
+    What the platform currently owes the authenticated worker, read from the payout ledger
+    """
+    worker_profile = request_profile(request)
+
+    balance = worker_balance(worker_profile)
+    return Response({
+        'balance': money(balance.balance),
+        'total_earned': money(balance.total_earned),
+        'total_paid_out': money(balance.total_paid_out),
+        'updated_at': balance.updated_at
+    })
+
+
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsWorkerUserRole])
 def worker_verify_otp(request):
     """
     Verify OTP provided by customer (worker only)
@@ -1031,46 +1019,42 @@ def worker_verify_otp(request):
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsWorkerUserRole])
 def worker_received_ratings(request):
     """
     Get ratings received by the authenticated worker
     """
-    try:
-        worker_profile = UserProfile.objects.get(
-            user=request.user, role='WORKER')
+    worker_profile = request_profile(request)
 
-        # Get all ratings where this worker was the service provider
-        ratings = RatingReview.objects.filter(worker=worker_profile)
+    # Get all ratings where this worker was the service provider
+    ratings = RatingReview.objects.filter(worker=worker_profile)
 
-        rating_data = []
-        for rating in ratings:
-            # Get service name, with fallback to service from booking if rating doesn't have direct service
-            service_name = rating.service.name if rating.service else None
-            if not service_name and rating.booking and rating.booking.service:
-                service_name = rating.booking.service.name
+    rating_data = []
+    for rating in ratings:
+        # Get service name, with fallback to service from booking if rating doesn't have direct service
+        service_name = rating.service.name if rating.service else None
+        if not service_name and rating.booking and rating.booking.service:
+            service_name = rating.booking.service.name
 
-            rating_data.append({
-                'id': rating.id,
-                'user': rating.user.username,
-                'user_username': rating.user.username,
-                'worker': rating.worker.user.username if rating.worker else None,
-                'worker_username': rating.worker.user.username if rating.worker else None,
-                'service': service_name,
-                'service_name': service_name,
-                'booking': rating.booking.id if rating.booking else None,
-                'rating': rating.rating,
-                'review': rating.review,
-                'created_at': rating.created_at
-            })
+        rating_data.append({
+            'id': rating.id,
+            'user': rating.user.username,
+            'user_username': rating.user.username,
+            'worker': rating.worker.user.username if rating.worker else None,
+            'worker_username': rating.worker.user.username if rating.worker else None,
+            'service': service_name,
+            'service_name': service_name,
+            'booking': rating.booking.id if rating.booking else None,
+            'rating': rating.rating,
+            'review': rating.review,
+            'created_at': rating.created_at
+        })
 
-        return Response(rating_data)
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Only workers can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(rating_data)
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsWorkerUserRole])
 def worker_verify_otp(request):
     """
     Verify OTP provided by customer (worker only)
@@ -1078,51 +1062,43 @@ def worker_verify_otp(request):
     print(
         f"DEBUG: Received OTP verification request from user: {request.user.username}")
     print(f"DEBUG: Request data: {request.data}")
-    try:
-        worker_profile = UserProfile.objects.get(
-            user=request.user, role='WORKER')
-        print(f"DEBUG: Worker profile found: {worker_profile.user.username}")
-        otp_code = request.data.get('otp_code')
-        booking_id = request.data.get('booking_id')
-        print(f"DEBUG: OTP Code: {otp_code}, Booking ID: {booking_id}")
+    worker_profile = request_profile(request)
+    print(f"DEBUG: Worker profile found: {worker_profile.user.username}")
+    otp_code = request.data.get('otp_code')
+    booking_id = request.data.get('booking_id')
+    print(f"DEBUG: OTP Code: {otp_code}, Booking ID: {booking_id}")
 
-        try:
-            booking = Booking.objects.get(id=booking_id, worker=worker_profile)
-            otp = OTP.objects.get(
-                user=booking.user, booking=booking, code=otp_code, is_verified=False)
-
-            # Mark OTP as verified
-            otp.is_verified = True
-            otp.save()
+    try:
+        booking = Booking.objects.get(id=booking_id, worker=worker_profile)
+        otp = OTP.objects.get(
+            user=booking.user, booking=booking, code=otp_code, is_verified=False)
 
-            # Update booking status to IN_PROGRESS (waiting for payment)
-            booking.status = 'IN_PROGRESS'
-            booking.save()
+        # Mark OTP as verified
+        otp.is_verified = True
+        otp.save()
 
-            return Response({'message': 'OTP verified successfully. Booking marked as completed.'})
+        # Update booking status to IN_PROGRESS (waiting for payment)
+        booking.status = 'IN_PROGRESS'
+        booking.save()
 
-        except OTP.DoesNotExist:
-            print(
-                f"DEBUG: OTP DoesNotExist - Code: {otp_code}, Booking: {booking_id}")
-            return Response({'error': 'Invalid or already verified OTP'}, status=status.HTTP_400_BAD_REQUEST)
-        except Booking.DoesNotExist:
-            print(f"DEBUG: Booking DoesNotExist - ID: {booking_id}")
-            return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'OTP verified successfully. Booking marked as completed.'})
 
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Only workers can verify OTP'}, status=status.HTTP_403_FORBIDDEN)
+    except OTP.DoesNotExist:
+        print(
+            f"DEBUG: OTP DoesNotExist - Code: {otp_code}, Booking: {booking_id}")
+        return Response({'error': 'Invalid or already verified OTP'}, status=status.HTTP_400_BAD_REQUEST)
+    except Booking.DoesNotExist:
+        print(f"DEBUG: Booking DoesNotExist - ID: {booking_id}")
+        return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
+@replica_reads
 def admin_worker_list(request):
     """
     Get list of all workers (admin only)
     """
-    # Check if user is admin (either superuser or has ADMIN role in profile)
-    if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
-        return Response({'error': 'Only admins can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
-
     # Only get profiles with role 'WORKER'
     workers = UserProfile.objects.filter(role='WORKER')
 
@@ -1152,15 +1128,12 @@ def admin_worker_list(request):
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
+@replica_reads
 def admin_user_list(request):
     """
     Get list of all users (admin only)
     """
-    # Check if user is admin (either superuser or has ADMIN role in profile)
-    if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
-        return Response({'error': 'Only admins can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
-
     # Exclude superusers and workers from the user list to only show regular users
     users = User.objects.filter(is_superuser=False)
 
@@ -1192,14 +1165,12 @@ def admin_user_list(request):
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
 def admin_approve_worker(request, worker_id):
     """
     Approve a worker (admin only)
     """
     try:
-        admin_profile = UserProfile.objects.get(
-            user=request.user, role='ADMIN')
         worker_profile = UserProfile.objects.get(id=worker_id, role='WORKER')
 
         worker_profile.is_approved = True
@@ -1207,21 +1178,15 @@ def admin_approve_worker(request, worker_id):
 
         return Response({'message': 'Worker approved successfully', 'worker_id': worker_profile.id})
     except UserProfile.DoesNotExist:
-        return Response({'error': 'Only admins can approve workers'}, status=status.HTTP_403_FORBIDDEN)
-    except Exception as e:
         return Response({'error': 'Worker not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
 def admin_worker_approval_action(request, worker_id):
     """
     Approve or reject a worker (admin only) - matches frontend expectation
     """
-    # Check if user is admin (either superuser or has ADMIN role in profile)
-    if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
-        return Response({'error': 'Only admins can perform this action'}, status=status.HTTP_403_FORBIDDEN)
-
     try:
         # Check if the worker exists
         worker_profile = UserProfile.objects.get(id=worker_id, role='WORKER')
@@ -1247,31 +1212,35 @@ def admin_worker_approval_action(request, worker_id):
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
 def admin_assign_worker(request, booking_id):
     """
     Assign a worker to a booking (admin only)
     """
     try:
-        # Check if user is admin (either superuser or has ADMIN role in profile)
-        if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and hasattr(request.user.userprofile, 'role') and request.user.userprofile.role == 'ADMIN')):
-            return Response({'error': 'Only admins can assign workers'}, status=status.HTTP_403_FORBIDDEN)
-
-        booking = Booking.objects.get(id=booking_id)
         worker_id = request.data.get('worker_id')
 
-        worker_profile = UserProfile.objects.get(
-            id=worker_id, role='WORKER',
-            is_approved=True)
+        # Locking the worker serializes concurrent assignments to them, so two
+        # admins cannot both see the slot free and double-book it
+        with transaction.atomic():
+            booking = Booking.objects.select_for_update().get(id=booking_id)
+            worker_profile = UserProfile.objects.select_for_update().get(
+                id=worker_id, role='WORKER',
+                is_approved=True)
+
+            # Check if the worker is qualified to provide this service
+            if not worker_profile.services.filter(id=booking.service_id).exists():
+                return Response({'error': f'Worker {worker_profile.user.username} is not qualified to provide {booking.service.name} service'},
+                                status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if the worker is qualified to provide this service
-        if booking.service not in worker_profile.services.all():
-            return Response({'error': f'Worker {worker_profile.user.username} is not qualified to provide {booking.service.name} service'},
-                            status=status.HTTP_400_BAD_REQUEST)
+            # Check the worker is not already booked at this time
+            if not is_worker_free(worker_profile, booking):
+                return Response({'error': f'Worker {worker_profile.user.username} already has a booking at {booking.date} {booking.time_slot}'},
+                                status=status.HTTP_400_BAD_REQUEST)
 
-        booking.worker = worker_profile
-        booking.status = 'ASSIGNED'
-        booking.save()
+            booking.worker = worker_profile
+            booking.status = 'ASSIGNED'
+            booking.save()
 
         # Create notification for the assigned worker
         create_notification(
@@ -1291,128 +1260,128 @@ def admin_assign_worker(request, booking_id):
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def admin_ratings_list(request):
+@permission_classes([IsAdminUserRole])
+def admin_available_workers(request, booking_id):
     """
-    Get all ratings (admin only)
+    Approved workers qualified for a booking and free at its time, nearest first (admin only)
     """
-    # Check if user is admin (either superuser or has ADMIN role in profile)
-    if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
-        return Response({'error': 'Only admins can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        booking = Booking.objects.get(id=booking_id)
+    except Booking.DoesNotExist:
+        return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    ratings = RatingReview.objects.all().order_by('-created_at')
+    return Response([serialize_worker_candidate(worker) for worker in nearest_available_workers(booking)])
 
-    rating_data = []
-    for rating in ratings:
-        # Get service name, with fallback to service from booking if rating doesn't have direct service
-        service_name = rating.service.name if rating.service else None
-        if not service_name and rating.booking and rating.booking.service:
-            service_name = rating.booking.service.name
 
-        rating_data.append({
-            'id': rating.id,
-            'booking': rating.booking.id if rating.booking else None,
-            'user': rating.user.username,
-            'user_username': rating.user.username,
-            'worker': rating.worker.user.username if rating.worker else None,
-            'worker_username': rating.worker.user.username if rating.worker else None,
-            'service': service_name,
-            'service_name': service_name,
-            'rating': rating.rating,
-            'review': rating.review,
-            'created_at': rating.created_at
-        })
+@api_view(['POST'])
+@permission_classes([IsAdminUserRole])
+def admin_auto_assign(request):
+    """
+    Assign all PENDING bookings starting between 'start' and 'end' in one batch (admin only).
+    The window defaults to the next AUTO_ASSIGN_WINDOW_HOURS; with 'dry_run' the plan is only returned
+    """
+    now = timezone.now()
+    window = {
+        'start': now,
+        'end': now + timedelta(hours=settings.AUTO_ASSIGN_WINDOW_HOURS)
+    }
+    for field in window:
+        value = request.data.get(field)
+        if value is None:
+            continue
+        try:
+            value = parse_datetime(str(value))
+        except ValueError:
+            # Well formed but impossible, such as month 13
+            value = None
+        if value is None:
+            return Response({'error': f'{field} must be an ISO 8601 timestamp'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        window[field] = timezone.make_aware(value) if timezone.is_naive(value) else value
 
-    return Response(rating_data)
+    dry_run = str(request.data.get('dry_run', False)).lower() in ('1', 'true', 'yes')
+    return Response(auto_assign(window['start'], window['end'], dry_run=dry_run))
 
 
 @api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def admin_booking_list(request):
+@permission_classes([IsAdminUserRole])
+@replica_reads
+def admin_analytics(request):
     """
-    Get all bookings (admin only)
+    Booking and revenue totals per status, category and day from the daily rollup (admin only).
+    Optional 'from' and 'to' dates (YYYY-MM-DD) limit the days included
     """
-    # Check if user is admin (either superuser or has ADMIN role in profile)
-    if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
-        return Response({'error': 'Only admins can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        date_from, date_to = parse_date_range(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    bookings = Booking.objects.all()
+    return Response(analytics_summary(date_from=date_from, date_to=date_to))
 
-    booking_data = []
-    for booking in bookings:
-        # Get payment information if it exists
-        payment_info = None
-        try:
-            payment = booking.payment  # Access the related payment
-            payment_info = {
-                'id': payment.id,
-                'total_amount': str(payment.total_amount),
-                'admin_commission': str(payment.admin_commission),
-                'provider_amount': str(payment.provider_amount),
-                'payment_status': payment.payment_status,
-                'payment_method': payment.payment_method,
-                'transaction_id': payment.transaction_id,
-                'created_at': payment.created_at
-            }
-        except Payment.DoesNotExist:
-            pass  # No payment exists for this booking
 
-        booking_data.append({
-            'id': booking.id,
-            'user_username': booking.user.username if booking.user else 'N/A',
-            'service_name': booking.service.name if booking.service else 'N/A',
-            'service_price': booking.service.price if booking.service else 'N/A',
-            'worker_username': booking.worker.user.username if booking.worker and booking.worker.user else 'Not assigned',
-            'date': booking.date,
-            'scheduled_date': booking.date,  # For compatibility with frontend
-            'scheduled_time': booking.time_slot,  # For compatibility with frontend
-            'suggested_date': booking.suggested_date,
-            'suggested_time': booking.suggested_time,
-            'time_slot': booking.time_slot,
-            'status': booking.status,
-            'address': booking.address,
-            'is_rated': booking.is_rated,
-            'created_at': booking.created_at,
-            'updated_at': booking.updated_at,
-            'payment': payment_info
-        })
+@api_view(['GET'])
+@permission_classes([IsAdminUserRole])
+def admin_export(request, dataset, file_format):
+    """
+    Stream bookings, payments or ratings as CSV or NDJSON (admin only).
+    Optional 'from' and 'to' dates (YYYY-MM-DD) and 'status' filter the rows
+    """
+    try:
+        date_from, date_to = parse_date_range(request.query_params)
+        lines = stream_export(dataset, file_format, status=request.query_params.get('status') or None,
+                              date_from=date_from, date_to=date_to)
+    except (ValueError, ExportError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Rows are read while the response streams, after this view has returned
+    lines = replica_iterator(lines, user_id=request.user.pk)
+    if served_over_asgi(request):
+        # ASGI would otherwise read a sync iterator to the end before sending
+        lines = async_lines(lines)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+    return response
 
-    return Response(booking_data)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUserRole])
+@replica_reads
+def admin_ratings_list(request):
+    """
+    Get one page of ratings, newest first (admin only)
+    """
+    return paginate(request, rating_queryset(), serialize_rating)
 
 
-def create_notification(user, title, message, notification_type):
+@api_view(['GET'])
+@permission_classes([IsAdminUserRole])
+@replica_reads
+def admin_booking_list(request):
     """
-    Helper function to create a notification
+    Get one page of bookings, newest first (admin only)
     """
-    notification = Notification.objects.create(
-        user=user,
-        title=title,
-        message=message,
-        notification_type=notification_type
-    )
-    return notification
+    return paginate(request, booking_queryset(), serialize_admin_booking)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUserRole])
+@replica_reads
+def admin_payment_list(request):
+    """
+    Get one page of bookings that have a payment, newest first (admin only)
+    """
+    return paginate(request, booking_queryset().filter(payment__isnull=False), serialize_admin_booking)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_notifications(request):
     """
-    Get all notifications for the authenticated user
+    Get one page of notifications for the authenticated user, newest first
     """
     try:
-        notifications = Notification.objects.filter(
-            user=request.user).order_by('-created_at')
-        notification_data = []
-        for notification in notifications:
-            notification_data.append({
-                'id': notification.id,
-                'title': notification.title,
-                'message': notification.message,
-                'notification_type': notification.notification_type,
-                'is_read': notification.is_read,
-                'created_at': notification.created_at
-            })
-        return Response(notification_data)
+        notifications = Notification.objects.filter(user=request.user)
+        return paginate(request, notifications, serialize_notification)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -1424,28 +1393,90 @@ def mark_notification_as_read(request, notification_id):
     Mark a specific notification as read
     """
     try:
-        notification = Notification.objects.get(
-            id=notification_id, user=request.user)
-        notification.is_read = True
-        notification.save()
+        updated = mark_read(request.user, ids=[notification_id])
+        if not updated and not Notification.objects.filter(
+                id=notification_id, user=request.user).exists():
+            return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'Notification marked as read'})
-    except Notification.DoesNotExist:
-        return Response({'error': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+def mark_notifications_read(request):
+    """
+    Mark many notifications as read with a single UPDATE.
+    Accepts a list of 'ids', a 'before' timestamp, or neither to mark everything
+    """
+    ids = request.data.get('ids')
+    before = request.data.get('before')
+
+    if ids is not None:
+        if not isinstance(ids, list):
+            return Response({'error': 'ids must be a list of notification ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [int(notification_id) for notification_id in ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'ids must be a list of notification ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    if before is not None:
+        try:
+            before = parse_datetime(str(before))
+        except ValueError:
+            # Well formed but impossible, such as month 13
+            before = None
+        if before is None:
+            return Response({'error': 'before must be an ISO 8601 timestamp'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before)
+
+    updated = mark_read(request.user, ids=ids, before=before)
+    return Response({
+        'message': f'{updated} notifications marked as read',
+        'updated': updated,
+        'unread_count': get_unread_count(request.user)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def unread_notification_count(request):
+    """
+    Get the number of unread notifications for the authenticated user
+    """
+    return Response({'unread_count': get_unread_count(request.user)})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def notification_stream_ticket(request):
+    """
+    Issue a single-use ticket for opening the notification stream.
+    Answers 501 when the server cannot hold streams open, so clients poll instead
+    """
+    if not served_over_asgi(request):
+        return Response({'error': 'Notification streams need the ASGI server'},
+                        status=status.HTTP_501_NOT_IMPLEMENTED)
+    if not isinstance(request.auth, Token):
+        return Response({'error': 'Stream tickets are issued for token authentication only'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'ticket': issue_stream_ticket(request.auth),
+        'expires_in': TICKET_SECONDS,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUserRole])
 def create_notifications_for_existing_bookings(request):
     """
     Create notifications for existing bookings based on their status
     """
     try:
-        # Check if user is admin
-        if not (request.user.is_superuser or (hasattr(request.user, 'userprofile') and request.user.userprofile.role == 'ADMIN')):
-            return Response({'error': 'Only admins can trigger this action'}, status=status.HTTP_403_FORBIDDEN)
-
         bookings = Booking.objects.all()
         created_count = 0
 
@@ -1547,14 +1578,18 @@ def process_payment(request, booking_id):
             'transaction_id': transaction_id
         }
 
-        payment, created = Payment.objects.update_or_create(
-            booking=booking,
-            defaults=payment_data
-        )
+        # The payment, booking status and ledger journal are committed together
+        with transaction.atomic():
+            payment, created = Payment.objects.update_or_create(
+                booking=booking,
+                defaults=payment_data
+            )
 
-        # Update booking status to COMPLETED after successful payment
-        booking.status = 'COMPLETED'
-        booking.save()
+            # Update booking status to COMPLETED after successful payment
+            booking.status = 'COMPLETED'
+            booking.save()
+
+            post_payment(payment, booking.worker_id)
 
         # Create notification for user
         create_notification(
@@ -1574,22 +1609,11 @@ def process_payment(request, booking_id):
             )
 
         # Create notification for admin users
-        from django.contrib.auth.models import User
-        from django.db.models import Q
-
-        # Get all admin users (both superusers and users with ADMIN role)
-        admin_users = User.objects.filter(
-            Q(is_superuser=True) |
-            Q(userprofile__role='ADMIN')
-        ).distinct()
-
-        for admin_user in admin_users:
-            create_notification(
-                user=admin_user,
-                title=f'Payment Received for Booking #{booking.id}',
-                message=f'Payment of ₹{total_amount} has been processed for booking #{booking.id} for {booking.service.name}. Admin commission: ₹{admin_commission}, Provider amount: ₹{provider_amount}.',
-                notification_type='PAYMENT'
-            )
+        notify_admins(
+            title=f'Payment Received for Booking #{booking.id}',
+            message=f'Payment of ₹{total_amount} has been processed for booking #{booking.id} for {booking.service.name}. Admin commission: ₹{admin_commission}, Provider amount: ₹{provider_amount}.',
+            notification_type='PAYMENT'
+        )
 
         # Return success response
         return Response({
@@ -1639,18 +1663,12 @@ def get_payment_details(request, booking_id):
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAdminUserRole])
 def suggest_delayed_service(request, booking_id):
     """
     Admin suggests a new date and time for a delayed service
     """
     try:
-        # Check if user is admin
-        user_profile = UserProfile.objects.get(user=request.user)
-        if user_profile.role != 'ADMIN' and not request.user.is_superuser:
-            return Response({'error': 'Only admins can suggest delayed services'},
-                            status=status.HTTP_403_FORBIDDEN)
-
         booking = Booking.objects.get(id=booking_id)
 
         # Validate required fields
@@ -1691,21 +1709,18 @@ def suggest_delayed_service(request, booking_id):
 
     except Booking.DoesNotExist:
         return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'User profile not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['POST'])
-@permission_classes([IsAuthenticated])
+@permission_classes([IsWorkerUserRole])
 def mark_booking_reached(request, booking_id):
     """
     Mark a booking as reached (worker has arrived on time)
     """
     try:
-        worker_profile = UserProfile.objects.get(
-            user=request.user, role='WORKER')
+        worker_profile = request_profile(request)
         booking = Booking.objects.get(id=booking_id, worker=worker_profile)
 
         # Only allow marking as reached if status is CONFIRMED
@@ -1720,22 +1735,11 @@ def mark_booking_reached(request, booking_id):
         booking.save()
 
         # Send notification to admin
-        from django.contrib.auth.models import User
-        from django.db.models import Q
-
-        # Get all admin users (both superusers and users with ADMIN role)
-        admin_users = User.objects.filter(
-            Q(is_superuser=True) |
-            Q(userprofile__role='ADMIN')
-        ).distinct()
-
-        for admin_user in admin_users:
-            create_notification(
-                user=admin_user,
-                title='Worker Has Reached',
-                message=f'Worker {worker_profile.user.username} has reached the service location on time for booking #{booking.id} ({booking.service.name}).',
-                notification_type='SYSTEM'
-            )
+        notify_admins(
+            title='Worker Has Reached',
+            message=f'Worker {worker_profile.user.username} has reached the service location on time for booking #{booking.id} ({booking.service.name}).',
+            notification_type='SYSTEM'
+        )
 
         return Response({
             'message': 'Booking marked as reached successfully',
@@ -1743,8 +1747,6 @@ def mark_booking_reached(request, booking_id):
             'status': booking.status
         })
 
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Only workers can mark bookings as reached'}, status=status.HTTP_403_FORBIDDEN)
     except Booking.DoesNotExist:
         return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -1779,17 +1781,11 @@ def user_respond_to_delayed_service(request, booking_id):
             booking.save()
 
             # Notify admin and worker
-            admin_users = User.objects.filter(
-                Q(is_superuser=True) | Q(userprofile__role='ADMIN')
-            ).distinct()
-
-            for admin_user in admin_users:
-                create_notification(
-                    user=admin_user,
-                    title='User Accepted New Service Time',
-                    message=f'User {request.user.username} accepted the new date/time for booking #{booking.id} ({booking.service.name}). Updated to {booking.date} at {booking.time_slot}.',
-                    notification_type='BOOKING_STATUS'
-                )
+            notify_admins(
+                title='User Accepted New Service Time',
+                message=f'User {request.user.username} accepted the new date/time for booking #{booking.id} ({booking.service.name}). Updated to {booking.date} at {booking.time_slot}.',
+                notification_type='BOOKING_STATUS'
+            )
 
             # Notify worker if assigned
             if booking.worker:
@@ -1816,17 +1812,11 @@ def user_respond_to_delayed_service(request, booking_id):
             booking.save()
 
             # Notify admin and worker
-            admin_users = User.objects.filter(
-                Q(is_superuser=True) | Q(userprofile__role='ADMIN')
-            ).distinct()
-
-            for admin_user in admin_users:
-                create_notification(
-                    user=admin_user,
-                    title='User Cancelled Delayed Service',
-                    message=f'User {request.user.username} cancelled the delayed service for booking #{booking.id} ({booking.service.name}).',
-                    notification_type='BOOKING_STATUS'
-                )
+            notify_admins(
+                title='User Cancelled Delayed Service',
+                message=f'User {request.user.username} cancelled the delayed service for booking #{booking.id} ({booking.service.name}).',
+                notification_type='BOOKING_STATUS'
+            )
 
             # Notify worker if assigned
             if booking.worker:
@@ -1880,19 +1870,21 @@ def rate_booking(request, booking_id):
         if booking.is_rated:
             return Response({'error': 'This booking has already been rated'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create the rating
-        rating = RatingReview.objects.create(
-            user=request.user,
-            rating=rating_value,
-            review=review_text,
-            service=booking.service,
-            booking=booking,
-            worker=booking.worker  # Link to the worker who completed the service
-        )
+        # Create the rating and fold it into the service aggregates together
+        with transaction.atomic():
+            rating = RatingReview.objects.create(
+                user=request.user,
+                rating=rating_value,
+                review=review_text,
+                service=booking.service,
+                booking=booking,
+                worker=booking.worker  # Link to the worker who completed the service
+            )
+            booking.service.record_rating(rating.rating)
 
-        # Mark booking as rated
-        booking.is_rated = True
-        booking.save()
+            # Mark booking as rated
+            booking.is_rated = True
+            booking.save()
 
         # Return success response
         return Response({
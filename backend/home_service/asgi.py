@@ -1,5 +1,8 @@
 """
 ASGI config for home_service project.
+
+Serve with an ASGI server (e.g. `uvicorn home_service.asgi:application`) to
+support the long-lived notifications/stream/ endpoint.
 """
 import os
 
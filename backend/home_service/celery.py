@@ -22,5 +22,13 @@ app.conf.beat_schedule = {
         'task': 'core.tasks.check_and_mark_delayed_bookings',
         'schedule': crontab(minute='*/15'),  # Run every 15 minutes
     },
+    'archive-read-notifications': {
+        'task': 'core.tasks.archive_read_notifications',
+        'schedule': crontab(hour=3, minute=0),  # Run daily at 03:00
+    },
+    'settle-worker-payouts': {
+        'task': 'core.tasks.settle_worker_payouts',
+        'schedule': crontab(hour=2, minute=0),  # Run daily at 02:00
+    },
 }
 app.conf.timezone = 'UTC'
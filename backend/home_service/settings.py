@@ -47,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'home_service.urls'
@@ -68,6 +69,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'home_service.wsgi.application'
+ASGI_APPLICATION = 'home_service.asgi.application'
 
 
 # Database
@@ -80,6 +82,61 @@ DATABASES = {
     }
 }
 
+# Production SQLite mode: WAL journaling, tuned pragmas and write
+# transactions that take the lock up front and retry with backoff (see
+# core/backends/sqlite3). Off by default; set SQLITE_PRODUCTION_MODE=1 when
+# serving concurrent traffic from the SQLite file. Compare both modes with
+# `python manage.py benchmark_sqlite`.
+SQLITE_PRODUCTION_MODE = os.environ.get('SQLITE_PRODUCTION_MODE', '').lower() in ('1', 'true', 'yes')
+SQLITE_PRODUCTION_OPTIONS = {
+    'pragmas': {'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))},
+    'begin_retries': 5,
+    'retry_backoff': 0.05,
+}
+
+if SQLITE_PRODUCTION_MODE:
+    DATABASES['default']['ENGINE'] = 'core.backends.sqlite3'
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+
+# Read replica for the read-only admin lists and reporting (see
+# core/replicas.py). Set READ_REPLICA_NAME to a second SQLite file to try it
+# locally, refreshing it with `python manage.py sync_replica`; point the
+# alias at a real replica in production. Users who just wrote read from
+# default for READ_REPLICA_PIN_SECONDS, which should exceed replication lag.
+READ_REPLICA_DATABASE = None
+if os.environ.get('READ_REPLICA_NAME'):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': os.environ['READ_REPLICA_NAME']}
+    READ_REPLICA_DATABASE = 'replica'
+READ_REPLICA_PIN_SECONDS = int(os.environ.get('READ_REPLICA_PIN_SECONDS', '10'))
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+
+# Cache
+# The default cache is shared state for cached lookups such as the admin
+# registry. Point CACHE_URL at Redis (e.g. redis://localhost:6379/1) in
+# production so every process sees the same entries.
+CACHE_URL = os.environ.get('CACHE_URL')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Service catalog responses stay fresh in the cache for this many seconds;
+# writes to services and ratings invalidate them immediately
+CATALOG_CACHE_TIMEOUT = 300
+CATALOG_REBUILD_LOCK_TIMEOUT = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/stable/ref/settings/#auth-password-validators
@@ -129,7 +186,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # DRF Settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -168,6 +225,40 @@ CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
+# Notification retention
+# Read notifications older than this many days (per notification type) are
+# moved to the archive table by core.tasks.archive_read_notifications.
+# 'default' applies to types without their own entry; None keeps them forever.
+NOTIFICATION_RETENTION_DAYS = {
+    'default': 30,
+    'OTP': 7,
+    'PAYMENT': 90,
+}
+NOTIFICATION_ARCHIVE_BATCH_SIZE = 1000
+
+# PENDING bookings starting within this many hours are picked up by the
+# auto_assign_pending_bookings task
+AUTO_ASSIGN_WINDOW_HOURS = 24
+
+# Workers located further than this from a located booking are not offered
+# or auto-assigned to it. Workers or bookings without a location are still
+# matched, ranked after the located ones.
+WORKER_MATCH_RADIUS_KM = float(os.environ.get('WORKER_MATCH_RADIUS_KM', '25'))
+
+# CSV of postal_code,latitude,longitude,place used to locate addresses;
+# None uses the table shipped in core/data/postal_centroids.csv
+POSTAL_CENTROIDS_FILE = os.environ.get('POSTAL_CENTROIDS_FILE') or None
+
+# Ledger entries read per query by the settle_worker_payouts task
+PAYOUT_SETTLEMENT_CHUNK_SIZE = 1000
+
+# Notification stream (served by the ASGI app, e.g. `uvicorn home_service.asgi:application`)
+# 'memory' only reaches streams in the same process; use 'redis' when running
+# several web processes or when Celery tasks create notifications.
+NOTIFICATION_STREAM_BROKER = os.environ.get('NOTIFICATION_STREAM_BROKER', 'memory')
+NOTIFICATION_STREAM_REDIS_URL = os.environ.get(
+    'NOTIFICATION_STREAM_REDIS_URL', 'redis://localhost:6379/2')
+
 # For development, you can use this to run tasks synchronously
 # CELERY_TASK_ALWAYS_EAGER = True
 # CELERY_TASK_EAGER_PROPAGATES = True
@@ -39,19 +39,62 @@ function Navbar() {
     // Fetch unread notification count for authenticated users
     useEffect(() => {
         if (token && (role === "USER" || role === "WORKER" || role === "ADMIN")) {
+            let stream = null;
+            let timer = null;
+            let closed = false;
+            let lastEventId = null;
+
+            // Without an ASGI server there is no stream, so poll instead
+            const poll = () => {
+                timer = setTimeout(() => {
+                    fetchUnreadCount();
+                    poll();
+                }, 30000);
+            };
+
+            // Each stream needs a fresh single-use ticket, including reconnects
+            const connect = () => {
+                api.post("notifications/stream/ticket/")
+                    .then((res) => {
+                        if (closed) return;
+                        const params = new URLSearchParams({ ticket: res.data.ticket });
+                        if (lastEventId) params.set("last_event_id", lastEventId);
+                        stream = new EventSource(
+                            `${api.defaults.baseURL}notifications/stream/?${params}`
+                        );
+                        stream.addEventListener("notification", (event) => {
+                            lastEventId = event.lastEventId || lastEventId;
+                            setUnreadCount((count) => count + 1);
+                        });
+                        stream.onerror = () => {
+                            stream.close();
+                            if (!closed) timer = setTimeout(connect, 5000);
+                        };
+                    })
+                    .catch((err) => {
+                        if (closed || err.response?.status === 401) return;
+                        if (err.response?.status === 501) {
+                            poll();
+                        } else {
+                            timer = setTimeout(connect, 30000);
+                        }
+                    });
+            };
+
             fetchUnreadCount();
-            // Set up interval to refresh notification count
-            const interval = setInterval(fetchUnreadCount, 30000); // Every 30 seconds
-            return () => clearInterval(interval);
+            connect();
+            return () => {
+                closed = true;
+                clearTimeout(timer);
+                if (stream) stream.close();
+            };
         }
     }, [token, role]);
 
     const fetchUnreadCount = () => {
-        api.get("notifications/")
+        api.get("notifications/unread-count/")
             .then((res) => {
-                const notifications = res.data;
-                const unread = notifications.filter(n => !n.is_read).length;
-                setUnreadCount(unread);
+                setUnreadCount(res.data.unread_count);
             })
             .catch((err) => {
                 console.error("Error fetching notifications:", err);
@@ -0,0 +1,31 @@
+import { useState } from "react";
+import api from "../api";
+
+// Page through a cursor-paginated endpoint one page at a time: reload()
+// fetches the first page, loadMore() appends the page after the last one
+export const useCursorPages = (url, params = {}) => {
+  const [items, setItems] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const reload = async () => {
+    const response = await api.get(url, { params });
+    setItems(response.data.results);
+    setCursor(response.data.next_cursor);
+    return response;
+  };
+
+  const loadMore = async () => {
+    if (!cursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(url, { params: { ...params, cursor } });
+      setItems((previous) => [...previous, ...response.data.results]);
+      setCursor(response.data.next_cursor);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  return { items, setItems, hasMore: Boolean(cursor), loadingMore, reload, loadMore };
+};
@@ -5,6 +5,7 @@
 import React, { useState, useEffect } from "react";
 import { useNotification } from "../hooks/useNotification";
 import api from "../api";
+import { useCursorPages } from "../hooks/useCursorPages";
 import { useSearchParams } from "react-router-dom";
 
 function AdminDashboard() {
@@ -15,12 +16,10 @@ function AdminDashboard() {
     });
     const [workers, setWorkers] = useState([]);
     const [users, setUsers] = useState([]);
-    const [bookings, setBookings] = useState([]);
     const [allServices, setAllServices] = useState([]);
-    const [ratings, setRatings] = useState([]);
-    const [payments, setPayments] = useState([]);
     const [loading, setLoading] = useState(false);
     const [selectedBooking, setSelectedBooking] = useState(null);
+    const [candidateWorkers, setCandidateWorkers] = useState(null);
     const [suggestedDate, setSuggestedDate] = useState('');
     const [suggestedTime, setSuggestedTime] = useState('');
     const [showSuggestionModal, setShowSuggestionModal] = useState(false);
@@ -35,11 +34,33 @@ function AdminDashboard() {
     const [showServiceForm, setShowServiceForm] = useState(false);
     const { showNotification } = useNotification();
 
+    // Bookings, payments and ratings are loaded one keyset page at a time
+    const bookingPages = useCursorPages("admin/bookings/");
+    const paymentPages = useCursorPages("admin/payments/");
+    const ratingPages = useCursorPages("admin/ratings/");
+    const bookings = bookingPages.items;
+    const payments = paymentPages.items;
+    const ratings = ratingPages.items;
+
     // Load data on component mount and when active tab changes
     useEffect(() => {
         loadData();
     }, [activeTab, searchParams]);
 
+    // Load ranked, free workers for the booking being assigned
+    useEffect(() => {
+        setCandidateWorkers(null);
+        if (!selectedBooking || showSuggestionModal) {
+            return;
+        }
+        api.get(`admin/bookings/${selectedBooking.id}/available-workers/`)
+            .then(res => setCandidateWorkers(res.data))
+            .catch(err => {
+                console.error('Error loading available workers:', err);
+                setCandidateWorkers([]);
+            });
+    }, [selectedBooking, showSuggestionModal]);
+
     // Update active tab when URL parameters change
     useEffect(() => {
         const tabFromUrl = searchParams.get('tab');
@@ -79,12 +100,11 @@ function AdminDashboard() {
 
             case "bookings":
                 Promise.all([
-                    api.get("admin/bookings/"),
+                    bookingPages.reload(),
                     api.get("admin/workers/"),
                     api.get("services/")
                 ])
-                    .then(([bookingsRes, workersRes, servicesRes]) => {
-                        setBookings(bookingsRes.data);
+                    .then(([, workersRes, servicesRes]) => {
                         setWorkers(workersRes.data);
                         setAllServices(servicesRes.data);
                     })
@@ -95,14 +115,8 @@ function AdminDashboard() {
                 break;
 
             case "services":
-                Promise.all([
-                    api.get("services/"),
-                    api.get("admin/ratings/")
-                ])
-                    .then(([servicesRes, ratingsRes]) => {
-                        setAllServices(servicesRes.data);
-                        setRatings(ratingsRes.data);
-                    })
+                api.get("services/")
+                    .then(res => setAllServices(res.data))
                     .catch(err => {
                         console.error("Error loading services:", err);
                         showNotification("Failed to load services.", "error");
@@ -110,8 +124,7 @@ function AdminDashboard() {
                 break;
 
             case "ratings":
-                api.get("admin/ratings/")
-                    .then(res => setRatings(res.data))
+                ratingPages.reload()
                     .catch(err => {
                         console.error("Error loading ratings:", err);
                         showNotification("Failed to load ratings.", "error");
@@ -119,13 +132,7 @@ function AdminDashboard() {
                 break;
 
             case "payments":
-                // Load all bookings to get payment information
-                api.get("admin/bookings/")
-                    .then(res => {
-                        // Filter bookings that have payments
-                        const bookingsWithPayments = res.data.filter(booking => booking.payment);
-                        setPayments(bookingsWithPayments);
-                    })
+                paymentPages.reload()
                     .catch(err => {
                         console.error("Error loading payments:", err);
                         showNotification("Failed to load payments.", "error");
@@ -153,6 +160,16 @@ function AdminDashboard() {
             });
     };
 
+    const renderLoadMore = (pages, label) => pages.hasMore && (
+        <button
+            onClick={pages.loadMore}
+            disabled={pages.loadingMore}
+            style={styles.loadMoreButton}
+        >
+            {pages.loadingMore ? "Loading..." : label}
+        </button>
+    );
+
     const handleAssignWorker = (bookingId, workerId) => {
         api.post(`admin/bookings/${bookingId}/assign-worker/`, { worker_id: workerId })
             .then(res => {
@@ -168,6 +185,20 @@ function AdminDashboard() {
             });
     };
 
+    const handleAutoAssign = () => {
+        api.post('admin/bookings/auto-assign/')
+            .then(res => {
+                const { assignments, unassigned } = res.data;
+                showNotification(`Assigned ${assignments.length} bookings, ${unassigned.length} still pending.`, "success");
+                loadData();
+            })
+            .catch(err => {
+                console.error("Error auto-assigning bookings:", err);
+                const errorMsg = err.response?.data?.error || "Failed to auto-assign bookings.";
+                showNotification(errorMsg, "error");
+            });
+    };
+
     const handleCreateService = (e) => {
         e.preventDefault();
         setLoading(true);
@@ -393,7 +424,15 @@ function AdminDashboard() {
             {/* Bookings Tab */}
             {activeTab === "bookings" && (
                 <div style={styles.section}>
-                    <h2>All Bookings</h2>
+                    <div style={styles.servicesHeader}>
+                        <h2>All Bookings</h2>
+                        <button
+                            onClick={handleAutoAssign}
+                            style={styles.addButton}
+                        >
+                            Auto-assign Pending
+                        </button>
+                    </div>
                     {bookings.length === 0 ? (
                         <p>No bookings in the system yet.</p>
                     ) : (
@@ -476,6 +515,7 @@ function AdminDashboard() {
                             </table>
                         </div>
                     )}
+                    {renderLoadMore(bookingPages, "Load older bookings")}
                 </div>
             )}
 
@@ -665,6 +705,7 @@ function AdminDashboard() {
                             </table>
                         </div>
                     )}
+                    {renderLoadMore(ratingPages, "Load older ratings")}
                 </div>
             )}
 
@@ -722,6 +763,7 @@ function AdminDashboard() {
                             </table>
                         </div>
                     )}
+                    {renderLoadMore(paymentPages, "Load older payments")}
                 </div>
             )}
 
@@ -736,48 +778,27 @@ function AdminDashboard() {
 
                         <div style={styles.modalContent}>
                             <h4>Available Workers</h4>
-                            {/* Get the service category for the selected booking */}
                             {(() => {
-                                const bookingService = allServices.find(service => service.name === selectedBooking.service_name);
-                                const requiredCategory = bookingService ? bookingService.category : null;
-
-                                // Filter workers who are approved and provide the required service category
-                                console.log('Selected booking service name:', selectedBooking.service_name);
-                                console.log('All services:', allServices);
-                                console.log('All workers:', workers);
-
-                                const availableWorkers = workers.filter(w => {
-                                    console.log(`Checking worker ${w.username}:`, w);
-                                    console.log(`Worker services:`, w.services);
-                                    const hasService = w.services &&
-                                        Array.isArray(w.services) &&
-                                        w.services.some(s => {
-                                            console.log(`Comparing: "${s.name}" === "${selectedBooking.service_name}"`);
-                                            console.log(`Match result:`, s.name === selectedBooking.service_name);
-                                            return s.name === selectedBooking.service_name;
-                                        });
-                                    console.log(`Worker ${w.username} has service:`, hasService);
-                                    return w.is_approved && hasService;
-                                });
+                                if (candidateWorkers === null) {
+                                    return <p>Loading available workers...</p>;
+                                }
 
-                                if (availableWorkers.length === 0) {
+                                if (candidateWorkers.length === 0) {
                                     return (
                                         <p>
-                                            No {requiredCategory ? requiredCategory.toLowerCase() : 'qualified'} workers available for this service.
+                                            No qualified workers are free at this time.
                                         </p>
                                     );
                                 }
 
                                 return (
                                     <ul style={styles.workerList}>
-                                        {availableWorkers.map((w) => (
+                                        {candidateWorkers.map((w) => (
                                             <li key={w.id} style={styles.workerItem}>
                                                 <div>
                                                     <strong>{w.username}</strong>
                                                     <div style={{ fontSize: '0.9em', color: '#7f8c8d' }}>
-                                                        {w.services && w.services.length > 0
-                                                            ? `Specializes in: ${w.services.map(s => s.name).join(', ')}`
-                                                            : 'No specializations defined'}
+                                                        Rating: {w.average_rating > 0 ? w.average_rating : 'No ratings yet'} · Active bookings: {w.active_bookings}
                                                     </div>
                                                 </div>
                                                 <button
@@ -1027,6 +1048,15 @@ const styles = {
         borderRadius: "4px",
         cursor: "pointer",
     },
+    loadMoreButton: {
+        marginTop: "1rem",
+        padding: "0.75rem 1.5rem",
+        backgroundColor: "#3498db",
+        color: "white",
+        border: "none",
+        borderRadius: "4px",
+        cursor: "pointer",
+    },
     addServiceForm: {
         backgroundColor: "#f8f9fa",
         padding: "1.5rem",
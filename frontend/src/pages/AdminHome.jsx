@@ -17,31 +17,30 @@ function AdminHome() {
         // Fetch admin profile and platform stats
         Promise.all([
             api.get("profile/"),
-            api.get("admin/bookings/"),
+            api.get("admin/analytics/"),
+            // Newest bookings only, for the activity feed
+            api.get("admin/bookings/", { params: { limit: 5 } }),
             api.get("admin/workers/"),
-            api.get("users/")
+            api.get("admin/users/count/")
         ])
-            .then(([profileRes, bookingsRes, workersRes, usersRes]) => {
+            .then(([profileRes, analyticsRes, bookingsRes, workersRes, usersRes]) => {
                 setAdminInfo(profileRes.data);
 
-                // Calculate platform stats
-                const bookings = bookingsRes.data;
+                // Booking counts come from the server-side daily rollup
+                const { totals, by_status: byStatus } = analyticsRes.data;
+                const bookings = bookingsRes.data.results;
                 const workers = workersRes.data;
-                const users = usersRes.data;
 
-                const pendingBookings = bookings.filter(b => b.status === 'PENDING').length;
-                const assignedBookings = bookings.filter(b => b.status === 'ASSIGNED').length;
-                const completedBookings = bookings.filter(b => b.status === 'COMPLETED').length;
                 const approvedWorkers = workers.filter(w => w.is_approved).length;
 
                 setStats({
-                    totalBookings: bookings.length,
-                    pendingBookings,
-                    assignedBookings,
-                    completedBookings,
+                    totalBookings: totals.bookings,
+                    pendingBookings: byStatus.PENDING,
+                    assignedBookings: byStatus.ASSIGNED,
+                    completedBookings: byStatus.COMPLETED,
                     totalWorkers: workers.length,
                     approvedWorkers,
-                    totalUsers: users.length
+                    totalUsers: usersRes.data.count
                 });
 
                 // Generate recent activity feed
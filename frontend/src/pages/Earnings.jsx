@@ -20,63 +20,27 @@ function Earnings() {
             try {
                 setLoading(true);
 
-                // Get bookings assigned to this worker
-                const bookingsResponse = await api.get('/workers/bookings/');
-                const workerBookings = bookingsResponse.data;
-
-                // Calculate earnings based on completed bookings with payments
-                let totalEarnings = 0;
-                let monthlyEarnings = 0;
-                let completedJobs = 0;
-                let pendingPayments = 0;
-
-                const paymentHistory = [];
+                // Totals are computed by the server from the worker's payments
+                const { data } = await api.get('/workers/me/earnings/');
 
                 const now = new Date();
-                const currentMonth = now.getMonth();
-                const currentYear = now.getFullYear();
-
-                workerBookings.forEach(booking => {
-                    // Count completed jobs
-                    if (booking.status === 'COMPLETED') {
-                        completedJobs++;
-
-                        // If payment exists, add to earnings
-                        if (booking.payment && booking.payment.payment_status === 'SUCCESS') {
-                            const providerAmount = parseFloat(booking.payment.provider_amount) || 0;
-                            totalEarnings += providerAmount;
-
-                            // Use payment date if available, otherwise use booking date
-                            const paymentDate = booking.payment?.created_at ? new Date(booking.payment.created_at) : new Date(booking.created_at || booking.updated_at);
-                            if (paymentDate.getMonth() === currentMonth &&
-                                paymentDate.getFullYear() === currentYear) {
-                                monthlyEarnings += providerAmount;
-                            }
-
-                            // Add to payment history
-                            paymentHistory.push({
-                                id: booking.id,
-                                date: paymentDate.toLocaleDateString(),
-                                user: booking.user?.username || booking.user_username || 'Unknown',
-                                job: booking.service_detail?.name || booking.service_name || booking.service,
-                                amount: providerAmount,
-                                status: 'Completed'
-                            });
-                        } else if (booking.payment && booking.payment.payment_status !== 'SUCCESS') {
-                            // If payment exists but not successful, it might be pending
-                            pendingPayments += parseFloat(booking.payment.provider_amount) || 0;
-                        }
-                    }
-                });
+                const currentMonth = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`;
+                const thisMonth = data.monthly.find(entry => entry.month === currentMonth);
 
-                // Sort payment history by date (most recent first)
-                paymentHistory.sort((a, b) => new Date(b.date) - new Date(a.date));
+                const paymentHistory = data.recent_payments.map(payment => ({
+                    id: payment.booking_id,
+                    date: new Date(payment.created_at).toLocaleDateString(),
+                    user: payment.user_username || 'Unknown',
+                    job: payment.service_name,
+                    amount: parseFloat(payment.amount) || 0,
+                    status: 'Completed'
+                }));
 
                 setEarningsData({
-                    totalEarnings,
-                    monthlyEarnings,
-                    completedJobs,
-                    pendingPayments,
+                    totalEarnings: parseFloat(data.total_earnings) || 0,
+                    monthlyEarnings: thisMonth ? parseFloat(thisMonth.earnings) : 0,
+                    completedJobs: data.completed_jobs,
+                    pendingPayments: parseFloat(data.pending_payments) || 0,
                     paymentHistory
                 });
             } catch (error) {
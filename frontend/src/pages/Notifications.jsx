@@ -1,8 +1,11 @@
 import React, { useState, useEffect } from 'react';
 import api from '../api';
+import { useCursorPages } from '../hooks/useCursorPages';
 
 const Notifications = () => {
-    const [notifications, setNotifications] = useState([]);
+    const {
+        items: notifications, hasMore, loadingMore, reload, loadMore
+    } = useCursorPages('/notifications/');
     const [loading, setLoading] = useState(true);
     const [filter, setFilter] = useState('all'); // all messages
 
@@ -14,8 +17,7 @@ const Notifications = () => {
 
     const fetchNotifications = async () => {
         try {
-            const response = await api.get('/notifications/');
-            setNotifications(response.data);
+            await reload();
         } catch (error) {
             console.error('Error fetching notifications:', error);
         } finally {
@@ -25,16 +27,8 @@ const Notifications = () => {
 
     const markAllAsRead = async () => {
         try {
-            // Fetch all notifications and mark each as read
-            const response = await api.get('/notifications/');
-            const allNotifications = response.data;
-
-            // Mark each notification as read
-            for (const notification of allNotifications) {
-                if (!notification.is_read) {
-                    await api.post(`/notifications/${notification.id}/mark-read/`);
-                }
-            }
+            // Mark every unread notification as read in one request
+            await api.post('/notifications/mark-read/');
 
             // Refresh the notifications list
             fetchNotifications();
@@ -149,6 +143,15 @@ const Notifications = () => {
                                 </div>
                             </div>
                         ))}
+                        {hasMore && (
+                            <button
+                                style={styles.loadMoreButton}
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                            >
+                                {loadingMore ? 'Loading...' : 'Load older notifications'}
+                            </button>
+                        )}
                     </div>
                 )}
             </div>
@@ -194,6 +197,16 @@ const styles = {
         flexDirection: 'column',
         gap: '1rem',
     },
+    loadMoreButton: {
+        alignSelf: 'center',
+        padding: '0.75rem 1.5rem',
+        backgroundColor: '#3498db',
+        color: 'white',
+        border: 'none',
+        borderRadius: '8px',
+        fontSize: '1rem',
+        cursor: 'pointer',
+    },
     notificationCard: {
         backgroundColor: 'white',
         borderRadius: '12px',
@@ -6,9 +6,14 @@
 import React, { useEffect, useState } from "react";
 import { useLocation } from "react-router-dom";
 import api from "../api";
+import { useCursorPages } from "../hooks/useCursorPages";
 
 function WorkerDashboard() {
-    const [notifications, setNotifications] = useState([]);
+    const {
+        items: notifications, hasMore: hasMoreNotifications,
+        loadingMore: loadingMoreNotifications,
+        reload: reloadNotifications, loadMore: loadMoreNotifications
+    } = useCursorPages("/notifications/");
     const [loadingNotifications, setLoadingNotifications] = useState(false);
     const [bookings, setBookings] = useState([]);
     const [workerRatings, setWorkerRatings] = useState([]);
@@ -61,11 +66,9 @@ function WorkerDashboard() {
     const loadNotifications = async () => {
         setLoadingNotifications(true);
         try {
-            const res = await api.get("/notifications/");
+            const res = await reloadNotifications();
             console.log("Notifications API response:", res);
-            console.log("Notifications data:", res.data);
-            console.log("Number of notifications:", res.data.length);
-            setNotifications(res.data);
+            console.log("Number of notifications:", res.data.results.length);
         } catch (error) {
             console.error("Error loading notifications:", error);
             console.error("Notifications error response:", error.response?.data);
@@ -492,6 +495,16 @@ function WorkerDashboard() {
                                 </div>
                             ))
                         )}
+
+                        {hasMoreNotifications && (
+                            <button
+                                style={{ ...styles.actionButton, ...styles.loadMoreButton }}
+                                onClick={loadMoreNotifications}
+                                disabled={loadingMoreNotifications}
+                            >
+                                {loadingMoreNotifications ? "Loading..." : "Load older notifications"}
+                            </button>
+                        )}
                     </div>
                 )
             }
@@ -875,6 +888,12 @@ const styles = {
         color: "#fff",
     },
 
+    loadMoreButton: {
+        background: "#3498db",
+        color: "#fff",
+        marginTop: "1rem",
+    },
+
     rejectButton: {
         background: "#e74c3c",
         color: "#fff",
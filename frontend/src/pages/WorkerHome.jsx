@@ -18,7 +18,7 @@ function WorkerHome() {
         Promise.all([
             api.get("profile/"),
             api.get("worker/bookings/"),
-            api.get("notifications/")
+            api.get("notifications/", { params: { limit: 5 } })
         ])
             .then(([profileRes, bookingsRes, notificationsRes]) => {
                 setWorkerInfo(profileRes.data);
@@ -37,7 +37,7 @@ function WorkerHome() {
                 });
 
                 // Set notifications
-                setNotifications(notificationsRes.data);
+                setNotifications(notificationsRes.data.results);
 
                 setLoading(false);
             })
@@ -140,6 +140,11 @@ function WorkerHome() {
                         </div>
                     ))}
                 </div>
+                {notifications.length > 0 && (
+                    <Link to="/notifications" style={styles.viewAllLink}>
+                        View all notifications →
+                    </Link>
+                )}
                 {notifications.length === 0 && (
                     <div style={styles.activityPlaceholder}>
                         <p>📋 No recent activity to display</p>
@@ -253,6 +258,13 @@ const styles = {
     activitySection: {
         marginBottom: "2rem",
     },
+    viewAllLink: {
+        display: "inline-block",
+        marginTop: "1rem",
+        color: "#3498db",
+        fontWeight: "600",
+        textDecoration: "none",
+    },
     activityPlaceholder: {
         backgroundColor: "white",
         padding: "2rem",